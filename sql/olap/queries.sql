@@ -97,6 +97,22 @@ GROUP BY
 ORDER BY encounter_count DESC
 LIMIT 10;
 
+-- Precomputed alternative: agg_diagnosis_procedure_pair holds the pair
+-- counts (maintained by the ETL after the bridge loads), so the top 10 is a
+-- backward scan of idx_encounter_count:
+EXPLAIN ANALYZE
+SELECT 
+    diag.icd10_code,
+    diag.icd10_description,
+    proc.cpt_code,
+    proc.cpt_description,
+    a.encounter_count
+FROM agg_diagnosis_procedure_pair a
+JOIN dim_diagnosis diag ON a.diagnosis_key = diag.diagnosis_key
+JOIN dim_procedure proc ON a.procedure_key = proc.procedure_key
+ORDER BY a.encounter_count DESC
+LIMIT 10;
+
 -- Performance Notes:
 -- This query still requires bridge table joins (many-to-many)
 -- BUT bridge tables have:
@@ -170,6 +186,25 @@ WHERE et1.encounter_type_name = 'Inpatient'
 GROUP BY p.specialty_name
 ORDER BY readmission_rate_percent DESC;
 
+-- Precomputed alternative: fact_readmission links each inpatient encounter
+-- to the patient's first inpatient admission after its discharge day
+-- (maintained by the ETL), so the rate is a single GROUP BY without the
+-- self-join. Note the definition differs from the query above: this counts
+-- index stays whose first later admission is within 30 days
+-- (SUM(is_readmission)), the query above counts distinct readmission
+-- encounters (COUNT(DISTINCT f2.encounter_key)) and matches patients on
+-- patient_key rather than patient_id. See docs/etl_design.txt section 4.7.
+EXPLAIN ANALYZE
+SELECT 
+    p.specialty_name,
+    COUNT(*) AS total_inpatient_encounters,
+    SUM(r.is_readmission) AS readmissions,
+    ROUND(SUM(r.is_readmission) * 100.0 / NULLIF(COUNT(*), 0), 2) AS readmission_rate_percent
+FROM fact_readmission r
+JOIN dim_provider p ON r.provider_key = p.provider_key
+GROUP BY p.specialty_name
+ORDER BY readmission_rate_percent DESC;
+
 -- Performance Notes:
 -- Self-join still required (inherent to readmission logic)
 -- BUT improvements:
@@ -228,6 +263,45 @@ ORDER BY d.year, d.month, total_revenue DESC;
 --   - Pre-aggregated allowed_amount
 
 
+-- ============================================================
+-- QUERIES 1 & 4 FROM THE MONTHLY AGGREGATE
+-- ============================================================
+-- agg_monthly_specialty is maintained by the ETL (src/etl/aggregates.py):
+-- one row per year/month/specialty/encounter type, so these read a few
+-- hundred rows instead of the fact table. unique_patients is a
+-- HyperLogLog estimate (~6.5% error at 256 registers).
+-- ============================================================
+
+-- Query 1: Monthly Encounters by Specialty
+EXPLAIN ANALYZE
+SELECT 
+    year,
+    month,
+    month_name,
+    specialty_name,
+    encounter_type_name,
+    encounter_count AS total_encounters,
+    unique_patients
+FROM v_monthly_specialty
+ORDER BY year, month, specialty_name, encounter_type_name;
+
+-- Query 4: Revenue by Specialty & Month
+EXPLAIN ANALYZE
+SELECT 
+    year,
+    month,
+    month_name,
+    specialty_name,
+    SUM(total_allowed_amount) AS total_revenue,
+    SUM(billed_encounter_count) AS encounter_count,
+    ROUND(SUM(total_allowed_amount) / NULLIF(SUM(billed_encounter_count), 0), 2)
+        AS avg_revenue_per_encounter
+FROM v_monthly_specialty
+WHERE billed_encounter_count > 0
+GROUP BY year, month, month_name, specialty_name
+ORDER BY year, month, total_revenue DESC;
+
+
 -- ============================================================
 -- Show execution times for all queries
 -- ============================================================
@@ -95,7 +95,6 @@ CREATE TABLE encounters (
 
 -- Create index on encounter_date for performance
 CREATE INDEX idx_encounter_date ON encounters(encounter_date);
-CREATE INDEX idx_encounters_updated ON encounters(updated_at);
 
 -- ============================================================
 -- TABLE 6: diagnoses
@@ -169,7 +168,21 @@ CREATE TABLE billing (
 
 -- Create index on claim_date for performance
 CREATE INDEX idx_claim_date ON billing(claim_date);
-CREATE INDEX idx_billing_updated ON billing(updated_at);
+
+-- ============================================================
+-- ETL WATERMARK INDEXES
+-- Incremental extraction uses a single range predicate
+-- (updated_at >= last watermark); updated_at is also set on INSERT,
+-- so it covers new rows without an OR on created_at. The primary key
+-- is the tie-breaker within one updated_at value.
+-- ============================================================
+CREATE INDEX idx_patients_updated ON patients(updated_at, patient_id);
+CREATE INDEX idx_providers_updated ON providers(updated_at, provider_id);
+CREATE INDEX idx_departments_updated ON departments(updated_at, department_id);
+CREATE INDEX idx_diagnoses_updated ON diagnoses(updated_at, diagnosis_id);
+CREATE INDEX idx_procedures_updated ON procedures(updated_at, procedure_id);
+CREATE INDEX idx_encounters_updated ON encounters(updated_at, encounter_id);
+CREATE INDEX idx_billing_updated ON billing(updated_at, billing_id);
 
 -- ============================================================
 -- SAMPLE DATA INSERTION
@@ -272,7 +272,8 @@ SELECT 'Update your query_analysis.txt and star_schema_queries.txt with actual t
 -- ============================================================
 SELECT '' as '';
 SELECT '========================================' as '';
-SELECT 'Fill in this table with times from SHOW PROFILES:' as '';
+SELECT 'Fill in this table with times from SHOW PROFILES' as '';
+SELECT '(or run python -m src.bench.queries, which times every query and writes it):' as '';
 SELECT '========================================' as '';
 SELECT '' as '';
 SELECT '| Query | OLTP Time | Star Time | Speedup |' as '';
@@ -300,4 +301,10 @@ SELECT '| Q4    | _____s    | _____s    | ___x    |' as '';
 -- 4. Documentation:
 --    - Results should be recorded in query_analysis.txt and reflection.md
 --
+-- 5. Automated alternative:
+--    - python -m src.bench.queries --repeat 10 --output-dir bench_results
+--      runs the same queries with warmup and repeated timings (p50/p95/max,
+--      rows examined, parsed EXPLAIN ANALYZE) and writes JSON + a markdown
+--      speedup table; --baseline <earlier json> flags p50 regressions
+--
 -- ============================================================
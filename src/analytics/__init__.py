@@ -0,0 +1,21 @@
+"""
+Analytics Package - Cached analytic queries over the star schema
+"""
+
+from .cache import QueryCache
+from .queries import (
+    get_connection,
+    monthly_encounters_by_specialty,
+    top_diagnosis_procedure_pairs,
+    readmission_rate_by_specialty,
+    revenue_by_specialty_month,
+)
+
+__all__ = [
+    "QueryCache",
+    "get_connection",
+    "monthly_encounters_by_specialty",
+    "top_diagnosis_procedure_pairs",
+    "readmission_rate_by_specialty",
+    "revenue_by_specialty_month",
+]
@@ -0,0 +1,98 @@
+"""
+Query Result Cache
+In-process LRU cache for analytic query results, keyed by query name and
+parameters.
+
+The star schema only changes when an ETL run commits, so entries carry no
+notion of staleness of their own: the cache remembers the etl_metadata
+watermarks (table_name, last_load_timestamp, last_load_key) it was filled
+under and drops everything as soon as they change. Entries also expire
+after ttl seconds, which bounds staleness if tables are modified outside
+the ETL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Cached results kept (least recently used evicted first)
+DEFAULT_MAX_ENTRIES = 256
+
+# Seconds a result may be served at most
+DEFAULT_TTL = 3600
+
+# Seconds between etl_metadata checks (0 checks before every query)
+DEFAULT_CHECK_INTERVAL = 1.0
+
+
+def load_version(cursor):
+    """The ETL watermarks that cached results are valid for"""
+    cursor.execute("""
+        SELECT table_name, last_load_timestamp, last_load_key
+        FROM etl_metadata ORDER BY table_name
+    """)
+    return tuple(cursor.fetchall())
+
+
+class QueryCache:
+    """Thread-safe LRU/TTL cache invalidated by new ETL loads"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL,
+                 check_interval=DEFAULT_CHECK_INTERVAL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (stored_at, result)
+        self._version = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self, cursor):
+        """Clear the cache if an ETL load has committed since it was filled"""
+        now = self.clock()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+        version = load_version(cursor)
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = version
+
+    def get(self, key):
+        """Cached result for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self.clock() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = (self.clock(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self._checked_at = None
+
+    def stats(self):
+        """Hit/miss/invalidation counters and current size"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits,
+                    'misses': self.misses, 'invalidations': self.invalidations}
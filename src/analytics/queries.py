@@ -0,0 +1,155 @@
+"""
+Analytic Queries
+The OLAP queries of sql/olap/queries.sql as parameterized functions for the
+dashboards. They read the ETL-maintained aggregates (v_monthly_specialty,
+agg_diagnosis_procedure_pair, fact_readmission) rather than the fact table.
+
+Every function takes an open connection (get_connection() gives an
+autocommit one, so each query sees the latest committed load) and returns
+a list of dicts, one per row. Results go through the shared QueryCache
+unless another cache, or cache=None, is passed; treat them as read-only.
+
+Month bounds (first_month/last_month) are date/datetime values; only their
+year and month are used and both are inclusive.
+"""
+
+import mysql.connector
+from mysql.connector import Error
+
+from .cache import QueryCache
+
+# Configuration - matches docker-compose.yml and .env settings
+DB_CONFIG = {
+    'host': 'localhost',
+    'port': 3306,
+    'user': 'root',
+    'password': 'root_password',
+    'database': 'healthcare_db'
+}
+
+# Days after discharge counted as a readmission by default
+DEFAULT_READMISSION_DAYS = 30
+
+# Cache shared by all queries unless one is passed explicitly
+DEFAULT_CACHE = QueryCache()
+
+
+def get_connection(**options):
+    """Create an autocommit database connection (options override DB_CONFIG)"""
+    try:
+        return mysql.connector.connect(**{**DB_CONFIG, 'autocommit': True, **options})
+    except Error as e:
+        print(f"Error connecting to MySQL: {e}")
+        return None
+
+
+def cached_query(connection, name, sql, params=(), cache=DEFAULT_CACHE):
+    """Run sql (or return the cached result of name + params) as a list of dicts"""
+    key = (name, params)
+    cursor = connection.cursor()
+    try:
+        if cache is not None:
+            cache.refresh(cursor)
+            result = cache.get(key)
+            if result is not None:
+                return result
+        cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        result = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+def _month_filter(first_month, last_month, conditions, params):
+    if first_month is not None:
+        conditions.append("year * 100 + month >= %s")
+        params.append(first_month.year * 100 + first_month.month)
+    if last_month is not None:
+        conditions.append("year * 100 + month <= %s")
+        params.append(last_month.year * 100 + last_month.month)
+
+
+def monthly_encounters_by_specialty(connection, first_month=None, last_month=None,
+                                    specialty=None, cache=DEFAULT_CACHE):
+    """Query 1: encounters and (estimated) unique patients per month, specialty and type"""
+    conditions, params = ["TRUE"], []
+    _month_filter(first_month, last_month, conditions, params)
+    if specialty is not None:
+        conditions.append("specialty_name = %s")
+        params.append(specialty)
+    return cached_query(connection, 'monthly_encounters_by_specialty', f"""
+        SELECT year, month, month_name, specialty_name, encounter_type_name,
+               encounter_count AS total_encounters, unique_patients
+        FROM v_monthly_specialty
+        WHERE {' AND '.join(conditions)}
+        ORDER BY year, month, specialty_name, encounter_type_name
+    """, tuple(params), cache)
+
+
+def top_diagnosis_procedure_pairs(connection, limit=10, first_month=None, last_month=None,
+                                  cache=DEFAULT_CACHE):
+    """Query 2: the most frequent diagnosis-procedure pairs (optionally within months)"""
+    if first_month is None and last_month is None:
+        source = "agg_diagnosis_procedure_pair"
+        params = []
+    else:
+        conditions, params = ["TRUE"], []
+        _month_filter(first_month, last_month, conditions, params)
+        source = f"""(
+            SELECT diagnosis_key, procedure_key, SUM(encounter_count) AS encounter_count
+            FROM agg_diagnosis_procedure_pair_monthly
+            WHERE {' AND '.join(conditions)}
+            GROUP BY diagnosis_key, procedure_key
+        )"""
+    params.append(int(limit))
+    return cached_query(connection, 'top_diagnosis_procedure_pairs', f"""
+        SELECT diag.icd10_code, diag.icd10_description,
+               proc.cpt_code, proc.cpt_description,
+               a.encounter_count
+        FROM {source} a
+        JOIN dim_diagnosis diag ON a.diagnosis_key = diag.diagnosis_key
+        JOIN dim_procedure proc ON a.procedure_key = proc.procedure_key
+        ORDER BY a.encounter_count DESC
+        LIMIT %s
+    """, tuple(params), cache)
+
+
+def readmission_rate_by_specialty(connection, window_days=DEFAULT_READMISSION_DAYS,
+                                  cache=DEFAULT_CACHE):
+    """Query 3: share of inpatient encounters readmitted within window_days of discharge"""
+    return cached_query(connection, 'readmission_rate_by_specialty', """
+        SELECT
+            p.specialty_name,
+            COUNT(*) AS total_inpatient_encounters,
+            COALESCE(SUM(r.days_to_readmission BETWEEN 1 AND %s), 0) AS readmissions,
+            ROUND(COALESCE(SUM(r.days_to_readmission BETWEEN 1 AND %s), 0) * 100.0
+                  / NULLIF(COUNT(*), 0), 2) AS readmission_rate_percent
+        FROM fact_readmission r
+        JOIN dim_provider p ON r.provider_key = p.provider_key
+        GROUP BY p.specialty_name
+        ORDER BY readmission_rate_percent DESC
+    """, (int(window_days), int(window_days)), cache)
+
+
+def revenue_by_specialty_month(connection, first_month=None, last_month=None,
+                               specialty=None, cache=DEFAULT_CACHE):
+    """Query 4: allowed revenue of billed encounters per month and specialty"""
+    conditions, params = ["billed_encounter_count > 0"], []
+    _month_filter(first_month, last_month, conditions, params)
+    if specialty is not None:
+        conditions.append("specialty_name = %s")
+        params.append(specialty)
+    return cached_query(connection, 'revenue_by_specialty_month', f"""
+        SELECT year, month, month_name, specialty_name,
+               SUM(total_allowed_amount) AS total_revenue,
+               SUM(billed_encounter_count) AS encounter_count,
+               ROUND(SUM(total_allowed_amount) / NULLIF(SUM(billed_encounter_count), 0), 2)
+                   AS avg_revenue_per_encounter
+        FROM v_monthly_specialty
+        WHERE {' AND '.join(conditions)}
+        GROUP BY year, month, month_name, specialty_name
+        ORDER BY year, month, total_revenue DESC
+    """, tuple(params), cache)
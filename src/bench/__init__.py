@@ -0,0 +1,8 @@
+"""
+Benchmark Package - Query and ETL performance measurements
+"""
+
+from .etl import run_etl_benchmark
+from .queries import run_benchmark
+
+__all__ = ["run_benchmark", "run_etl_benchmark"]
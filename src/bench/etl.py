@@ -0,0 +1,373 @@
+"""
+ETL Throughput Benchmark
+Measures run_etl at several dataset sizes. For every scale factor it
+
+1. generates the OLTP data with the existing generator and rebuilds the
+   star schema,
+2. times a full (initial) run_etl pass,
+3. applies K incremental change batches and times a run_etl pass after
+   each. A batch of size N appends N encounters (with diagnoses,
+   procedures and billing for all but a late share of them), bills the
+   encounters earlier batches left unbilled (late-arriving billing), and
+   changes patient last names and provider specialties (tracked columns),
+   which creates SCD2 versions in dim_patient/dim_provider.
+
+Per ETL stage (task graph node) it reports wall time, rows and rows/sec,
+plus the peak RSS of this process while the stage ran (sampled from
+/proc/self/statm; stages of a --parallel run overlap and share samples).
+
+Every run is appended as one JSON line to <output-dir>/etl_bench.jsonl so
+runs can be compared over time; a markdown summary of the run, with
+rows/sec against the previous run of the same scale factor and batch size,
+is written next to it.
+
+Usage: python -m src.bench.etl --scale-factors 0.1,0.5,1 --batches 3 --batch-size 1000
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+from ..etl.bulk_load import bulk_insert
+from ..etl.load import get_connection, run_etl
+from ..etl.partitions import GRANULARITIES
+from ..etl.setup_star_schema import setup_star_schema
+from ..generators.generate_data import (
+    LAST_NAMES, TABLE_COLUMNS,
+    billing_rows, encounter_diagnosis_rows, encounter_procedure_rows, encounter_rows,
+    generate_all_data, scaled_counts,
+)
+
+DEFAULT_SCALE_FACTORS = (0.1, 0.5, 1.0)
+DEFAULT_BATCHES = 3
+DEFAULT_BATCH_SIZE = 1000
+
+# Changes per appended encounter in an incremental batch
+BATCH_MIX = {
+    'patients': 0.1,       # patient last names changed (SCD2)
+    'providers': 0.005,    # provider specialties changed (SCD2)
+    'late_billing': 0.1,   # new encounters whose billing arrives with the next batch
+}
+
+# Seconds between RSS samples
+RSS_SAMPLE_INTERVAL = 0.05
+
+HISTORY_FILE = 'etl_bench.jsonl'
+
+
+def rss_bytes():
+    """Current resident set size of this process, or None without /proc"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RssSampler:
+    """Background thread recording (timestamp, rss) samples while running"""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            rss = rss_bytes()
+            if rss is not None:
+                self.samples.append((datetime.now(), rss))
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def peak(self, start=None, end=None):
+        """Highest sample in [start, end] (the last one before start if none fall inside)"""
+        inside = [rss for at, rss in self.samples
+                  if (start is None or at >= start) and (end is None or at <= end)]
+        if not inside and start is not None:
+            inside = [rss for at, rss in self.samples if at < start][-1:]
+        return max(inside) if inside else None
+
+
+def _mb(value):
+    return round(value / 2 ** 20, 1) if value is not None else None
+
+
+def _max_id(cursor, table, column):
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def _shifted(rows, *offsets):
+    """Rows with offsets added to their leading id columns"""
+    for row in rows:
+        yield tuple(value + offset for value, offset in zip(row, offsets)) + row[len(offsets):]
+
+
+def apply_change_batch(cursor, batch_size, mix=BATCH_MIX):
+    """Apply one incremental change batch to the OLTP tables; returns rows changed per kind"""
+    patients = _max_id(cursor, 'patients', 'patient_id')
+    providers = _max_id(cursor, 'providers', 'provider_id')
+    changed = {}
+
+    # SCD2 changes: only rows whose value really changes count
+    patient_ids = random.sample(range(1, patients + 1),
+                                min(patients, round(batch_size * mix['patients'])))
+    cursor.executemany(
+        "UPDATE patients SET last_name = %s WHERE patient_id = %s AND last_name <> %s",
+        [(name, patient_id, name)
+         for patient_id, name in ((i, random.choice(LAST_NAMES)) for i in patient_ids)])
+    changed['patients'] = max(cursor.rowcount, 0)
+
+    cursor.execute("SELECT specialty_id FROM specialties")
+    specialty_ids = [specialty_id for (specialty_id,) in cursor.fetchall()]
+    provider_ids = random.sample(range(1, providers + 1),
+                                 min(providers, max(1, round(batch_size * mix['providers']))))
+    cursor.executemany(
+        "UPDATE providers SET specialty_id = %s WHERE provider_id = %s AND specialty_id <> %s",
+        [(specialty_id, provider_id, specialty_id)
+         for provider_id, specialty_id in ((i, random.choice(specialty_ids))
+                                           for i in provider_ids)])
+    changed['providers'] = max(cursor.rowcount, 0)
+
+    # Late billing for the encounters earlier batches left unbilled
+    cursor.execute("""
+        SELECT e.encounter_id FROM encounters e
+        LEFT JOIN billing b ON b.encounter_id = e.encounter_id
+        WHERE b.billing_id IS NULL
+        ORDER BY e.encounter_id
+    """)
+    unbilled = [row[0] for row in cursor.fetchall()]
+    billing_id = _max_id(cursor, 'billing', 'billing_id')
+    late = [(billing_id + i, encounter_id) + row[2:]
+            for i, (encounter_id, row) in enumerate(
+                zip(unbilled, billing_rows(len(unbilled))), 1)]
+    changed['late_billing'] = bulk_insert(cursor, 'billing', TABLE_COLUMNS['billing'],
+                                          late, load_data=False)
+
+    # New encounters with their diagnoses, procedures and (mostly) billing
+    encounter_offset = _max_id(cursor, 'encounters', 'encounter_id')
+    changed['encounters'] = bulk_insert(
+        cursor, 'encounters', TABLE_COLUMNS['encounters'],
+        _shifted(encounter_rows(patients, providers, batch_size), encounter_offset),
+        load_data=False)
+    changed['encounter_diagnoses'] = bulk_insert(
+        cursor, 'encounter_diagnoses', TABLE_COLUMNS['encounter_diagnoses'],
+        _shifted(encounter_diagnosis_rows(batch_size),
+                 _max_id(cursor, 'encounter_diagnoses', 'encounter_diagnosis_id'),
+                 encounter_offset),
+        load_data=False)
+    changed['encounter_procedures'] = bulk_insert(
+        cursor, 'encounter_procedures', TABLE_COLUMNS['encounter_procedures'],
+        _shifted(encounter_procedure_rows(batch_size),
+                 _max_id(cursor, 'encounter_procedures', 'encounter_procedure_id'),
+                 encounter_offset),
+        load_data=False)
+    billing_offset = billing_id + len(late)
+    changed['billing'] = bulk_insert(
+        cursor, 'billing', TABLE_COLUMNS['billing'],
+        (row for row in _shifted(billing_rows(batch_size), billing_offset, encounter_offset)
+         if random.random() >= mix['late_billing']),
+        load_data=False)
+    return changed
+
+
+def timed_pass(label, sampler, **etl_options):
+    """Run one ETL pass; returns its wall time, peak RSS and per-stage throughput"""
+    start = datetime.now()
+    started = time.perf_counter()
+    timings = run_etl(**etl_options)
+    seconds = time.perf_counter() - started
+    if timings is None:
+        raise RuntimeError(f"ETL pass '{label}' failed")
+
+    stages = {}
+    for task, t in timings.items():
+        rows = t['rows'] or 0
+        stages[task] = {
+            'seconds': round(t['seconds'], 4),
+            'rows': rows,
+            'rows_per_sec': round(rows / t['seconds'], 1) if t['seconds'] else None,
+            'peak_rss_mb': _mb(sampler.peak(t['start'], t['end'])),
+        }
+    rows = sum(stage['rows'] for stage in stages.values())
+    return {
+        'pass': label,
+        'seconds': round(seconds, 4),
+        'rows': rows,
+        'rows_per_sec': round(rows / seconds, 1) if seconds else None,
+        'peak_rss_mb': _mb(sampler.peak(start, datetime.now())),
+        'stages': stages,
+    }
+
+
+def benchmark_scale_factor(scale_factor, batches=DEFAULT_BATCHES, batch_size=DEFAULT_BATCH_SIZE,
+                           seed=0, vectorized=False, partition_by=None, **etl_options):
+    """Generate a dataset, then time the full pass and each incremental batch pass"""
+    counts = scaled_counts(scale_factor)
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        generate_all_data(counts, seed=seed, vectorized=vectorized)
+        setup_star_schema(partition_by=partition_by)
+        generate_seconds = time.perf_counter() - started
+
+        passes = [timed_pass('full', sampler, **etl_options)]
+
+        random.seed(seed + 1)
+        connection = get_connection()
+        if not connection:
+            raise RuntimeError("Failed to connect to database.")
+        cursor = connection.cursor()
+        try:
+            for batch in range(1, batches + 1):
+                changed = apply_change_batch(cursor, batch_size)
+                connection.commit()
+                result = timed_pass(f'incremental {batch}', sampler, **etl_options)
+                result['changes'] = changed
+                passes.append(result)
+        finally:
+            cursor.close()
+            connection.close()
+
+    return {
+        'scale_factor': scale_factor,
+        'counts': counts,
+        'generate_seconds': round(generate_seconds, 4),
+        'passes': passes,
+    }
+
+
+def run_etl_benchmark(scale_factors=DEFAULT_SCALE_FACTORS, batches=DEFAULT_BATCHES,
+                      batch_size=DEFAULT_BATCH_SIZE, seed=0, vectorized=False,
+                      partition_by=None, **etl_options):
+    """Benchmark every scale factor; returns the result document"""
+    results = {'started_at': datetime.now().isoformat(timespec='seconds'),
+               'batches': batches, 'batch_size': batch_size, 'seed': seed,
+               'partition_by': partition_by, 'etl_options': etl_options, 'runs': []}
+    for scale_factor in scale_factors:
+        print(f"Benchmarking ETL at scale factor {scale_factor}...")
+        results['runs'].append(benchmark_scale_factor(
+            scale_factor, batches, batch_size, seed, vectorized, partition_by, **etl_options))
+    return results
+
+
+def load_history(path):
+    """Earlier result documents of a history file (oldest first)"""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _summary(run):
+    """(full pass rows/sec, mean incremental pass rows/sec) of one scale factor run"""
+    full = run['passes'][0]['rows_per_sec']
+    incremental = [p['rows_per_sec'] for p in run['passes'][1:] if p['rows_per_sec']]
+    return full, sum(incremental) / len(incremental) if incremental else None
+
+
+def previous_runs(results, history):
+    """{scale_factor: run} from the latest earlier document with the same batch settings"""
+    previous = {}
+    for document in history:
+        if (document['batch_size'], document['batches']) != (results['batch_size'],
+                                                             results['batches']):
+            continue
+        for run in document['runs']:
+            previous[run['scale_factor']] = run
+    return previous
+
+
+def markdown_report(results, previous=None):
+    """Per scale factor summary (vs the previous comparable run) and per-stage details"""
+    previous = previous or {}
+
+    def change(now, before):
+        return f"{(now / before - 1) * 100:+.1f}%" if now and before else ""
+
+    lines = [f"# ETL benchmark ({results['started_at']})", "",
+             f"{results['batches']} incremental batches of {results['batch_size']} encounters "
+             f"per scale factor, seed {results['seed']}.", "",
+             "| Scale factor | Encounters | Full pass | Full rows/s | vs previous "
+             "| Incremental rows/s (mean) | vs previous | Peak RSS |",
+             "|--------------|------------|-----------|-------------|-------------"
+             "|---------------------------|-------------|----------|"]
+    for run in results['runs']:
+        full, incremental = _summary(run)
+        before = _summary(previous[run['scale_factor']]) if run['scale_factor'] in previous \
+            else (None, None)
+        peak = max((p['peak_rss_mb'] for p in run['passes'] if p['peak_rss_mb']), default=None)
+        lines.append(f"| {run['scale_factor']} | {run['counts']['encounters']:,} "
+                     f"| {run['passes'][0]['seconds']:.2f}s | {full or 0:,.0f} "
+                     f"| {change(full, before[0])} | {incremental or 0:,.0f} "
+                     f"| {change(incremental, before[1])} | {peak} MB |")
+
+    for run in results['runs']:
+        lines += ["", f"## Scale factor {run['scale_factor']}", "",
+                  "| Pass | Stage | Seconds | Rows | Rows/s | Peak RSS |",
+                  "|------|-------|---------|------|--------|----------|"]
+        for p in run['passes']:
+            lines.append(f"| {p['pass']} | (total) | {p['seconds']:.2f} | {p['rows']:,} "
+                         f"| {p['rows_per_sec'] or 0:,.0f} | {p['peak_rss_mb']} MB |")
+            for task, stage in p['stages'].items():
+                lines.append(f"| | {task} | {stage['seconds']:.2f} | {stage['rows']:,} "
+                             f"| {stage['rows_per_sec'] or 0:,.0f} | {stage['peak_rss_mb']} MB |")
+    return "\n".join(lines) + "\n"
+
+
+def write_results(results, output_dir):
+    """
+    Append results to <output_dir>/etl_bench.jsonl and write
+    etl_bench_<timestamp>.md; returns both paths
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    history_path = os.path.join(output_dir, HISTORY_FILE)
+    previous = previous_runs(results, load_history(history_path))
+    stamp = results['started_at'].replace(':', '').replace('-', '')
+    md_path = os.path.join(output_dir, f"etl_bench_{stamp}.md")
+    with open(history_path, 'a') as f:
+        f.write(json.dumps(results) + "\n")
+    with open(md_path, 'w') as f:
+        f.write(markdown_report(results, previous))
+    return history_path, md_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark full and incremental ETL passes")
+    parser.add_argument('--scale-factors', default=",".join(map(str, DEFAULT_SCALE_FACTORS)),
+                        help="comma-separated dataset scale factors (SF 1 = 50k encounters)")
+    parser.add_argument('--batches', type=int, default=DEFAULT_BATCHES,
+                        help="incremental change batches per scale factor")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="encounters appended per batch (other changes scale with it)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="random seed for the datasets and change batches")
+    parser.add_argument('--vectorized', action='store_true',
+                        help="generate the datasets with NumPy")
+    parser.add_argument('--partition-by', choices=GRANULARITIES, default=None,
+                        help="partition fact_encounters by date_key")
+    parser.add_argument('--parallel', action='store_true',
+                        help="run the ETL passes with the parallel task graph")
+    parser.add_argument('--output-dir', default='bench_results',
+                        help="directory for the JSON-lines history and markdown summary")
+    args = parser.parse_args()
+
+    results = run_etl_benchmark(
+        [float(sf) for sf in args.scale_factors.split(',')], args.batches, args.batch_size,
+        args.seed, args.vectorized, args.partition_by, parallel=args.parallel)
+    history_path, md_path = write_results(results, args.output_dir)
+    print(f"Results: {history_path}, {md_path}")
@@ -0,0 +1,255 @@
+"""
+Query Benchmark
+Runs the OLTP and star schema versions of the four analytic queries
+(every EXPLAIN ANALYZE statement in sql/oltp/queries.sql and
+sql/olap/queries.sql) and records, per query:
+
+- latency over N timed repetitions after W warmup runs (p50/p95/max)
+- rows examined (performance_schema statement history)
+- the EXPLAIN ANALYZE plan, parsed into a tree
+
+Results are written as JSON plus a markdown speedup table. With a baseline
+JSON from an earlier run, queries whose p50 grew by more than the threshold
+are flagged as regressions (and the command exits non-zero).
+
+Usage: python -m src.bench.queries --repeat 10 --output-dir bench_results
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import time
+from datetime import datetime
+
+from mysql.connector import Error
+
+from ..etl.load import get_connection
+
+SQL_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'sql')
+QUERY_FILES = {
+    'oltp': os.path.join(SQL_DIR, 'oltp', 'queries.sql'),
+    'star': os.path.join(SQL_DIR, 'olap', 'queries.sql'),
+}
+
+DEFAULT_WARMUP = 2
+DEFAULT_REPEAT = 10
+
+# p50 growth (fraction) flagged as a regression against a baseline
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+
+_QUERY_HEADER = re.compile(r'\bquery\s+(\d+)\b', re.IGNORECASE)
+_PLAN_LINE = re.compile(
+    r'^(?P<indent>\s*)-> (?P<operation>.*?)'
+    r'(?:\s+\(cost=(?P<cost>[\d.e+]+)(?: rows=(?P<estimated_rows>[\d.e+]+))?\))?'
+    r'(?:\s+\(actual time=(?P<first>[\d.]+)\.\.(?P<last>[\d.]+)'
+    r' rows=(?P<rows>[\d.e+]+) loops=(?P<loops>\d+)\))?'
+    r'(?:\s+\(never executed\))?\s*$'
+)
+
+
+def load_queries(path):
+    """
+    EXPLAIN ANALYZE statements of a query file as (name, sql) pairs, sql
+    without the EXPLAIN ANALYZE prefix. Names come from the nearest
+    preceding "QUERY n" comment; further variants of the same query are
+    named Qn.2, Qn.3, ...
+    """
+    queries = []
+    seen = {}
+    query_no = None
+    statement = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            code, _, comment = line.partition('--')
+            match = _QUERY_HEADER.search(comment)
+            if match and not statement:
+                query_no = match.group(1)
+            if code.strip():
+                statement.append(code.rstrip())
+            if code.rstrip().endswith(';'):
+                sql = "\n".join(statement).rstrip(';').strip()
+                statement = []
+                if sql.upper().startswith('EXPLAIN ANALYZE') and query_no:
+                    seen[query_no] = seen.get(query_no, 0) + 1
+                    name = f"Q{query_no}" if seen[query_no] == 1 else f"Q{query_no}.{seen[query_no]}"
+                    queries.append((name, sql[len('EXPLAIN ANALYZE'):].strip()))
+    return queries
+
+
+def parse_plan(text):
+    """Parse EXPLAIN ANALYZE tree output into nested dicts (children under 'children')"""
+    root = {'children': []}
+    stack = [(-1, root)]
+    for line in text.splitlines():
+        match = _PLAN_LINE.match(line)
+        if not match:
+            continue
+        node = {'operation': match.group('operation'), 'children': []}
+        for field, convert in (('cost', float), ('estimated_rows', float), ('first', float),
+                               ('last', float), ('rows', float), ('loops', int)):
+            if match.group(field) is not None:
+                key = {'first': 'actual_first_ms', 'last': 'actual_last_ms',
+                       'rows': 'actual_rows'}.get(field, field)
+                node[key] = convert(match.group(field))
+        depth = len(match.group('indent'))
+        while stack[-1][0] >= depth:
+            stack.pop()
+        stack[-1][1]['children'].append(node)
+        stack.append((depth, node))
+    return root['children'][0] if len(root['children']) == 1 else root
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def rows_examined(cursor):
+    """Rows examined by this session's last statement, or None without performance_schema"""
+    try:
+        cursor.execute("""
+            SELECT ROWS_EXAMINED FROM performance_schema.events_statements_history
+            WHERE THREAD_ID = PS_CURRENT_THREAD_ID()
+            ORDER BY EVENT_ID DESC LIMIT 1
+        """)
+        row = cursor.fetchone()
+        return int(row[0]) if row else None
+    except Error:
+        return None
+
+
+def benchmark_query(cursor, sql, warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT):
+    """Time one query; returns latency stats, rows examined/returned and the parsed plan"""
+    for _ in range(warmup):
+        cursor.execute(sql)
+        cursor.fetchall()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        timings.append(time.perf_counter() - started)
+    examined = rows_examined(cursor)
+
+    cursor.execute(f"EXPLAIN ANALYZE {sql}")
+    plan_text = cursor.fetchall()[0][0]
+    return {
+        'p50_ms': percentile(timings, 0.5) * 1000,
+        'p95_ms': percentile(timings, 0.95) * 1000,
+        'max_ms': max(timings) * 1000,
+        'timings_ms': [t * 1000 for t in timings],
+        'rows_returned': len(rows),
+        'rows_examined': examined,
+        'plan': parse_plan(plan_text),
+        'plan_text': plan_text,
+    }
+
+
+def run_benchmark(warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT, schemas=QUERY_FILES):
+    """Benchmark every query of every schema; returns the result document"""
+    connection = get_connection()
+    if not connection:
+        raise RuntimeError("Failed to connect to database.")
+    cursor = connection.cursor()
+    results = {'started_at': datetime.now().isoformat(timespec='seconds'),
+               'warmup': warmup, 'repeat': repeat, 'queries': {}}
+    try:
+        cursor.execute("SELECT VERSION()")
+        results['server_version'] = cursor.fetchone()[0]
+        for schema, path in schemas.items():
+            for name, sql in load_queries(path):
+                print(f"Benchmarking {schema} {name}...")
+                result = benchmark_query(cursor, sql, warmup, repeat)
+                result['sql'] = sql
+                results['queries'][f"{schema} {name}"] = result
+                print(f"  p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, "
+                      f"{result['rows_examined']} rows examined")
+    finally:
+        cursor.close()
+        connection.close()
+    return results
+
+
+def find_regressions(results, baseline, threshold=DEFAULT_REGRESSION_THRESHOLD):
+    """{query: (baseline p50, p50)} for queries whose p50 grew by more than threshold"""
+    regressions = {}
+    for key, result in results['queries'].items():
+        previous = baseline.get('queries', {}).get(key)
+        if previous and result['p50_ms'] > previous['p50_ms'] * (1 + threshold):
+            regressions[key] = (previous['p50_ms'], result['p50_ms'])
+    return regressions
+
+
+def markdown_report(results, regressions=None):
+    """Speedup table (OLTP p50 / star p50 per query and star variant) plus latency details"""
+    regressions = regressions or {}
+    queries = results['queries']
+    lines = [f"# Query benchmark ({results['started_at']})", "",
+             f"{results['repeat']} timed runs after {results['warmup']} warmup runs.", "",
+             "| Query | OLTP p50 | Star p50 | Speedup |",
+             "|-------|----------|----------|---------|"]
+    for key, star in queries.items():
+        schema, name = key.split(' ', 1)
+        if schema != 'star':
+            continue
+        oltp = queries.get(f"oltp {name.split('.')[0]}")
+        if oltp is None:
+            continue
+        speedup = oltp['p50_ms'] / star['p50_ms'] if star['p50_ms'] else float('inf')
+        lines.append(f"| {name} | {oltp['p50_ms']:.2f} ms | {star['p50_ms']:.2f} ms "
+                     f"| {speedup:.1f}x |")
+
+    lines += ["", "| Query | p50 | p95 | max | Rows examined | Rows returned | |",
+              "|-------|-----|-----|-----|---------------|---------------|-|"]
+    for key, result in queries.items():
+        flag = ""
+        if key in regressions:
+            before, after = regressions[key]
+            flag = f"REGRESSION (p50 was {before:.2f} ms)"
+        lines.append(f"| {key} | {result['p50_ms']:.2f} ms | {result['p95_ms']:.2f} ms "
+                     f"| {result['max_ms']:.2f} ms | {result['rows_examined']} "
+                     f"| {result['rows_returned']} | {flag} |")
+    return "\n".join(lines) + "\n"
+
+
+def write_results(results, output_dir, regressions=None):
+    """Write <output_dir>/query_bench_<timestamp>.json and .md; returns both paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = results['started_at'].replace(':', '').replace('-', '')
+    json_path = os.path.join(output_dir, f"query_bench_{stamp}.json")
+    md_path = os.path.join(output_dir, f"query_bench_{stamp}.md")
+    with open(json_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    with open(md_path, 'w') as f:
+        f.write(markdown_report(results, regressions))
+    return json_path, md_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark OLTP vs star schema queries")
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP,
+                        help="untimed runs per query before timing")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help="timed runs per query")
+    parser.add_argument('--output-dir', default='bench_results',
+                        help="directory for the JSON and markdown results")
+    parser.add_argument('--baseline', default=None,
+                        help="earlier JSON result to flag p50 regressions against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="p50 growth (fraction) counted as a regression")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.warmup, args.repeat)
+    regressions = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.threshold)
+    json_path, md_path = write_results(results, args.output_dir, regressions)
+    print(f"Results: {json_path}, {md_path}")
+    for key, (before, after) in regressions.items():
+        print(f"REGRESSION {key}: p50 {before:.2f} ms -> {after:.2f} ms")
+    raise SystemExit(1 if regressions else 0)
@@ -0,0 +1,369 @@
+"""
+Aggregate Facts
+agg_monthly_specialty pre-aggregates fact_encounters by (year, month,
+specialty_name, encounter_type_key) for the monthly dashboards (OLAP
+Queries 1 and 4), so they read a few hundred rows instead of the fact table.
+
+Additive measures (encounter counts, claim/allowed sums) are maintained
+incrementally as signed deltas: the fact load records the old values of
+the rows it is about to change, adds their new values afterwards, and
+applies the net change per group in one statement. Each transaction thus
+locks its groups once, in primary-key order, so concurrent fact chunks
+queue behind each other instead of deadlocking.
+
+Distinct patients are not additive, so each group keeps a HyperLogLog
+sketch in agg_monthly_specialty_patients: one row per non-empty register
+holding the longest run seen. Sketches merge by taking the MAX per
+register (across months, specialties, ...), and v_monthly_specialty turns
+them into an estimate (about 1.04 / sqrt(SKETCH_REGISTERS) relative error).
+
+rebuild_monthly_specialty recomputes everything, or a date_key range,
+from the fact table.
+
+agg_diagnosis_procedure_pair counts encounters per diagnosis-procedure pair
+(OLAP Query 2), in total and per month. It grows with the bridge tables:
+each run counts the pairs formed by bridge rows added since the previous
+one (tracked by bridge_id), so a top-N pairs query is an index scan on
+encounter_count instead of a join of both bridges.
+"""
+
+# HyperLogLog registers per group (a power of two); the low bits of the
+# 64-bit patient hash pick the register
+SKETCH_REGISTERS = 256
+_REGISTER_BITS = SKETCH_REGISTERS.bit_length() - 1
+
+# Bits left for the run length after the register bits
+_RUN_BITS = 64 - _REGISTER_BITS
+
+GROUP_COLUMNS = "year, month, specialty_name, encounter_type_key"
+
+
+def create_aggregate_tables(cursor):
+    """Create agg_monthly_specialty, its patient sketches and v_monthly_specialty"""
+    cursor.execute("""
+    CREATE TABLE agg_monthly_specialty (
+        year INT NOT NULL,
+        month INT NOT NULL,
+        specialty_name VARCHAR(100) NOT NULL,
+        encounter_type_key INT NOT NULL,
+        encounter_count INT NOT NULL DEFAULT 0,
+        billed_encounter_count INT NOT NULL DEFAULT 0,  -- total_allowed_amount > 0
+        total_claim_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+        total_allowed_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (year, month, specialty_name, encounter_type_key)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE agg_monthly_specialty_patients (
+        year INT NOT NULL,
+        month INT NOT NULL,
+        specialty_name VARCHAR(100) NOT NULL,
+        encounter_type_key INT NOT NULL,
+        register_no SMALLINT NOT NULL,
+        register_value TINYINT NOT NULL,
+        PRIMARY KEY (year, month, specialty_name, encounter_type_key, register_no)
+    )
+    """)
+    cursor.execute(f"""
+    CREATE OR REPLACE VIEW v_monthly_specialty AS
+    SELECT
+        a.year,
+        a.month,
+        MONTHNAME(MAKEDATE(a.year, 1) + INTERVAL a.month - 1 MONTH) AS month_name,
+        a.specialty_name,
+        et.encounter_type_name,
+        a.encounter_count,
+        a.billed_encounter_count,
+        a.total_claim_amount,
+        a.total_allowed_amount,
+        COALESCE(s.unique_patients, 0) AS unique_patients
+    FROM agg_monthly_specialty a
+    JOIN dim_encounter_type et ON a.encounter_type_key = et.encounter_type_key
+    LEFT JOIN (
+        SELECT {GROUP_COLUMNS}, {sketch_estimate_sql()} AS unique_patients
+        FROM agg_monthly_specialty_patients
+        GROUP BY {GROUP_COLUMNS}
+    ) s USING ({GROUP_COLUMNS})
+    """)
+    print("  - Created agg_monthly_specialty")
+
+
+def sketch_estimate_sql(registers='register_value'):
+    """
+    HyperLogLog estimate of one GROUP BY group of sketch rows (missing
+    registers are zero), with the linear-counting correction for small sets.
+    Merge sketches by grouping MAX(register_value) per register_no first.
+    """
+    m = SKETCH_REGISTERS
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = f"{alpha * m * m} / (SUM(POW(2, -{registers})) + {m} - COUNT(*))"
+    return (f"ROUND(IF({raw} <= {2.5 * m} AND COUNT(*) < {m}, "
+            f"{m} * LN({m} / ({m} - COUNT(*))), {raw}))")
+
+
+def _fact_groups(join_sql="", where_sql="TRUE"):
+    """FROM clause of fact rows with their aggregate group columns"""
+    return f"""
+        FROM fact_encounters f
+        {join_sql}
+        JOIN dim_date d ON f.date_key = d.date_key
+        JOIN dim_provider p ON f.provider_key = p.provider_key
+        WHERE {where_sql}
+    """
+
+
+MEASURE_COLUMNS = ("encounter_count, billed_encounter_count, "
+                   "total_claim_amount, total_allowed_amount")
+
+# Session-local net measure changes between subtract_/add_monthly_specialty
+DELTA_TABLE = "stg_agg_monthly_specialty_delta"
+
+
+def _measures_sql(source_sql, sign=1):
+    """SELECT of the group columns and signed measures of source_sql's fact rows"""
+    return f"""
+        SELECT
+            d.year,
+            d.month,
+            COALESCE(p.specialty_name, 'Unknown') AS specialty_name,
+            f.encounter_type_key,
+            {sign} * COUNT(*),
+            {sign} * SUM(f.total_allowed_amount > 0),
+            {sign} * SUM(f.total_claim_amount),
+            {sign} * SUM(f.total_allowed_amount)
+        {source_sql}
+        GROUP BY {GROUP_COLUMNS}
+    """
+
+
+def _upsert_measures(cursor, select_sql):
+    """Add select_sql's (group columns, measures) rows to agg_monthly_specialty"""
+    cursor.execute(f"""
+        INSERT INTO agg_monthly_specialty (
+            {GROUP_COLUMNS}, {MEASURE_COLUMNS}
+        )
+        {select_sql}
+        ORDER BY {GROUP_COLUMNS}
+        ON DUPLICATE KEY UPDATE
+            encounter_count = encounter_count + VALUES(encounter_count),
+            billed_encounter_count = billed_encounter_count + VALUES(billed_encounter_count),
+            total_claim_amount = total_claim_amount + VALUES(total_claim_amount),
+            total_allowed_amount = total_allowed_amount + VALUES(total_allowed_amount)
+    """)
+
+
+def _add_patients(cursor, source_sql):
+    """Merge the patients of source_sql's fact rows into the group sketches"""
+    # 64-bit hash of patient_key: low bits pick the register, the register
+    # keeps the longest run of leading zeros (+1) of the remaining bits
+    cursor.execute(f"""
+        INSERT INTO agg_monthly_specialty_patients (
+            {GROUP_COLUMNS}, register_no, register_value
+        )
+        SELECT
+            {GROUP_COLUMNS},
+            patient_hash & {SKETCH_REGISTERS - 1} AS register_no,
+            MAX(IF(patient_hash >> {_REGISTER_BITS} = 0, {_RUN_BITS + 1},
+                   {_RUN_BITS + 1} - LENGTH(BIN(patient_hash >> {_REGISTER_BITS}))))
+        FROM (
+            SELECT
+                d.year,
+                d.month,
+                COALESCE(p.specialty_name, 'Unknown') AS specialty_name,
+                f.encounter_type_key,
+                CAST(CONV(LEFT(MD5(f.patient_key), 16), 16, 10) AS UNSIGNED) AS patient_hash
+            {source_sql}
+        ) h
+        GROUP BY {GROUP_COLUMNS}, register_no
+        ORDER BY {GROUP_COLUMNS}, register_no
+        ON DUPLICATE KEY UPDATE
+            register_value = GREATEST(register_value, VALUES(register_value))
+    """)
+
+
+def subtract_monthly_specialty(cursor, keys_table):
+    """
+    Record the current fact rows of the encounter_ids in keys_table as
+    negative measures (before they are updated). Nothing is written to
+    agg_monthly_specialty until add_monthly_specialty.
+    """
+    source = _fact_groups(f"JOIN {keys_table} k ON k.encounter_id = f.encounter_id")
+    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {DELTA_TABLE}")
+    cursor.execute(f"""
+        CREATE TEMPORARY TABLE {DELTA_TABLE} (
+            year INT NOT NULL,
+            month INT NOT NULL,
+            specialty_name VARCHAR(100) NOT NULL,
+            encounter_type_key INT NOT NULL,
+            encounter_count INT NOT NULL,
+            billed_encounter_count INT NOT NULL,
+            total_claim_amount DECIMAL(14,2) NOT NULL,
+            total_allowed_amount DECIMAL(14,2) NOT NULL
+        )
+    """)
+    cursor.execute(f"""
+        INSERT INTO {DELTA_TABLE} ({GROUP_COLUMNS}, {MEASURE_COLUMNS})
+        {_measures_sql(source, sign=-1)}
+    """)
+
+
+def add_monthly_specialty(cursor, keys_table):
+    """
+    Add the fact rows of the encounter_ids in keys_table to the aggregate:
+    their new measures and the old ones recorded by subtract_monthly_specialty
+    are netted per group and applied with one ordered upsert (groups whose
+    measures did not change are not touched); their patients are merged into
+    the sketches.
+    """
+    source = _fact_groups(f"JOIN {keys_table} k ON k.encounter_id = f.encounter_id")
+    cursor.execute(f"""
+        INSERT INTO {DELTA_TABLE} ({GROUP_COLUMNS}, {MEASURE_COLUMNS})
+        {_measures_sql(source)}
+    """)
+    _upsert_measures(cursor, f"""
+        SELECT {GROUP_COLUMNS},
+               SUM(encounter_count), SUM(billed_encounter_count),
+               SUM(total_claim_amount), SUM(total_allowed_amount)
+        FROM {DELTA_TABLE}
+        GROUP BY {GROUP_COLUMNS}
+        HAVING SUM(encounter_count) <> 0 OR SUM(billed_encounter_count) <> 0
+            OR SUM(total_claim_amount) <> 0 OR SUM(total_allowed_amount) <> 0
+    """)
+    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {DELTA_TABLE}")
+    _add_patients(cursor, source)
+
+
+def _month_offset(year_month, months):
+    """YYYYMM shifted by a number of months"""
+    index = (year_month // 100) * 12 + year_month % 100 - 1 + months
+    return (index // 12) * 100 + index % 12 + 1
+
+
+def rebuild_monthly_specialty(cursor, date_from=None, date_to=None):
+    """
+    Recompute agg_monthly_specialty from fact_encounters, for every month or
+    only the months of date_key in [date_from, date_to). The range is widened
+    to whole months (the aggregate's grain), so a mid-month bound recomputes
+    its entire month. Returns the number of groups written.
+    """
+    fact_range = ["TRUE"]
+    month_range = ["TRUE"]
+    if date_from is not None:
+        first_month = int(date_from) // 100
+        fact_range.append(f"f.date_key >= {first_month * 100 + 1}")
+        month_range.append(f"year * 100 + month >= {first_month}")
+    if date_to is not None:
+        # Last month containing a day before date_to
+        last_month = int(date_to) // 100
+        if int(date_to) % 100 <= 1:
+            last_month = _month_offset(last_month, -1)
+        fact_range.append(f"f.date_key < {_month_offset(last_month, 1) * 100 + 1}")
+        month_range.append(f"year * 100 + month <= {last_month}")
+
+    for table in ('agg_monthly_specialty', 'agg_monthly_specialty_patients'):
+        cursor.execute(f"DELETE FROM {table} WHERE {' AND '.join(month_range)}")
+    source = _fact_groups(where_sql=" AND ".join(fact_range))
+    _upsert_measures(cursor, _measures_sql(source))
+    groups = cursor.rowcount
+    _add_patients(cursor, source)
+    return groups
+
+
+def create_pair_tables(cursor):
+    """Create the diagnosis-procedure pair aggregates (total and per month)"""
+    cursor.execute("""
+    CREATE TABLE agg_diagnosis_procedure_pair (
+        diagnosis_key INT NOT NULL,
+        procedure_key INT NOT NULL,
+        encounter_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (diagnosis_key, procedure_key),
+        INDEX idx_encounter_count (encounter_count)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE agg_diagnosis_procedure_pair_monthly (
+        year INT NOT NULL,
+        month INT NOT NULL,
+        diagnosis_key INT NOT NULL,
+        procedure_key INT NOT NULL,
+        encounter_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (year, month, diagnosis_key, procedure_key),
+        INDEX idx_month_count (year, month, encounter_count)
+    )
+    """)
+    print("  - Created agg_diagnosis_procedure_pair")
+
+
+def add_pair_links(cursor, diagnosis_ids, procedure_ids):
+    """
+    Count the diagnosis-procedure pairs formed by new bridge rows.
+    diagnosis_ids and procedure_ids are (last counted, newest) bridge_id
+    ranges. A pair is counted in the run where the later of its two bridge
+    rows is new: new diagnoses with every procedure up to the newest, plus
+    already counted diagnoses with the new procedures.
+    Returns the number of encounter pairs added.
+    """
+    (diagnosis_from, diagnosis_to), (procedure_from, procedure_to) = diagnosis_ids, procedure_ids
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_pair_links")
+    cursor.execute("""
+        CREATE TEMPORARY TABLE stg_pair_links (
+            diagnosis_key INT NOT NULL,
+            procedure_key INT NOT NULL,
+            date_key INT NOT NULL
+        )
+    """)
+    pair_source = """
+        INSERT INTO stg_pair_links (diagnosis_key, procedure_key, date_key)
+        SELECT {pair}, f.date_key
+        FROM {new} n
+        JOIN {other} o ON o.encounter_key = n.encounter_key
+        JOIN fact_encounters f ON f.encounter_key = n.encounter_key
+        WHERE n.bridge_id > %s AND n.bridge_id <= %s
+          AND o.bridge_id <= %s
+    """
+    cursor.execute(pair_source.format(pair="n.diagnosis_key, o.procedure_key",
+                                      new="bridge_encounter_diagnosis",
+                                      other="bridge_encounter_procedure"),
+                   (diagnosis_from, diagnosis_to, procedure_to))
+    pairs = cursor.rowcount
+    cursor.execute(pair_source.format(pair="o.diagnosis_key, n.procedure_key",
+                                      new="bridge_encounter_procedure",
+                                      other="bridge_encounter_diagnosis"),
+                   (procedure_from, procedure_to, diagnosis_from))
+    pairs += cursor.rowcount
+
+    cursor.execute("""
+        INSERT INTO agg_diagnosis_procedure_pair (diagnosis_key, procedure_key, encounter_count)
+        SELECT diagnosis_key, procedure_key, COUNT(*)
+        FROM stg_pair_links
+        GROUP BY diagnosis_key, procedure_key
+        ORDER BY diagnosis_key, procedure_key
+        ON DUPLICATE KEY UPDATE encounter_count = encounter_count + VALUES(encounter_count)
+    """)
+    cursor.execute("""
+        INSERT INTO agg_diagnosis_procedure_pair_monthly (
+            year, month, diagnosis_key, procedure_key, encounter_count
+        )
+        SELECT date_key DIV 10000, date_key DIV 100 MOD 100, diagnosis_key, procedure_key, COUNT(*)
+        FROM stg_pair_links
+        GROUP BY date_key DIV 10000, date_key DIV 100 MOD 100, diagnosis_key, procedure_key
+        ORDER BY 1, 2, 3, 4
+        ON DUPLICATE KEY UPDATE encounter_count = encounter_count + VALUES(encounter_count)
+    """)
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_pair_links")
+    return pairs
+
+
+def rebuild_pair_counts(cursor):
+    """
+    Recompute both pair aggregates from the bridge tables.
+    Returns the (diagnosis, procedure) bridge_ids counted up to.
+    """
+    cursor.execute("SELECT COALESCE(MAX(bridge_id), 0) FROM bridge_encounter_diagnosis")
+    diagnosis_to = cursor.fetchone()[0]
+    cursor.execute("SELECT COALESCE(MAX(bridge_id), 0) FROM bridge_encounter_procedure")
+    procedure_to = cursor.fetchone()[0]
+    cursor.execute("DELETE FROM agg_diagnosis_procedure_pair")
+    cursor.execute("DELETE FROM agg_diagnosis_procedure_pair_monthly")
+    add_pair_links(cursor, (0, diagnosis_to), (0, procedure_to))
+    return diagnosis_to, procedure_to
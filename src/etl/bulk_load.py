@@ -0,0 +1,135 @@
+"""
+Bulk Loading
+LOAD DATA LOCAL INFILE backend for rows built on the client (the data
+generators, dim_date and the row-by-row ETL paths).
+
+Rows are streamed into a temporary TSV file in MySQL's default LOAD DATA
+format (tab-separated, backslash escapes, \\N for NULL) and loaded with one
+LOAD DATA LOCAL INFILE per call, optionally with foreign-key and unique
+checks disabled for the session. The file is written as raw bytes (text as
+UTF-8, BINARY columns such as row_hash as-is) and loaded with CHARACTER SET
+binary, so no conversion happens on the way in.
+
+The connection must be opened with allow_local_infile=True. When the
+server has local_infile disabled, rows are inserted with batched
+executemany() instead.
+
+Note that LOAD DATA LOCAL skips rows with duplicate keys (with a warning)
+where INSERT would fail.
+"""
+
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from mysql.connector import Error
+
+# Rows per executemany() call on the fallback path
+DEFAULT_BATCH_SIZE = 5000
+
+_TEXT_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n',
+                               '\r': '\\r', '\0': '\\0'})
+_BYTE_ESCAPES = [(b'\\', b'\\\\'), (b'\t', b'\\t'), (b'\n', b'\\n'),
+                 (b'\r', b'\\r'), (b'\0', b'\\0')]
+
+
+def local_infile_enabled(cursor):
+    """True when the server accepts LOAD DATA LOCAL INFILE"""
+    try:
+        cursor.execute("SELECT @@GLOBAL.local_infile")
+        return bool(cursor.fetchone()[0])
+    except Error:
+        return False
+
+
+def tsv_field(value):
+    """Format one value as a LOAD DATA field (bytes)"""
+    if value is None:
+        return b'\\N'
+    if isinstance(value, bool):
+        return b'1' if value else b'0'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S').encode()
+    if isinstance(value, date):
+        return value.isoformat().encode()
+    if isinstance(value, timedelta):
+        return str(value).encode()
+    if isinstance(value, (bytes, bytearray)):
+        value = bytes(value)
+        for raw, escaped in _BYTE_ESCAPES:  # backslash first
+            value = value.replace(raw, escaped)
+        return value
+    return str(value).translate(_TEXT_ESCAPES).encode('utf-8')
+
+
+def write_tsv(rows, path):
+    """Stream rows into a LOAD DATA TSV file; returns the row count"""
+    count = 0
+    with open(path, 'wb') as f:
+        for row in rows:
+            f.write(b'\t'.join(tsv_field(value) for value in row))
+            f.write(b'\n')
+            count += 1
+    return count
+
+
+def insert_batches(cursor, table, columns, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """Insert rows with batched executemany(); returns the row count"""
+    query = (f"INSERT INTO {table} ({', '.join(columns)}) "
+             f"VALUES ({', '.join(['%s'] * len(columns))})")
+    rows = iter(rows)
+    count = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return count
+        cursor.executemany(query, batch)
+        count += len(batch)
+
+
+def load_data_file(cursor, table, columns, path):
+    """LOAD DATA LOCAL INFILE one TSV file; returns the rows loaded"""
+    cursor.execute(f"""
+        LOAD DATA LOCAL INFILE %s
+        INTO TABLE {table}
+        CHARACTER SET binary
+        ({', '.join(columns)})
+    """, (path,))
+    return cursor.rowcount
+
+
+def bulk_insert(cursor, table, columns, rows, load_data=True, disable_checks=False,
+                batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Insert rows (any iterable of tuples in `columns` order) into table.
+
+    load_data=True streams them through a temporary file and LOAD DATA LOCAL
+    INFILE, falling back to executemany() when local_infile is disabled;
+    load_data=False always uses executemany(). disable_checks turns off
+    foreign_key_checks/unique_checks for the duration of the load.
+    Returns the number of rows inserted.
+    """
+    if disable_checks:
+        cursor.execute("SELECT @@SESSION.foreign_key_checks, @@SESSION.unique_checks")
+        saved_checks = cursor.fetchone()
+        cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+    try:
+        if load_data and not local_infile_enabled(cursor):
+            print(f"  local_infile is disabled on the server; inserting {table} "
+                  f"with executemany")
+            load_data = False
+        if not load_data:
+            return insert_batches(cursor, table, columns, rows, batch_size)
+
+        fd, path = tempfile.mkstemp(prefix=f"{table}_", suffix='.tsv')
+        os.close(fd)
+        try:
+            write_tsv(rows, path)
+            return load_data_file(cursor, table, columns, path)
+        finally:
+            os.remove(path)
+    finally:
+        if disable_checks:
+            cursor.execute("SET SESSION foreign_key_checks = %s, unique_checks = %s",
+                           saved_checks)
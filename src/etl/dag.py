@@ -0,0 +1,124 @@
+"""
+ETL Task Graph Runner
+Executes a declarative task graph (task -> prerequisite tasks) with a bounded
+worker pool, records per-node timings and reports the critical path.
+
+A node is started as soon as all of its prerequisites have finished, so
+independent branches (e.g. both bridge loads and the late billing update)
+overlap instead of waiting for a whole stage.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+
+def topological_order(dependencies):
+    """Return the tasks in an order where every prerequisite comes first"""
+    remaining = {task: set(deps) for task, deps in dependencies.items()}
+    unknown = set().union(*remaining.values()) - set(remaining) if remaining else set()
+    if unknown:
+        raise ValueError(f"Unknown ETL dependencies: {sorted(unknown)}")
+
+    order = []
+    done = set()
+    while remaining:
+        ready = [task for task, deps in remaining.items() if deps <= done]
+        if not ready:
+            raise ValueError(f"Cycle in ETL dependencies: {sorted(remaining)}")
+        for task in ready:
+            order.append(task)
+            done.add(task)
+            del remaining[task]
+    return order
+
+
+def run_task_graph(dependencies, run_node, max_workers=1):
+    """
+    Run every task in the graph, at most max_workers at a time.
+
+    run_node(task) executes and commits one node and returns its row count.
+    Returns {task: {'start', 'end', 'seconds', 'rows'}} for finished nodes.
+    The first node error stops scheduling and is re-raised once the
+    in-flight nodes have finished.
+    """
+    order = topological_order(dependencies)
+    pending = {task: set(dependencies[task]) for task in order}
+    timings = {}
+    running = {}
+    failure = None
+
+    def timed(task):
+        start = datetime.now()
+        started = time.perf_counter()
+        rows = run_node(task)
+        seconds = time.perf_counter() - started
+        return {'start': start, 'end': datetime.now(), 'seconds': seconds, 'rows': rows}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            if failure is None:
+                ready = [task for task in order
+                         if task in pending and pending[task] <= set(timings)]
+                for task in ready[:max_workers - len(running)]:
+                    del pending[task]
+                    running[executor.submit(timed, task)] = task
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                task = running.pop(future)
+                try:
+                    timings[task] = future.result()
+                except Exception as e:
+                    failure = failure or e
+
+    if failure is not None:
+        raise failure
+    return timings
+
+
+def critical_path(dependencies, timings):
+    """
+    Longest chain of dependent tasks by measured duration.
+    Returns (tasks_on_path, total_seconds).
+    """
+    finish = {}
+    previous = {}
+    for task in topological_order(dependencies):
+        if task not in timings:
+            continue
+        deps = [dep for dep in dependencies[task] if dep in finish]
+        slowest = max(deps, key=lambda dep: finish[dep], default=None)
+        previous[task] = slowest
+        finish[task] = timings[task]['seconds'] + (finish[slowest] if slowest else 0)
+
+    if not finish:
+        return [], 0.0
+
+    task = max(finish, key=finish.get)
+    total = finish[task]
+    path = []
+    while task is not None:
+        path.append(task)
+        task = previous[task]
+    return list(reversed(path)), total
+
+
+def print_task_report(dependencies, timings):
+    """Print per-node timings and the critical path"""
+    print("\n" + "-" * 60)
+    print("ETL Task Timings")
+    print("-" * 60)
+    for task in topological_order(dependencies):
+        if task not in timings:
+            continue
+        t = timings[task]
+        rows = t['rows'] if t['rows'] is not None else 0
+        print(f"  {task:30} {t['start']:%H:%M:%S} - {t['end']:%H:%M:%S} "
+              f"{t['seconds']:>8.2f}s {rows:>10,} rows")
+
+    path, total = critical_path(dependencies, timings)
+    print(f"\n  Critical path ({total:.2f}s): {' -> '.join(path)}")
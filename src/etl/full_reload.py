@@ -0,0 +1,177 @@
+"""
+Full Reload with Deferred Secondary Indexes
+A full reload empties fact_encounters, the bridge tables and the aggregates
+built from them and loads them
+from scratch. Maintaining every secondary index row by row during that load
+is much slower than building each index once, sorted, afterwards, so:
+
+1. capture the non-unique secondary indexes and foreign keys of the tables
+   from information_schema
+2. drop the foreign keys (InnoDB will not drop an index a foreign key needs)
+   and the non-unique indexes; primary and unique keys stay, since the ETL
+   joins on them and INSERT IGNORE relies on them for de-duplication
+3. truncate the tables and reset their etl_metadata watermarks
+4. run the load
+5. rebuild all indexes of a table with one ALTER TABLE (optionally one table
+   per connection in parallel), then re-add the foreign keys
+
+Step 5 also runs when the load fails, so the schema is always restored.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Tables emptied by a full reload, children first (the aggregates are
+# rebuilt incrementally by the fact load)
+FULL_RELOAD_TABLES = [
+    'agg_monthly_specialty_patients',
+    'agg_monthly_specialty',
+    'fact_readmission',
+    'agg_diagnosis_procedure_pair_monthly',
+    'agg_diagnosis_procedure_pair',
+    'bridge_encounter_procedure',
+    'bridge_encounter_diagnosis',
+    'fact_encounters',
+]
+
+# etl_metadata rows whose watermark restarts with the reload
+FULL_RELOAD_METADATA = [
+    'fact_encounters',
+    'billing_updates',
+    'bridge_encounter_diagnosis',
+    'bridge_encounter_procedure',
+    'fact_readmission',
+    # bridge_id high-water marks of the pair aggregate (TRUNCATE restarts bridge_id)
+    'agg_pair_diagnosis_links',
+    'agg_pair_procedure_links',
+]
+
+
+def secondary_indexes(cursor, table):
+    """Non-unique secondary indexes of a table: {index_name: [column SQL, ...]}"""
+    cursor.execute("""
+        SELECT INDEX_NAME, COLUMN_NAME, SUB_PART
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND NON_UNIQUE = 1
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+    """, (table,))
+    indexes = {}
+    for index_name, column, sub_part in cursor.fetchall():
+        column_sql = f"{column}({sub_part})" if sub_part else column
+        indexes.setdefault(index_name, []).append(column_sql)
+    return indexes
+
+
+def foreign_keys(cursor, table):
+    """
+    Foreign keys of a table as dicts with name, columns, ref_table,
+    ref_columns, on_update and on_delete.
+    """
+    cursor.execute("""
+        SELECT k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME,
+               k.REFERENCED_COLUMN_NAME, r.UPDATE_RULE, r.DELETE_RULE
+        FROM information_schema.KEY_COLUMN_USAGE k
+        JOIN information_schema.REFERENTIAL_CONSTRAINTS r
+          ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA
+         AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME
+         AND r.TABLE_NAME = k.TABLE_NAME
+        WHERE k.TABLE_SCHEMA = DATABASE() AND k.TABLE_NAME = %s
+        ORDER BY k.CONSTRAINT_NAME, k.ORDINAL_POSITION
+    """, (table,))
+    keys = {}
+    for name, column, ref_table, ref_column, on_update, on_delete in cursor.fetchall():
+        key = keys.setdefault(name, {
+            'name': name, 'columns': [], 'ref_table': ref_table, 'ref_columns': [],
+            'on_update': on_update, 'on_delete': on_delete,
+        })
+        key['columns'].append(column)
+        key['ref_columns'].append(ref_column)
+    return list(keys.values())
+
+
+def prepare_full_reload(cursor, tables=FULL_RELOAD_TABLES):
+    """
+    Drop foreign keys and non-unique secondary indexes of tables, empty them
+    and reset their watermarks. Returns {table: {'indexes', 'foreign_keys'}}
+    for restore_full_reload.
+    """
+    deferred = {table: {'indexes': secondary_indexes(cursor, table),
+                        'foreign_keys': foreign_keys(cursor, table)}
+                for table in tables}
+
+    for table in tables:
+        keys = deferred[table]['foreign_keys']
+        if keys:
+            cursor.execute(f"ALTER TABLE {table} "
+                           + ", ".join(f"DROP FOREIGN KEY {key['name']}" for key in keys))
+
+    for table in tables:
+        cursor.execute(f"TRUNCATE TABLE {table}")
+        indexes = deferred[table]['indexes']
+        if indexes:
+            cursor.execute(f"ALTER TABLE {table} "
+                           + ", ".join(f"DROP INDEX {name}" for name in indexes))
+        print(f"  {table}: emptied, deferred {len(indexes)} indexes "
+              f"and {len(deferred[table]['foreign_keys'])} foreign keys")
+
+    cursor.execute(f"""
+        DELETE FROM etl_metadata
+        WHERE table_name IN ({', '.join(['%s'] * len(FULL_RELOAD_METADATA))})
+    """, FULL_RELOAD_METADATA)
+    return deferred
+
+
+def rebuild_indexes(cursor, table, indexes):
+    """Build all deferred indexes of one table in a single ALTER TABLE"""
+    if indexes:
+        cursor.execute(f"ALTER TABLE {table} " + ", ".join(
+            f"ADD INDEX {name} ({', '.join(columns)})" for name, columns in indexes.items()))
+
+
+def add_foreign_keys(cursor, table, keys):
+    """Re-add the dropped foreign keys of one table"""
+    if keys:
+        cursor.execute(f"ALTER TABLE {table} " + ", ".join(
+            f"ADD CONSTRAINT {key['name']} FOREIGN KEY ({', '.join(key['columns'])}) "
+            f"REFERENCES {key['ref_table']} ({', '.join(key['ref_columns'])}) "
+            f"ON UPDATE {key['on_update']} ON DELETE {key['on_delete']}"
+            for key in keys))
+
+
+def _rebuild_on_connection(connect, table, indexes):
+    connection = connect()
+    cursor = connection.cursor()
+    try:
+        rebuild_indexes(cursor, table, indexes)
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def restore_full_reload(cursor, deferred, connect=None, workers=1):
+    """
+    Rebuild the deferred indexes, then re-add the foreign keys (the loaded
+    rows reference existing keys, so they are not re-validated).
+    workers > 1 rebuilds up to that many tables at once, each on a new
+    connection from connect(). Returns the seconds spent.
+    """
+    started = time.perf_counter()
+    if workers > 1 and connect is not None:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_rebuild_on_connection, connect, table, spec['indexes'])
+                       for table, spec in deferred.items()]
+            for future in futures:
+                future.result()
+    else:
+        for table, spec in deferred.items():
+            rebuild_indexes(cursor, table, spec['indexes'])
+
+    cursor.execute("SELECT @@SESSION.foreign_key_checks")
+    foreign_key_checks = cursor.fetchone()[0]
+    cursor.execute("SET SESSION foreign_key_checks = 0")
+    try:
+        for table, spec in deferred.items():
+            add_foreign_keys(cursor, table, spec['foreign_keys'])
+    finally:
+        cursor.execute("SET SESSION foreign_key_checks = %s", (foreign_key_checks,))
+    return time.perf_counter() - started
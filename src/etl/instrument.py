@@ -0,0 +1,244 @@
+"""
+ETL Stage Instrumentation
+Wraps each task-graph loader (run_etl(instrumentation=...)) and records one
+metrics record per stage:
+
+- wall time and the loader's row count
+- statements sent through the stage's cursor (one per execute/executemany
+  call) and the parameter rows they carried (executemany_rows)
+- round trips: the server's Questions delta for the stage's session
+- rows read / written at the handler level (sum of Handler_read_* and of
+  Handler_write/update/delete) and every non-zero Handler_* and
+  Innodb_rows_* status delta
+
+Status is read with SHOW SESSION STATUS before and after the loader; the
+cost of one snapshot is measured and subtracted. Innodb_rows_* are
+server-global, so with --parallel they include concurrent stages (and any
+other client), as does work done on extra connections such as the chunked
+fact load's pool.
+
+Records go to sinks: JsonLinesSink appends one JSON object per stage,
+PrometheusTextfile writes the last run's metrics for node_exporter's
+textfile collector. Optionally each stage runs under cProfile (one .prof
+file per stage; cProfile allows one active profiler, so overlapping stages
+of a parallel run go unprofiled) and tracemalloc (peak Python allocation
+per stage, process-wide).
+"""
+
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+_STATUS_QUERY = r"""
+    SHOW SESSION STATUS
+    WHERE Variable_name = 'Questions'
+       OR Variable_name LIKE 'Handler\_%'
+       OR Variable_name LIKE 'Innodb\_rows\_%'
+"""
+
+ROWS_READ_STATUS = ('Handler_read_first', 'Handler_read_key', 'Handler_read_last',
+                    'Handler_read_next', 'Handler_read_prev', 'Handler_read_rnd',
+                    'Handler_read_rnd_next')
+ROWS_WRITTEN_STATUS = ('Handler_write', 'Handler_update', 'Handler_delete')
+
+
+def status_snapshot(cursor):
+    """{variable: value} of the Questions, Handler_* and Innodb_rows_* counters"""
+    cursor.execute(_STATUS_QUERY)
+    return {name: int(value) for name, value in cursor.fetchall() if str(value).isdigit()}
+
+
+def status_delta(before, after, overhead=None):
+    """after - before (less the overhead of one snapshot) for every counter"""
+    overhead = overhead or {}
+    return {name: value - before.get(name, 0) - overhead.get(name, 0)
+            for name, value in after.items()}
+
+
+class CountingCursor:
+    """Cursor proxy counting the statements executed through it"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.statements = 0
+        self.executemany_rows = 0
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self.statements += 1
+        return self._cursor.execute(operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        self.statements += 1
+        self.executemany_rows += len(seq_params)
+        return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class JsonLinesSink:
+    """Append each stage record as one JSON line"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        with self._lock, open(self.path, 'a') as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+    def close(self):
+        pass
+
+
+class PrometheusTextfile:
+    """Write the run's stage metrics in the Prometheus text format on close"""
+
+    GAUGES = (
+        ('seconds', 'Wall time of the ETL stage'),
+        ('rows', 'Rows reported by the ETL stage loader'),
+        ('statements', 'Statements executed by the ETL stage'),
+        ('executemany_rows', 'Parameter rows sent through executemany by the ETL stage'),
+        ('round_trips', 'Client round trips (Questions) of the ETL stage'),
+        ('rows_read', 'Handler-level rows read by the ETL stage'),
+        ('rows_written', 'Handler-level rows written by the ETL stage'),
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self.records = []
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def render(self):
+        lines = []
+        for field, help_text in self.GAUGES:
+            lines += [f"# HELP etl_stage_{field} {help_text}",
+                      f"# TYPE etl_stage_{field} gauge"]
+            for record in self.records:
+                lines.append(f'etl_stage_{field}{{stage="{record["stage"]}"}} '
+                             f'{record[field] or 0}')
+        lines += ["# HELP etl_stage_status_delta Server status counter delta of the ETL stage",
+                  "# TYPE etl_stage_status_delta gauge"]
+        for record in self.records:
+            for name, value in record['status'].items():
+                lines.append(f'etl_stage_status_delta{{stage="{record["stage"]}",'
+                             f'variable="{name}"}} {value}')
+        lines += ["# HELP etl_stage_failed 1 if the ETL stage raised",
+                  "# TYPE etl_stage_failed gauge"]
+        for record in self.records:
+            lines.append(f'etl_stage_failed{{stage="{record["stage"]}"}} '
+                         f'{int(record["error"] is not None)}')
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        # Write then rename so the collector never reads a partial file
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            text = self.render()
+        with open(temp_path, 'w') as f:
+            f.write(text)
+        os.replace(temp_path, self.path)
+
+
+class Instrumentation:
+    """Per-stage metrics collection around ETL loaders"""
+
+    def __init__(self, sinks=(), profile_dir=None, trace_memory=False):
+        self.sinks = list(sinks)
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.run_started = datetime.now().isoformat(timespec='seconds')
+        self.records = []
+        self._profile_lock = threading.Lock()
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+        self._started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+    def wrap(self, stage, loader):
+        """loader(cursor) wrapped to record the stage's metrics"""
+        def instrumented(cursor):
+            return self.run_stage(stage, loader, cursor)
+        return instrumented
+
+    def run_stage(self, stage, loader, cursor):
+        first = status_snapshot(cursor)
+        before = status_snapshot(cursor)
+        counting = CountingCursor(cursor)
+        profiler = None
+        if self.profile_dir and self._profile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+
+        start = datetime.now()
+        started = time.perf_counter()
+        rows, error = None, None
+        try:
+            if profiler:
+                profiler.enable()
+            try:
+                rows = loader(counting)
+            finally:
+                if profiler:
+                    profiler.disable()
+            return rows
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            profile_path = None
+            if profiler:
+                profile_path = os.path.join(self.profile_dir, f"{stage}.prof")
+                profiler.dump_stats(profile_path)
+                self._profile_lock.release()
+            delta = {}
+            if error is None:
+                delta = status_delta(before, status_snapshot(cursor),
+                                     status_delta(first, before))
+            self._emit({
+                'run_started': self.run_started,
+                'stage': stage,
+                'start': start.isoformat(),
+                'end': datetime.now().isoformat(),
+                'seconds': round(seconds, 4),
+                'rows': rows,
+                'statements': counting.statements,
+                'executemany_rows': counting.executemany_rows,
+                'round_trips': delta.get('Questions'),
+                'rows_read': sum(delta.get(name, 0) for name in ROWS_READ_STATUS)
+                             if delta else None,
+                'rows_written': sum(delta.get(name, 0) for name in ROWS_WRITTEN_STATUS)
+                                if delta else None,
+                'status': {name: value for name, value in delta.items()
+                           if value and name != 'Questions'},
+                'traced_peak_bytes': tracemalloc.get_traced_memory()[1]
+                                     if self.trace_memory else None,
+                'profile': profile_path,
+                'error': str(error) if error is not None else None,
+            })
+
+    def _emit(self, record):
+        self.records.append(record)
+        for sink in self.sinks:
+            sink.emit(record)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+        if self._started_tracing:
+            tracemalloc.stop()
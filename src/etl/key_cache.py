@@ -0,0 +1,158 @@
+"""
+Dimension Key Cache
+Client-side natural id -> current surrogate key maps for the dimensions
+the fact load resolves (patient, provider, department, encounter type).
+
+With a cache, the fact load keys its rows in Python and writes them to a
+staging table, so the upsert into fact_encounters is a single-table
+INSERT ... SELECT instead of the multi-way dimension join (see
+insert_fact_encounters). The maps are warmed once from the dimensions
+(current versions only) and then kept current in place: the row-by-row
+SCD2 loaders record the key of each version they insert one at a time
+(lastrowid); versions written in bulk (LOAD DATA, the set-based
+INSERT ... SELECT merge) return no keys, so those loaders re-read the
+current keys of the natural ids they staged, as dim_department does after
+its upsert. A cache that is not yet warm ignores updates, as the
+warm-up reads everything anyway, so one cache can be kept across
+micro-batch runs and only pays the full read once.
+
+Integer ids up to a little past the highest one seen are stored in an
+array indexed by id (8 bytes per id); anything else (e.g. the encounter
+type names) falls back to a dict.
+"""
+
+import threading
+from array import array
+
+# dimension -> (natural key column, surrogate key column, SCD2 current-version flag)
+CACHED_DIMENSIONS = {
+    'dim_patient': ('patient_id', 'patient_key', 'is_current'),
+    'dim_provider': ('provider_id', 'provider_key', 'is_current'),
+    'dim_department': ('department_id', 'department_key', None),
+    'dim_encounter_type': ('encounter_type_name', 'encounter_type_key', None),
+}
+
+# Ids a dense map may skip past its current size before turning into a dict
+DENSE_SLACK = 1024
+
+# Natural ids per IN list when refreshing keys
+REFRESH_BATCH_SIZE = 1000
+
+
+class KeyMap:
+    """natural id -> surrogate key (0 and negative keys are not stored)"""
+
+    def __init__(self):
+        self._keys = array('q')  # indexed by id, 0 = no key
+        self._dict = None
+        self._size = 0
+
+    def __setitem__(self, natural_id, key):
+        if self._dict is None:
+            if isinstance(natural_id, int) and 0 <= natural_id < 2 * len(self._keys) + DENSE_SLACK:
+                if natural_id >= len(self._keys):
+                    self._keys.frombytes(bytes(8 * (natural_id + 1 - len(self._keys))))
+                self._size += not self._keys[natural_id]
+                self._keys[natural_id] = key
+                return
+            self._dict = {i: k for i, k in enumerate(self._keys) if k}
+            self._keys = array('q')
+        self._dict[natural_id] = key
+        self._size = len(self._dict)
+
+    def get(self, natural_id):
+        if self._dict is not None:
+            return self._dict.get(natural_id)
+        if isinstance(natural_id, int) and 0 <= natural_id < len(self._keys):
+            return self._keys[natural_id] or None
+        return None
+
+    def __len__(self):
+        return self._size
+
+
+class DimensionKeyCache:
+    """Current surrogate keys of the cached dimensions"""
+
+    def __init__(self, dimensions=CACHED_DIMENSIONS):
+        self.dimensions = dimensions
+        self.maps = {}
+        self._lock = threading.Lock()
+
+    @property
+    def warm(self):
+        return len(self.maps) == len(self.dimensions)
+
+    def _current(self, dimension, alias=''):
+        flag = self.dimensions[dimension][2]
+        return f"{alias}{flag} = TRUE" if flag else "TRUE"
+
+    def _read(self, cursor, dimension, natural_ids=None):
+        natural_key, surrogate_key, _ = self.dimensions[dimension]
+        current = self._current(dimension)
+        if natural_ids is None:
+            cursor.execute(f"SELECT {natural_key}, {surrogate_key} FROM {dimension} "
+                           f"WHERE {current}")
+            return cursor.fetchall()
+        natural_ids = list(natural_ids)
+        rows = []
+        for start in range(0, len(natural_ids), REFRESH_BATCH_SIZE):
+            batch = natural_ids[start:start + REFRESH_BATCH_SIZE]
+            cursor.execute(f"""
+                SELECT {natural_key}, {surrogate_key} FROM {dimension}
+                WHERE {current} AND {natural_key} IN ({', '.join(['%s'] * len(batch))})
+            """, tuple(batch))
+            rows += cursor.fetchall()
+        return rows
+
+    def ensure_warm(self, cursor):
+        """Read every cached dimension's current keys (once)"""
+        with self._lock:
+            for dimension in self.dimensions:
+                if dimension not in self.maps:
+                    self.reload(cursor, dimension)
+
+    def reload(self, cursor, dimension):
+        """Re-read one dimension's keys completely"""
+        keys = KeyMap()
+        for natural_id, key in self._read(cursor, dimension):
+            keys[natural_id] = key
+        self.maps[dimension] = keys
+
+    def record(self, dimension, natural_id, key):
+        """Store the key of a version just inserted (no-op until warm)"""
+        if dimension in self.maps:
+            self.maps[dimension][natural_id] = key
+
+    def refresh(self, cursor, dimension, natural_ids):
+        """Re-read the current keys of natural_ids (no-op until warm)"""
+        if dimension not in self.maps:
+            return
+        keys = self.maps[dimension]
+        for natural_id, key in self._read(cursor, dimension, natural_ids):
+            keys[natural_id] = key
+
+    def refresh_from(self, cursor, dimension, select_ids_sql, params=()):
+        """refresh() for the natural ids returned by select_ids_sql"""
+        if dimension not in self.maps:
+            return
+        natural_key, surrogate_key, _ = self.dimensions[dimension]
+        cursor.execute(f"""
+            SELECT d.{natural_key}, d.{surrogate_key} FROM {dimension} d
+            JOIN ({select_ids_sql}) changed ON changed.{natural_key} = d.{natural_key}
+            WHERE {self._current(dimension, 'd.')}
+        """, params)
+        keys = self.maps[dimension]
+        for natural_id, key in cursor.fetchall():
+            keys[natural_id] = key
+
+    def lookup(self, dimension, natural_id):
+        return self.maps[dimension].get(natural_id)
+
+    def clear(self):
+        """Forget every map (after a rolled-back load); the next use re-warms"""
+        with self._lock:
+            self.maps = {}
+
+    def sizes(self):
+        return {dimension: len(keys) for dimension, keys in self.maps.items()}
@@ -3,16 +3,43 @@ Healthcare Analytics ETL Pipeline
 Extracts data from OLTP, transforms attributes, and loads into Star Schema.
 
 Features:
-- Incremental loading (only new/changed records since last load)
+- Incremental loading (only new/changed records since last load, via a
+  single indexed updated_at watermark predicate)
 - SCD Type 2 for dim_patient and dim_provider (tracks history)
 - SCD Type 1 for other dimensions (overwrite)
 - Late-arriving fact handling for billing data
+- Incrementally maintained monthly specialty aggregate (agg_monthly_specialty)
+- Readmission links (fact_readmission) recomputed for the patients each load touches
+- Diagnosis-procedure pair counts (agg_diagnosis_procedure_pair) grown with the bridges
+- Declarative task graph with per-task timing and an optional parallel (pooled) mode
+- Full-reload mode that defers fact/bridge secondary indexes until after the load
+- Append-only run history (etl_run_log/etl_stage_log) with a report command
+- Optional client-side surrogate-key cache for the fact load (src/etl/key_cache.py)
+- Optional per-stage metrics (JSON lines / Prometheus textfile) and profiling hooks
 """
 
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
 from datetime import datetime, date
 
+from .aggregates import (
+    add_monthly_specialty, subtract_monthly_specialty, rebuild_monthly_specialty,
+    add_pair_links, rebuild_pair_counts,
+)
+from .bulk_load import bulk_insert
+from .dag import run_task_graph, print_task_report
+from .extract import DEFAULT_FETCH_SIZE, extraction_window, window_sql, window_params, stream_rows
+from .full_reload import prepare_full_reload, restore_full_reload
+from .instrument import Instrumentation, JsonLinesSink, PrometheusTextfile
+from .key_cache import DimensionKeyCache
+from .partitions import table_partitions, partition_of, partition_predicate
+from .run_log import RunLog
+from .scd2 import apply_scd2, row_hash_expression, PATIENT_SCD2, PROVIDER_SCD2
+
 # Configuration - matches docker-compose.yml and .env settings
 DB_CONFIG = {
     'host': 'localhost',
@@ -25,54 +52,172 @@ DB_CONFIG = {
 # Default timestamp for first-ever load (loads everything)
 INITIAL_LOAD_TIMESTAMP = '1900-01-01 00:00:00'
 
+# SCD Type 2 strategy for dim_patient/dim_provider: True = bulk engine, False = row-by-row
+USE_SET_BASED_SCD2 = True
+
+# encounter_id range per transaction for the chunked fact load
+DEFAULT_FACT_CHUNK_SIZE = 10000
+
+# fact_encounters columns written by the fact load
+FACT_COLUMNS = """encounter_id, date_key, discharge_date_key, patient_key, provider_key,
+            department_key, encounter_type_key, encounter_date, discharge_date,
+            diagnosis_count, procedure_count, total_claim_amount, total_allowed_amount,
+            claim_status, length_of_stay_days"""
+FACT_COLUMN_NAMES = tuple(column.strip() for column in FACT_COLUMNS.split(','))
+
+# Days after discharge within which the first later inpatient admission
+# counts as a readmission (fact_readmission.is_readmission)
+READMISSION_WINDOW_DAYS = 30
+
+# How a partitioned fact load applies rows for partitions older than the newest
+# loaded date: upsert them ('insert'), upsert then REBUILD/ANALYZE the partition
+# ('rebuild'), or rebuild the partition from OLTP and EXCHANGE it in ('exchange')
+LATE_PARTITION_MODES = ('insert', 'rebuild', 'exchange')
+
+# Column order of the row-by-row SCD2 loaders' new versions (bulk_load=True)
+DIM_PATIENT_COLUMNS = (
+    'patient_id', 'first_name', 'last_name', 'full_name', 'date_of_birth',
+    'gender', 'gender_description', 'age', 'age_group', 'mrn', 'row_hash',
+    'effective_date', 'end_date', 'is_current',
+)
+DIM_PROVIDER_COLUMNS = (
+    'provider_id', 'first_name', 'last_name', 'full_name', 'credential',
+    'specialty_id', 'specialty_name', 'specialty_code',
+    'department_id', 'department_name', 'row_hash',
+    'effective_date', 'end_date', 'is_current',
+)
+
 
-def get_connection():
-    """Create database connection"""
+def get_connection(**options):
+    """Create database connection (options override DB_CONFIG, e.g. allow_local_infile)"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = mysql.connector.connect(**DB_CONFIG, **options)
         return connection
     except Error as e:
         print(f"Error connecting to MySQL: {e}")
         return None
 
 
-def get_last_load_timestamp(cursor, table_name):
-    """Get the last load timestamp for a table from etl_metadata"""
+def get_watermark(cursor, table_name):
+    """
+    Get the high-water mark (last_load_timestamp, last_load_key) of the
+    source rows read by the previous load of a table.
+    """
     cursor.execute("""
-        SELECT last_load_timestamp FROM etl_metadata WHERE table_name = %s
+        SELECT last_load_timestamp, last_load_key FROM etl_metadata WHERE table_name = %s
     """, (table_name,))
     result = cursor.fetchone()
     if result:
-        return result[0]
-    return datetime.strptime(INITIAL_LOAD_TIMESTAMP, '%Y-%m-%d %H:%M:%S')
+        return result[0], result[1]
+    return datetime.strptime(INITIAL_LOAD_TIMESTAMP, '%Y-%m-%d %H:%M:%S'), None
+
 
+def get_window(cursor, table_name, source_table, key_column, cutoff=None):
+    """Open the incremental extraction window of a load (see src/etl/extract.py)"""
+    watermark = get_watermark(cursor, table_name)
+    return extraction_window(cursor, watermark, source_table, key_column, cutoff=cutoff)
 
-def update_etl_metadata(cursor, table_name, records_loaded, load_type='INCREMENTAL'):
-    """Update the ETL metadata after a successful load"""
+
+def update_etl_metadata(cursor, table_name, records_loaded, load_type='INCREMENTAL',
+                        watermark=None, new=0, changed=0, unchanged=0):
+    """
+    Update the ETL metadata after a successful load.
+    watermark is the (updated_at, key) high-water mark of the rows actually
+    read (NOW() when omitted). new/changed/unchanged split the extracted rows
+    so a slow run can be told apart from a rescan. Any chunked-load
+    checkpoint is cleared.
+    """
+    load_timestamp, load_key = watermark or (None, None)
     cursor.execute("""
-        INSERT INTO etl_metadata (table_name, last_load_timestamp, records_loaded, load_type)
-        VALUES (%s, NOW(), %s, %s)
+        INSERT INTO etl_metadata (table_name, last_load_timestamp, last_load_key,
+                                  records_loaded, load_type,
+                                  records_new, records_changed, records_unchanged)
+        VALUES (%s, COALESCE(%s, NOW()), %s, %s, %s, %s, %s, %s)
         ON DUPLICATE KEY UPDATE 
-            last_load_timestamp = NOW(),
-            records_loaded = %s,
-            load_type = %s
-    """, (table_name, records_loaded, load_type, records_loaded, load_type))
+            last_load_timestamp = VALUES(last_load_timestamp),
+            last_load_key = VALUES(last_load_key),
+            records_loaded = VALUES(records_loaded),
+            load_type = VALUES(load_type),
+            records_new = VALUES(records_new),
+            records_changed = VALUES(records_changed),
+            records_unchanged = VALUES(records_unchanged),
+            resume_key = NULL,
+            resume_started_at = NULL
+    """, (table_name, load_timestamp, load_key, records_loaded, load_type,
+          new, changed, unchanged))
+
+
+def classify_changes(cursor, source_table, dim_table, natural_key, compare_columns, window):
+    """
+    Count the extracted rows of an SCD Type 1 source as (new, changed, unchanged)
+    against the dimension, using the same extraction window as the load.
+    """
+    unchanged_check = " AND ".join(f"d.{col} <=> src.{col}" for col in compare_columns)
+    cursor.execute(f"""
+        SELECT 
+            COUNT(*),
+            COALESCE(SUM(d.{natural_key} IS NULL), 0),
+            COALESCE(SUM(d.{natural_key} IS NOT NULL AND NOT ({unchanged_check})), 0)
+        FROM {source_table} src
+        LEFT JOIN {dim_table} d ON d.{natural_key} = src.{natural_key}
+        WHERE {window_sql(window, 'src')}
+    """, window_params(window))
+    total, new, changed = cursor.fetchone()
+    return int(new), int(changed), int(total - new - changed)
+
 
+def load_scd2_dimension(cursor, spec, label, key_cache=None):
+    """Load an SCD Type 2 dimension through the bulk SCD2 engine"""
+    table = spec['table']
+    print(f"Loading {table} (SCD Type 2, set-based)...")
+    
+    window = get_window(cursor, table, spec['watermark_table'], spec['watermark_key'])
+    totals = apply_scd2(cursor, spec, window, key_cache=key_cache)
+    records_processed = totals['new'] + totals['changed']
+    
+    update_etl_metadata(cursor, table, records_processed,
+                        watermark=window['high_water'],
+                        new=totals['new'],
+                        changed=totals['changed'] + totals['type1_updated'],
+                        unchanged=totals['unchanged'])
+    print(f"  Processed {records_processed} {label} "
+          f"({totals['new']} new, {totals['changed']} changed, "
+          f"{totals['type1_updated']} Type 1 updates, {totals['unchanged']} unchanged)")
+    return records_processed
 
-def load_dim_patient(cursor):
+
+def load_dim_patient(cursor, set_based=USE_SET_BASED_SCD2, bulk_load=False, key_cache=None):
     """
     Load patient dimension with SCD Type 2 logic.
     - New patients: INSERT with is_current=TRUE
     - Changed patients: Close old row, INSERT new row
     - Unchanged: Skip
+
+    set_based=True runs the bulk SCD2 engine (src/etl/scd2.py); False keeps
+    the original row-by-row path so the two can be compared. bulk_load only
+    applies to the row-by-row path. key_cache is kept current with the
+    versions inserted.
+    """
+    if set_based:
+        return load_scd2_dimension(cursor, PATIENT_SCD2, 'patients', key_cache)
+    return load_dim_patient_row_by_row(cursor, bulk_load, key_cache)
+
+
+def load_dim_patient_row_by_row(cursor, bulk_load=False, key_cache=None):
+    """
+    Original row-by-row SCD Type 2 load for dim_patient.
+    One SELECT plus one or two writes per changed patient; the change set
+    is streamed (src/etl/extract.py) rather than fetched all at once.
+    bulk_load=True collects the new versions and writes them with
+    LOAD DATA LOCAL INFILE (src/etl/bulk_load.py) instead of one INSERT each.
     """
-    print("Loading dim_patient (SCD Type 2)...")
+    print("Loading dim_patient (SCD Type 2, row-by-row)...")
     
-    last_load = get_last_load_timestamp(cursor, 'dim_patient')
+    window = get_window(cursor, 'dim_patient', 'patients', 'patient_id')
     today = date.today()
     
-    # Get new/changed patients from OLTP
-    cursor.execute("""
+    # Stream new/changed patients from OLTP in bounded batches
+    patients = stream_rows(get_connection(), f"""
         SELECT 
             patient_id, first_name, last_name, date_of_birth, gender, mrn,
             CONCAT(first_name, ' ', last_name) AS full_name,
@@ -84,13 +229,40 @@ def load_dim_patient(cursor):
                 WHEN TIMESTAMPDIFF(YEAR, date_of_birth, CURDATE()) < 55 THEN '35-54'
                 WHEN TIMESTAMPDIFF(YEAR, date_of_birth, CURDATE()) < 75 THEN '55-74'
                 ELSE '75+'
-            END AS age_group
+            END AS age_group,
+            {row_hash_expression(PATIENT_SCD2)} AS row_hash
         FROM patients
-        WHERE updated_at >= %s OR created_at >= %s
-    """, (last_load, last_load))
+        WHERE {window_sql(window)}
+    """, window_params(window))
+    new = changed = unchanged = 0
+    versions = []
+    touched = []
     
-    patients = cursor.fetchall()
-    records_processed = 0
+    def insert_version(patient):
+        values = (patient[0], patient[1], patient[2], patient[6], patient[3],
+                  patient[4], patient[7], patient[8], patient[9], patient[5], patient[10], today)
+        if not bulk_load:
+            cursor.execute("""
+                INSERT INTO dim_patient (
+                    patient_id, first_name, last_name, full_name, date_of_birth,
+                    gender, gender_description, age, age_group, mrn, row_hash,
+                    effective_date, end_date, is_current
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, '9999-12-31', TRUE)
+            """, values)
+            return cursor.lastrowid
+        versions.append(values + ('9999-12-31', True))
+        if len(versions) >= DEFAULT_FETCH_SIZE:
+            bulk_insert(cursor, 'dim_patient', DIM_PATIENT_COLUMNS, versions)
+            versions.clear()
+    
+    def record_version(patient):
+        key = insert_version(patient)
+        if key_cache is None:
+            return
+        if key is not None:
+            key_cache.record('dim_patient', patient[0], key)
+        else:
+            touched.append(patient[0])  # bulk-loaded: key known after the load
     
     for patient in patients:
         patient_id = patient[0]
@@ -105,15 +277,8 @@ def load_dim_patient(cursor):
         
         if existing is None:
             # NEW patient - insert
-            cursor.execute("""
-                INSERT INTO dim_patient (
-                    patient_id, first_name, last_name, full_name, date_of_birth,
-                    gender, gender_description, age, age_group, mrn,
-                    effective_date, end_date, is_current
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, '9999-12-31', TRUE)
-            """, (patient[0], patient[1], patient[2], patient[6], patient[3],
-                  patient[4], patient[7], patient[8], patient[9], patient[5], today))
-            records_processed += 1
+            record_version(patient)
+            new += 1
         else:
             # Check if anything changed (SCD Type 2)
             if (existing[1] != patient[1] or existing[2] != patient[2] or 
@@ -128,46 +293,89 @@ def load_dim_patient(cursor):
                 """, (today, existing[0]))
                 
                 # Insert new version
-                cursor.execute("""
-                    INSERT INTO dim_patient (
-                        patient_id, first_name, last_name, full_name, date_of_birth,
-                        gender, gender_description, age, age_group, mrn,
-                        effective_date, end_date, is_current
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, '9999-12-31', TRUE)
-                """, (patient[0], patient[1], patient[2], patient[6], patient[3],
-                      patient[4], patient[7], patient[8], patient[9], patient[5], today))
-                records_processed += 1
-    
-    update_etl_metadata(cursor, 'dim_patient', records_processed)
+                record_version(patient)
+                changed += 1
+            else:
+                unchanged += 1
+    
+    if versions:
+        bulk_insert(cursor, 'dim_patient', DIM_PATIENT_COLUMNS, versions)
+    if touched:
+        key_cache.refresh(cursor, 'dim_patient', touched)
+    
+    records_processed = new + changed
+    update_etl_metadata(cursor, 'dim_patient', records_processed,
+                        watermark=window['high_water'], new=new, changed=changed, unchanged=unchanged)
     print(f"  Processed {records_processed} patients (new/changed)")
+    return records_processed
 
 
-def load_dim_provider(cursor):
+def load_dim_provider(cursor, set_based=USE_SET_BASED_SCD2, bulk_load=False, key_cache=None):
     """
     Load provider dimension with SCD Type 2 logic.
     Critical for tracking specialty changes over time.
     """
-    print("Loading dim_provider (SCD Type 2)...")
+    if set_based:
+        return load_scd2_dimension(cursor, PROVIDER_SCD2, 'providers', key_cache)
+    return load_dim_provider_row_by_row(cursor, bulk_load, key_cache)
+
+
+def load_dim_provider_row_by_row(cursor, bulk_load=False, key_cache=None):
+    """
+    Original row-by-row SCD Type 2 load for dim_provider.
+    One SELECT plus one or two writes per changed provider; the change set
+    is streamed (src/etl/extract.py) rather than fetched all at once.
+    bulk_load=True collects the new versions and writes them with
+    LOAD DATA LOCAL INFILE (src/etl/bulk_load.py) instead of one INSERT each.
+    """
+    print("Loading dim_provider (SCD Type 2, row-by-row)...")
     
-    last_load = get_last_load_timestamp(cursor, 'dim_provider')
+    window = get_window(cursor, 'dim_provider', 'providers', 'provider_id')
     today = date.today()
     
-    # Get new/changed providers (with denormalized specialty & department)
-    cursor.execute("""
+    # Stream new/changed providers (with denormalized specialty & department)
+    providers = stream_rows(get_connection(), f"""
         SELECT 
             p.provider_id, p.first_name, p.last_name,
             CONCAT(p.first_name, ' ', p.last_name) AS full_name,
             p.credential,
             s.specialty_id, s.specialty_name, s.specialty_code,
-            d.department_id, d.department_name
+            d.department_id, d.department_name,
+            {row_hash_expression(PROVIDER_SCD2)} AS row_hash
         FROM providers p
         JOIN specialties s ON p.specialty_id = s.specialty_id
         JOIN departments d ON p.department_id = d.department_id
-        WHERE p.updated_at >= %s OR p.created_at >= %s
-    """, (last_load, last_load))
+        WHERE {window_sql(window, 'p')}
+    """, window_params(window))
+    new = changed = unchanged = 0
+    versions = []
+    touched = []
+    
+    def insert_version(provider):
+        values = tuple(provider[:11]) + (today,)
+        if not bulk_load:
+            cursor.execute("""
+                INSERT INTO dim_provider (
+                    provider_id, first_name, last_name, full_name, credential,
+                    specialty_id, specialty_name, specialty_code,
+                    department_id, department_name, row_hash,
+                    effective_date, end_date, is_current
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, '9999-12-31', TRUE)
+            """, values)
+            return cursor.lastrowid
+        versions.append(values + ('9999-12-31', True))
+        if len(versions) >= DEFAULT_FETCH_SIZE:
+            bulk_insert(cursor, 'dim_provider', DIM_PROVIDER_COLUMNS, versions)
+            versions.clear()
     
-    providers = cursor.fetchall()
-    records_processed = 0
+    def record_version(provider):
+        key = insert_version(provider)
+        if key_cache is None:
+            return
+        if key is not None:
+            key_cache.record('dim_provider', provider[0], key)
+        else:
+            touched.append(provider[0])  # bulk-loaded: key known after the load
     
     for provider in providers:
         provider_id = provider[0]
@@ -182,16 +390,8 @@ def load_dim_provider(cursor):
         
         if existing is None:
             # NEW provider - insert
-            cursor.execute("""
-                INSERT INTO dim_provider (
-                    provider_id, first_name, last_name, full_name, credential,
-                    specialty_id, specialty_name, specialty_code,
-                    department_id, department_name,
-                    effective_date, end_date, is_current
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, '9999-12-31', TRUE)
-            """, (provider[0], provider[1], provider[2], provider[3], provider[4],
-                  provider[5], provider[6], provider[7], provider[8], provider[9], today))
-            records_processed += 1
+            record_version(provider)
+            new += 1
         else:
             # Check if specialty or department changed (SCD Type 2)
             if existing[4] != provider[5] or existing[5] != provider[8]:
@@ -203,49 +403,65 @@ def load_dim_provider(cursor):
                 """, (today, existing[0]))
                 
                 # Insert new version
-                cursor.execute("""
-                    INSERT INTO dim_provider (
-                        provider_id, first_name, last_name, full_name, credential,
-                        specialty_id, specialty_name, specialty_code,
-                        department_id, department_name,
-                        effective_date, end_date, is_current
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, '9999-12-31', TRUE)
-                """, (provider[0], provider[1], provider[2], provider[3], provider[4],
-                      provider[5], provider[6], provider[7], provider[8], provider[9], today))
-                records_processed += 1
-    
-    update_etl_metadata(cursor, 'dim_provider', records_processed)
+                record_version(provider)
+                changed += 1
+            else:
+                unchanged += 1
+    
+    if versions:
+        bulk_insert(cursor, 'dim_provider', DIM_PROVIDER_COLUMNS, versions)
+    if touched:
+        key_cache.refresh(cursor, 'dim_provider', touched)
+    
+    records_processed = new + changed
+    update_etl_metadata(cursor, 'dim_provider', records_processed,
+                        watermark=window['high_water'], new=new, changed=changed, unchanged=unchanged)
     print(f"  Processed {records_processed} providers (new/changed)")
+    return records_processed
 
 
-def load_dim_department(cursor):
+def load_dim_department(cursor, key_cache=None):
     """Load department dimension (SCD Type 1 - upsert)"""
     print("Loading dim_department (SCD Type 1)...")
     
-    last_load = get_last_load_timestamp(cursor, 'dim_department')
+    window = get_window(cursor, 'dim_department', 'departments', 'department_id')
+    new, changed, unchanged = classify_changes(
+        cursor, 'departments', 'dim_department', 'department_id',
+        ['department_name', 'floor', 'capacity'], window)
     
-    cursor.execute("""
+    cursor.execute(f"""
         INSERT INTO dim_department (department_id, department_name, floor, capacity)
         SELECT department_id, department_name, floor, capacity
         FROM departments
-        WHERE updated_at >= %s OR created_at >= %s
+        WHERE {window_sql(window)}
         ON DUPLICATE KEY UPDATE
             department_name = VALUES(department_name),
             floor = VALUES(floor),
             capacity = VALUES(capacity)
-    """, (last_load, last_load))
+    """, window_params(window))
+    if key_cache is not None:
+        key_cache.refresh_from(cursor, 'dim_department', f"""
+            SELECT department_id FROM departments WHERE {window_sql(window)}
+        """, window_params(window))
     
-    update_etl_metadata(cursor, 'dim_department', cursor.rowcount)
-    print(f"  Processed {cursor.rowcount} departments")
+    records_processed = new + changed
+    update_etl_metadata(cursor, 'dim_department', records_processed,
+                        watermark=window['high_water'], new=new, changed=changed, unchanged=unchanged)
+    print(f"  Processed {records_processed} departments "
+          f"({new} new, {changed} changed, {unchanged} unchanged)")
+    return records_processed
 
 
 def load_dim_diagnosis(cursor):
     """Load diagnosis dimension (SCD Type 1 - upsert)"""
     print("Loading dim_diagnosis (SCD Type 1)...")
     
-    last_load = get_last_load_timestamp(cursor, 'dim_diagnosis')
+    window = get_window(cursor, 'dim_diagnosis', 'diagnoses', 'diagnosis_id')
+    new, changed, unchanged = classify_changes(
+        cursor, 'diagnoses', 'dim_diagnosis', 'diagnosis_id',
+        ['icd10_code', 'icd10_description'], window)
     
-    cursor.execute("""
+    cursor.execute(f"""
         INSERT INTO dim_diagnosis (diagnosis_id, icd10_code, icd10_description, diagnosis_category)
         SELECT 
             diagnosis_id,
@@ -264,24 +480,31 @@ def load_dim_diagnosis(cursor):
                 ELSE 'Other'
             END AS diagnosis_category
         FROM diagnoses
-        WHERE updated_at >= %s OR created_at >= %s
+        WHERE {window_sql(window)}
         ON DUPLICATE KEY UPDATE
             icd10_code = VALUES(icd10_code),
             icd10_description = VALUES(icd10_description),
             diagnosis_category = VALUES(diagnosis_category)
-    """, (last_load, last_load))
+    """, window_params(window))
     
-    update_etl_metadata(cursor, 'dim_diagnosis', cursor.rowcount)
-    print(f"  Processed {cursor.rowcount} diagnoses")
+    records_processed = new + changed
+    update_etl_metadata(cursor, 'dim_diagnosis', records_processed,
+                        watermark=window['high_water'], new=new, changed=changed, unchanged=unchanged)
+    print(f"  Processed {records_processed} diagnoses "
+          f"({new} new, {changed} changed, {unchanged} unchanged)")
+    return records_processed
 
 
 def load_dim_procedure(cursor):
     """Load procedure dimension (SCD Type 1 - upsert)"""
     print("Loading dim_procedure (SCD Type 1)...")
     
-    last_load = get_last_load_timestamp(cursor, 'dim_procedure')
+    window = get_window(cursor, 'dim_procedure', 'procedures', 'procedure_id')
+    new, changed, unchanged = classify_changes(
+        cursor, 'procedures', 'dim_procedure', 'procedure_id',
+        ['cpt_code', 'cpt_description'], window)
     
-    cursor.execute("""
+    cursor.execute(f"""
         INSERT INTO dim_procedure (procedure_id, cpt_code, cpt_description, procedure_category)
         SELECT 
             procedure_id,
@@ -296,48 +519,122 @@ def load_dim_procedure(cursor):
                 ELSE 'Other'
             END AS procedure_category
         FROM procedures
-        WHERE updated_at >= %s OR created_at >= %s
+        WHERE {window_sql(window)}
         ON DUPLICATE KEY UPDATE
             cpt_code = VALUES(cpt_code),
             cpt_description = VALUES(cpt_description),
             procedure_category = VALUES(procedure_category)
-    """, (last_load, last_load))
+    """, window_params(window))
     
-    update_etl_metadata(cursor, 'dim_procedure', cursor.rowcount)
-    print(f"  Processed {cursor.rowcount} procedures")
+    records_processed = new + changed
+    update_etl_metadata(cursor, 'dim_procedure', records_processed,
+                        watermark=window['high_water'], new=new, changed=changed, unchanged=unchanged)
+    print(f"  Processed {records_processed} procedures "
+          f"({new} new, {changed} changed, {unchanged} unchanged)")
+    return records_processed
 
 
-def load_fact_encounters(cursor):
-    """Load fact table with incremental logic and pre-aggregated metrics"""
-    print("Loading fact_encounters (incremental)...")
+def stage_encounters(cursor, select_sql, params=None):
+    """
+    Stage the encounter_ids returned by select_sql into a temporary table
+    and compute their diagnosis/procedure counts and fact date_key there.
+    Returns the number of staged encounters.
+    """
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_fact_encounters")
+    cursor.execute(f"""
+        CREATE TEMPORARY TABLE stg_fact_encounters (
+            encounter_id INT PRIMARY KEY,
+            date_key INT,
+            diagnosis_count INT NOT NULL DEFAULT 0,
+            procedure_count INT NOT NULL DEFAULT 0,
+            INDEX idx_date_key (date_key)
+        )
+        {select_sql}
+    """, params)
+    staged = cursor.rowcount
     
-    last_load = get_last_load_timestamp(cursor, 'fact_encounters')
+    # Scoped aggregation: only the staged encounters' junction rows are read
+    # (served by the encounter_id foreign-key indexes)
+    cursor.execute("""
+        UPDATE stg_fact_encounters s
+        SET diagnosis_count = (
+                SELECT COUNT(*) FROM encounter_diagnoses ed
+                WHERE ed.encounter_id = s.encounter_id),
+            procedure_count = (
+                SELECT COUNT(*) FROM encounter_procedures ep
+                WHERE ep.encounter_id = s.encounter_id)
+    """)
     
-    # Load only new/changed encounters
+    # Loaded encounters keep their fact row's date_key here, so the staged
+    # rows line up with the existing rows (and, if partitioned, their
+    # partitions); insert_fact_encounters moves rows whose date changed
     cursor.execute("""
-        INSERT INTO fact_encounters (
-            encounter_id, date_key, discharge_date_key, patient_key, provider_key,
-            department_key, encounter_type_key, encounter_date, discharge_date,
-            diagnosis_count, procedure_count, total_claim_amount, total_allowed_amount,
-            claim_status, length_of_stay_days
-        )
-        SELECT 
-            e.encounter_id,
-            CAST(DATE_FORMAT(e.encounter_date, '%%Y%%m%%d') AS UNSIGNED) AS date_key,
-            CAST(DATE_FORMAT(e.discharge_date, '%%Y%%m%%d') AS UNSIGNED) AS discharge_date_key,
+        UPDATE stg_fact_encounters s
+        JOIN encounters e ON e.encounter_id = s.encounter_id
+        LEFT JOIN fact_encounters f ON f.encounter_id = s.encounter_id
+        SET s.date_key = COALESCE(f.date_key,
+                                  CAST(DATE_FORMAT(e.encounter_date, '%Y%m%d') AS UNSIGNED))
+    """)
+    return staged
+
+
+def stage_fact_changes(cursor, window, key_from=None, key_to=None):
+    """
+    Stage the window's encounter_ids (optionally within an id range) with
+    stage_encounters. The counts are index lookups per staged encounter, so
+    an incremental run costs about the change volume instead of a GROUP BY
+    over the full junction tables. Returns the number of staged encounters.
+    """
+    encounter_range = ""
+    range_params = ()
+    if key_from is not None:
+        encounter_range = "AND encounter_id BETWEEN %s AND %s"
+        range_params = (key_from, key_to)
+    
+    return stage_encounters(cursor, f"""
+        SELECT encounter_id FROM encounters
+        WHERE {window_sql(window)}
+          {encounter_range}
+    """, window_params(window) + range_params)
+
+
+def fact_rows_sql(keep_keys=False, where="TRUE"):
+    """
+    SELECT of the fact rows of the staged encounters (stg_fact_encounters).
+    keep_keys=True also selects encounter_key and keeps the surrogate keys
+    of encounters already in fact_encounters (NULL for new encounters).
+    """
+    if keep_keys:
+        keys = """
+            f.encounter_key,
+            s.encounter_id,
+            s.date_key,
+            CAST(DATE_FORMAT(e.discharge_date, '%Y%m%d') AS UNSIGNED) AS discharge_date_key,
+            COALESCE(f.patient_key, dp.patient_key),
+            COALESCE(f.provider_key, dpr.provider_key),"""
+        existing = "LEFT JOIN fact_encounters f ON f.encounter_id = s.encounter_id"
+    else:
+        keys = """
+            s.encounter_id,
+            s.date_key,
+            CAST(DATE_FORMAT(e.discharge_date, '%Y%m%d') AS UNSIGNED) AS discharge_date_key,
             dp.patient_key,
-            dpr.provider_key,
+            dpr.provider_key,"""
+        existing = ""
+    return f"""
+        SELECT {keys}
             dd.department_key,
             det.encounter_type_key,
             e.encounter_date,
             e.discharge_date,
-            COALESCE(diag_counts.diagnosis_count, 0) AS diagnosis_count,
-            COALESCE(proc_counts.procedure_count, 0) AS procedure_count,
+            s.diagnosis_count,
+            s.procedure_count,
             COALESCE(b.claim_amount, 0) AS total_claim_amount,
             COALESCE(b.allowed_amount, 0) AS total_allowed_amount,
             b.claim_status,
             DATEDIFF(e.discharge_date, e.encounter_date) AS length_of_stay_days
-        FROM encounters e
+        FROM stg_fact_encounters s
+        JOIN encounters e ON e.encounter_id = s.encounter_id
         -- Join to dimensions (use is_current for SCD Type 2)
         JOIN dim_patient dp ON e.patient_id = dp.patient_id AND dp.is_current = TRUE
         JOIN dim_provider dpr ON e.provider_id = dpr.provider_id AND dpr.is_current = TRUE
@@ -345,95 +642,682 @@ def load_fact_encounters(cursor):
         JOIN dim_encounter_type det ON e.encounter_type = det.encounter_type_name
         -- Left join for optional data
         LEFT JOIN billing b ON e.encounter_id = b.encounter_id
-        -- Pre-aggregate diagnosis count
-        LEFT JOIN (
-            SELECT encounter_id, COUNT(*) AS diagnosis_count
-            FROM encounter_diagnoses GROUP BY encounter_id
-        ) diag_counts ON e.encounter_id = diag_counts.encounter_id
-        -- Pre-aggregate procedure count
-        LEFT JOIN (
-            SELECT encounter_id, COUNT(*) AS procedure_count
-            FROM encounter_procedures GROUP BY encounter_id
-        ) proc_counts ON e.encounter_id = proc_counts.encounter_id
-        WHERE e.updated_at >= %s OR e.created_at >= %s
+        {existing}
+        WHERE {where}
+    """
+
+
+# A staged encounter (s, e, b) whose fact row f would not change
+FACT_UNCHANGED_SQL = """
+    f.diagnosis_count = s.diagnosis_count
+    AND f.procedure_count = s.procedure_count
+    AND f.total_claim_amount = COALESCE(b.claim_amount, 0)
+    AND f.total_allowed_amount = COALESCE(b.allowed_amount, 0)
+    AND f.claim_status <=> b.claim_status
+    AND f.encounter_date <=> e.encounter_date"""
+
+
+def stage_keyed_fact_rows(cursor, key_cache, load_data=False):
+    """
+    Build the fact rows of the staged encounters (stg_fact_encounters) on
+    the client, resolving the surrogate keys through key_cache instead of
+    joining the dimensions, and write them to the temporary table
+    stg_fact_rows (LOAD DATA LOCAL INFILE with load_data=True).
+    The encounters are read in encounter_id pages of DEFAULT_FETCH_SIZE, so
+    only one page is held in memory. Encounters with an unresolved key are
+    skipped, as the inner joins of fact_rows_sql would.
+    Returns (rows staged, skipped new encounters, skipped encounters whose
+    existing fact row would have changed).
+    """
+    page_sql = f"""
+        SELECT
+            s.encounter_id,
+            s.date_key,
+            CAST(DATE_FORMAT(e.discharge_date, '%Y%m%d') AS UNSIGNED),
+            e.patient_id,
+            e.provider_id,
+            e.department_id,
+            e.encounter_type,
+            e.encounter_date,
+            e.discharge_date,
+            s.diagnosis_count,
+            s.procedure_count,
+            COALESCE(b.claim_amount, 0),
+            COALESCE(b.allowed_amount, 0),
+            b.claim_status,
+            DATEDIFF(e.discharge_date, e.encounter_date),
+            -- NULL: new encounter, else whether its fact row changes
+            NOT ({FACT_UNCHANGED_SQL})
+        FROM stg_fact_encounters s
+        JOIN encounters e ON e.encounter_id = s.encounter_id
+        LEFT JOIN billing b ON e.encounter_id = b.encounter_id
+        LEFT JOIN fact_encounters f ON f.encounter_id = s.encounter_id
+        WHERE s.encounter_id > %s
+        ORDER BY s.encounter_id
+        LIMIT %s
+    """
+    patient_keys = key_cache.maps['dim_patient']
+    provider_keys = key_cache.maps['dim_provider']
+    department_keys = key_cache.maps['dim_department']
+    encounter_type_keys = key_cache.maps['dim_encounter_type']
+    skipped = {'new': 0, 'changed': 0, 'unchanged': 0}
+    
+    def keyed_rows():
+        # Each page is fetched completely before its rows are yielded, so
+        # bulk_insert can use the same cursor between pages
+        last_id = -1
+        while True:
+            cursor.execute(page_sql, (last_id, DEFAULT_FETCH_SIZE))
+            page = cursor.fetchall()
+            if not page:
+                return
+            last_id = page[-1][0]
+            for row in page:
+                keys = (patient_keys.get(row[3]), provider_keys.get(row[4]),
+                        department_keys.get(row[5]), encounter_type_keys.get(row[6]))
+                if None not in keys:
+                    yield row[:3] + keys + row[7:-1]
+                elif row[-1] is None:
+                    skipped['new'] += 1
+                else:
+                    skipped['changed' if row[-1] else 'unchanged'] += 1
+    
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_fact_rows")
+    cursor.execute(f"""
+        CREATE TEMPORARY TABLE stg_fact_rows
+        SELECT {FACT_COLUMNS} FROM fact_encounters WHERE FALSE
+    """)
+    staged = bulk_insert(cursor, 'stg_fact_rows', FACT_COLUMN_NAMES, keyed_rows(),
+                         load_data=load_data)
+    total_skipped = sum(skipped.values())
+    if total_skipped:
+        print(f"  Warning: skipped {total_skipped} encounters with no current dimension key")
+    return staged, skipped['new'], skipped['changed']
+
+
+def upsert_fact_rows(cursor, partition=None, keyed=False):
+    """
+    Upsert the staged encounters into fact_encounters. With a partition
+    (name, lower, upper) only the staged rows of that partition are
+    written, and the statement names it so it locks and touches nothing else.
+    keyed=True reads the client-keyed rows of stg_fact_rows
+    (stage_keyed_fact_rows) instead of joining the dimensions.
+    """
+    target = "fact_encounters"
+    where = "TRUE"
+    if partition is not None:
+        target = f"fact_encounters PARTITION ({partition[0]})"
+        where = partition_predicate(partition, 's.date_key')
+    if keyed:
+        rows_sql = f"SELECT {FACT_COLUMNS} FROM stg_fact_rows s WHERE {where}"
+    else:
+        rows_sql = fact_rows_sql(where=where)
+    cursor.execute(f"""
+        INSERT INTO {target} (
+            {FACT_COLUMNS}
+        )
+        {rows_sql}
         ON DUPLICATE KEY UPDATE
             diagnosis_count = VALUES(diagnosis_count),
             procedure_count = VALUES(procedure_count),
             total_claim_amount = VALUES(total_claim_amount),
             total_allowed_amount = VALUES(total_allowed_amount),
             claim_status = VALUES(claim_status)
-    """, (last_load, last_load))
+    """)
+    return cursor.rowcount
+
+
+def move_redated_fact_rows(cursor):
+    """
+    Re-date the fact rows of staged encounters whose encounter_date changed:
+    set the new encounter_date and date_key in place (moving the row to its
+    new partition, if partitioned) and keep the encounter_key, so the
+    bridges stay valid. The staged date_key follows. Without this the
+    upsert, which matches on (encounter_id, date_key) when partitioned,
+    would add a second fact row. Returns the number of rows re-dated.
+    """
+    cursor.execute("""
+        UPDATE fact_encounters f
+        JOIN stg_fact_encounters s ON s.encounter_id = f.encounter_id
+        JOIN encounters e ON e.encounter_id = s.encounter_id
+        SET f.date_key = CAST(DATE_FORMAT(e.encounter_date, '%Y%m%d') AS UNSIGNED),
+            f.encounter_date = e.encounter_date
+        WHERE e.encounter_date IS NOT NULL
+          AND NOT (f.encounter_date <=> e.encounter_date)
+    """)
+    moved = cursor.rowcount
+    if moved:
+        cursor.execute("""
+            UPDATE stg_fact_encounters s
+            JOIN fact_encounters f ON f.encounter_id = s.encounter_id
+            SET s.date_key = f.date_key
+            WHERE s.date_key <> f.date_key
+        """)
+        print(f"  Re-dated {moved} encounters")
+    return moved
+
+
+def insert_fact_encounters(cursor, window, key_from=None, key_to=None, partitions=None,
+                           late_partitions='insert', key_cache=None, bulk_load=False):
+    """
+    INSERT ... SELECT new/changed encounters into fact_encounters.
+    With key_from/key_to only encounter_ids in that range are loaded.
+    partitions (from table_partitions) loads partition by partition;
+    late_partitions then decides what happens to partitions older than the
+    newest loaded date ('insert', 'rebuild' or 'exchange'; see
+    LATE_PARTITION_MODES).
+    With a warm key_cache the rows are keyed on the client and bulk-inserted
+    into a staging table first (stage_keyed_fact_rows); the exchange path
+    always rebuilds partitions with the dimension joins.
+    Returns (new, changed, unchanged) counts of the staged encounters
+    (encounters skipped for an unresolved cached key count as neither new
+    nor changed).
+    """
+    staged = stage_fact_changes(cursor, window, key_from, key_to)
+    if not staged:
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_fact_encounters")
+        return 0, 0, 0
+    
+    # Classify against the fact rows already loaded (before the upsert)
+    cursor.execute(f"""
+        SELECT 
+            COUNT(*),
+            COALESCE(SUM({FACT_UNCHANGED_SQL}), 0)
+        FROM stg_fact_encounters s
+        JOIN fact_encounters f ON f.encounter_id = s.encounter_id
+        JOIN encounters e ON e.encounter_id = s.encounter_id
+        LEFT JOIN billing b ON b.encounter_id = s.encounter_id
+    """)
+    existing, unchanged = cursor.fetchone()
+    unchanged = int(unchanged)
     
-    update_etl_metadata(cursor, 'fact_encounters', cursor.rowcount)
-    print(f"  Processed {cursor.rowcount} encounters")
+    # Aggregates: take out the old values of the rows about to change
+    subtract_monthly_specialty(cursor, 'stg_fact_encounters')
+    move_redated_fact_rows(cursor)
+    
+    keyed = key_cache is not None
+    skipped_new = skipped_changed = 0
+    if keyed:
+        _, skipped_new, skipped_changed = stage_keyed_fact_rows(cursor, key_cache,
+                                                                load_data=bulk_load)
+    new = staged - existing - skipped_new
+    changed = existing - unchanged - skipped_changed
+    
+    if not partitions:
+        upsert_fact_rows(cursor, keyed=keyed)
+        add_monthly_specialty(cursor, 'stg_fact_encounters')
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_fact_encounters")
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_fact_rows")
+        return new, changed, unchanged
+    
+    cursor.execute("SELECT DISTINCT date_key FROM stg_fact_encounters")
+    targets = sorted({partition_of(partitions, date_key) for (date_key,) in cursor.fetchall()},
+                     key=partitions.index)
+    cursor.execute("SELECT MAX(date_key) FROM fact_encounters")
+    newest = cursor.fetchone()[0]
+    current = partition_of(partitions, newest) if newest is not None else None
+    late = [p for p in targets
+            if current is not None and partitions.index(p) < partitions.index(current)]
+    
+    for partition in targets:
+        if late_partitions == 'exchange' and partition in late:
+            continue
+        upsert_fact_rows(cursor, partition, keyed=keyed)
+    add_monthly_specialty(cursor, 'stg_fact_encounters')
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_fact_encounters")
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_fact_rows")
+    
+    if late and late_partitions == 'rebuild':
+        names = ", ".join(name for name, _, _ in late)
+        print(f"  Rebuilding late-data partitions: {names}")
+        cursor.execute(f"ALTER TABLE fact_encounters REBUILD PARTITION {names}")
+        cursor.execute(f"ALTER TABLE fact_encounters ANALYZE PARTITION {names}")
+        cursor.fetchall()
+    elif late and late_partitions == 'exchange':
+        for partition in late:
+            print(f"  Reloading late-data partition {partition[0]} by exchange")
+            reload_fact_partition(cursor, partition)
+            rebuild_monthly_specialty(cursor, partition[1], partition[2])
+    return new, changed, unchanged
+
+
+def reload_fact_partition(cursor, partition):
+    """
+    Rebuild one fact_encounters partition from the OLTP tables into a
+    standalone table and swap it in with ALTER TABLE ... EXCHANGE PARTITION.
+    
+    Encounters already in the fact table keep their encounter_key (the
+    bridges reference it), date_key and SCD2 keys; encounters new to the
+    partition get encounter_keys above every existing one.
+    Returns the number of rows in the new partition.
+    """
+    name = partition[0]
+    staged = stage_encounters(cursor, f"""
+        SELECT e.encounter_id FROM encounters e
+        LEFT JOIN fact_encounters f ON f.encounter_id = e.encounter_id
+        WHERE {partition_predicate(partition, 'f.date_key')}
+           OR (f.encounter_id IS NULL
+               AND {partition_predicate(partition, "CAST(DATE_FORMAT(e.encounter_date, '%Y%m%d') AS UNSIGNED)")})
+    """)
+    
+    cursor.execute("DROP TABLE IF EXISTS stg_fact_partition")
+    cursor.execute("CREATE TABLE stg_fact_partition LIKE fact_encounters")
+    cursor.execute("ALTER TABLE stg_fact_partition REMOVE PARTITIONING")
+    cursor.execute("SELECT COALESCE(MAX(encounter_key), 0) + 1 FROM fact_encounters")
+    next_key = cursor.fetchone()[0]
+    cursor.execute(f"ALTER TABLE stg_fact_partition AUTO_INCREMENT = {int(next_key)}")
+    
+    # NULL encounter_key (new encounters) draws from the staging AUTO_INCREMENT
+    cursor.execute(f"""
+        INSERT INTO stg_fact_partition (
+            encounter_key, {FACT_COLUMNS}
+        )
+        {fact_rows_sql(keep_keys=True)}
+    """)
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_fact_encounters")
+    
+    cursor.execute(f"ALTER TABLE fact_encounters EXCHANGE PARTITION {name} "
+                   f"WITH TABLE stg_fact_partition")
+    cursor.execute("DROP TABLE stg_fact_partition")
+    # The exchanged-in keys may be above the table's own counter
+    cursor.execute("SELECT COALESCE(MAX(encounter_key), 0) + 1 FROM fact_encounters")
+    cursor.execute(f"ALTER TABLE fact_encounters AUTO_INCREMENT = {int(cursor.fetchone()[0])}")
+    return staged
+
+
+def load_fact_encounters(cursor, chunk_size=None, workers=1, late_partitions='insert',
+                         key_cache=None, bulk_load=False):
+    """
+    Load fact table with incremental logic and pre-aggregated metrics.
+    chunk_size switches to the chunked, resumable load (see
+    load_fact_encounters_chunked); workers > 1 runs chunks in parallel.
+    A partitioned fact_encounters is loaded partition by partition, with
+    late_partitions choosing how back-dated data is applied.
+    key_cache (warmed here on first use) resolves the surrogate keys on the
+    client; bulk_load then writes the keyed rows with LOAD DATA LOCAL INFILE.
+    """
+    if key_cache is not None:
+        key_cache.ensure_warm(cursor)
+    partitions = table_partitions(cursor, 'fact_encounters')
+    if chunk_size:
+        return load_fact_encounters_chunked(cursor, chunk_size, workers, partitions,
+                                            key_cache, bulk_load)
+    
+    print("Loading fact_encounters (incremental)...")
+    
+    window = get_window(cursor, 'fact_encounters', 'encounters', 'encounter_id')
+    
+    # Load only new/changed encounters
+    new, changed, unchanged = insert_fact_encounters(cursor, window, partitions=partitions,
+                                                     late_partitions=late_partitions,
+                                                     key_cache=key_cache, bulk_load=bulk_load)
+    records_processed = new + changed
+    
+    update_etl_metadata(cursor, 'fact_encounters', records_processed,
+                        watermark=window['high_water'], new=new, changed=changed, unchanged=unchanged)
+    print(f"  Processed {records_processed} encounters "
+          f"({new} new, {changed} changed, {unchanged} unchanged)")
+    return records_processed
+
+
+def get_resume_state(cursor, table_name):
+    """Get (resume_key, resume_started_at) of an interrupted chunked load"""
+    cursor.execute("""
+        SELECT resume_key, resume_started_at FROM etl_metadata WHERE table_name = %s
+    """, (table_name,))
+    result = cursor.fetchone()
+    if result:
+        return result[0], result[1]
+    return None, None
+
+
+def save_resume_state(cursor, table_name, watermark, resume_key, resume_started_at):
+    """Checkpoint a chunked load: every key <= resume_key has been committed"""
+    cursor.execute("""
+        INSERT INTO etl_metadata (table_name, last_load_timestamp, last_load_key,
+                                  resume_key, resume_started_at)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            resume_key = VALUES(resume_key),
+            resume_started_at = VALUES(resume_started_at)
+    """, (table_name, watermark[0], watermark[1], resume_key, resume_started_at))
+    cursor.execute("COMMIT")
+
+
+def run_fact_chunk(pool, window, key_from, key_to, partitions=None, key_cache=None,
+                   bulk_load=False):
+    """Load one encounter_id range on its own pooled connection"""
+    connection = pool.get_connection()
+    cursor = connection.cursor()
+    try:
+        counts = insert_fact_encounters(cursor, window, key_from, key_to, partitions,
+                                        key_cache=key_cache, bulk_load=bulk_load)
+        connection.commit()
+        return counts
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def load_fact_encounters_chunked(cursor, chunk_size=DEFAULT_FACT_CHUNK_SIZE, workers=1,
+                                 partitions=None, key_cache=None, bulk_load=False):
+    """
+    Chunked fact load: split the change set into encounter_id ranges of
+    chunk_size and commit per chunk, keeping locks and undo small.
+    
+    Progress is checkpointed in etl_metadata.resume_key (highest encounter_id
+    of the contiguous completed chunks), so a failed run resumes after the
+    last completed chunk. The watermark only advances once all chunks are
+    done; a resumed run reuses the first attempt's extraction cutoff, so it
+    works on the same window, and rows changed since then wait for the next run.
+    With partitions each chunk is written partition by partition (late data
+    is always inserted; rebuild/exchange would serialize the workers).
+    """
+    print(f"Loading fact_encounters (chunked, {chunk_size} ids/chunk, {workers} worker(s))...")
+    
+    resume_key, resume_started_at = get_resume_state(cursor, 'fact_encounters')
+    if resume_started_at is None:
+        resume_key = None
+    else:
+        print(f"  Resuming after encounter_id {resume_key}")
+    window = get_window(cursor, 'fact_encounters', 'encounters', 'encounter_id',
+                        cutoff=resume_started_at)
+    resume_started_at = window['cutoff']
+    
+    cursor.execute(f"""
+        SELECT MIN(encounter_id), MAX(encounter_id) FROM encounters
+        WHERE {window_sql(window)}
+    """, window_params(window))
+    min_key, max_key = cursor.fetchone()
+    
+    chunks = []
+    if min_key is not None:
+        key_from = min_key if resume_key is None else max(min_key, resume_key + 1)
+        while key_from <= max_key:
+            chunks.append((key_from, key_from + chunk_size - 1))
+            key_from += chunk_size
+    
+    totals = [0, 0, 0]  # new, changed, unchanged
+    if workers > 1 and len(chunks) > 1:
+        pool = get_connection_pool(workers, pool_name='fact_chunk_pool',
+                                   allow_local_infile=bulk_load)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_fact_chunk, pool, window, lo, hi, partitions,
+                                       key_cache, bulk_load)
+                       for lo, hi in chunks]
+            # Checkpoint in key order so resume_key always covers a
+            # contiguous prefix of committed chunks
+            for (lo, hi), future in zip(chunks, futures):
+                totals = [t + c for t, c in zip(totals, future.result())]
+                save_resume_state(cursor, 'fact_encounters', window['watermark'], hi,
+                                  resume_started_at)
+    else:
+        for lo, hi in chunks:
+            counts = insert_fact_encounters(cursor, window, lo, hi, partitions,
+                                            key_cache=key_cache, bulk_load=bulk_load)
+            totals = [t + c for t, c in zip(totals, counts)]
+            save_resume_state(cursor, 'fact_encounters', window['watermark'], hi,
+                                  resume_started_at)
+    
+    new, changed, unchanged = totals
+    records_processed = new + changed
+    update_etl_metadata(cursor, 'fact_encounters', records_processed, 'CHUNKED',
+                        watermark=window['high_water'],
+                        new=new, changed=changed, unchanged=unchanged)
+    print(f"  Processed {records_processed} encounters in {len(chunks)} chunks "
+          f"({new} new, {changed} changed, {unchanged} unchanged)")
+    return records_processed
 
 
 def update_late_arriving_billing(cursor):
     """Update fact table for billing that arrived after encounter was loaded"""
     print("Updating late-arriving billing...")
     
-    last_load = get_last_load_timestamp(cursor, 'billing_updates')
+    window = get_window(cursor, 'billing_updates', 'billing', 'billing_id')
+    
+    cursor.execute(f"SELECT COUNT(*) FROM billing WHERE {window_sql(window)}",
+                   window_params(window))
+    extracted = cursor.fetchone()[0]
+    
+    # Stage the encounters to update so the aggregates can be adjusted
+    # around the UPDATE
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_billing_updates")
+    cursor.execute(f"""
+        CREATE TEMPORARY TABLE stg_billing_updates (encounter_id INT PRIMARY KEY)
+        SELECT f.encounter_id
+        FROM fact_encounters f
+        JOIN billing b ON f.encounter_id = b.encounter_id
+        WHERE f.total_claim_amount = 0 
+          AND b.claim_amount > 0
+          AND {window_sql(window, 'b')}
+    """, window_params(window))
+    subtract_monthly_specialty(cursor, 'stg_billing_updates')
     
     cursor.execute("""
         UPDATE fact_encounters f
+        JOIN stg_billing_updates s ON s.encounter_id = f.encounter_id
         JOIN billing b ON f.encounter_id = b.encounter_id
         SET 
             f.total_claim_amount = b.claim_amount,
             f.total_allowed_amount = b.allowed_amount,
             f.claim_status = b.claim_status
-        WHERE f.total_claim_amount = 0 
-          AND b.claim_amount > 0
-          AND (b.updated_at >= %s OR b.created_at >= %s)
-    """, (last_load, last_load))
+    """)
     
-    update_etl_metadata(cursor, 'billing_updates', cursor.rowcount)
-    print(f"  Updated {cursor.rowcount} encounters with late billing")
+    records_processed = cursor.rowcount
+    add_monthly_specialty(cursor, 'stg_billing_updates')
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_billing_updates")
+    update_etl_metadata(cursor, 'billing_updates', records_processed,
+                        watermark=window['high_water'],
+                        changed=records_processed, unchanged=extracted - records_processed)
+    print(f"  Updated {records_processed} encounters with late billing")
+    return records_processed
 
 
 def load_bridge_encounter_diagnosis(cursor):
     """Load bridge table for new encounters only"""
     print("Loading bridge_encounter_diagnosis...")
     
-    last_load = get_last_load_timestamp(cursor, 'bridge_encounter_diagnosis')
+    window = get_window(cursor, 'bridge_encounter_diagnosis', 'encounters', 'encounter_id')
+    links_source = f"""
+        FROM encounter_diagnoses ed
+        JOIN fact_encounters fe ON ed.encounter_id = fe.encounter_id
+        JOIN dim_diagnosis dd ON ed.diagnosis_id = dd.diagnosis_id
+        JOIN encounters e ON ed.encounter_id = e.encounter_id
+        WHERE {window_sql(window, 'e')}
+    """
     
-    cursor.execute("""
+    cursor.execute(f"SELECT COUNT(*) {links_source}", window_params(window))
+    extracted = cursor.fetchone()[0]
+    
+    cursor.execute(f"""
         INSERT IGNORE INTO bridge_encounter_diagnosis (encounter_key, diagnosis_key, diagnosis_sequence)
         SELECT 
             fe.encounter_key,
             dd.diagnosis_key,
             ed.diagnosis_sequence
-        FROM encounter_diagnoses ed
-        JOIN fact_encounters fe ON ed.encounter_id = fe.encounter_id
-        JOIN dim_diagnosis dd ON ed.diagnosis_id = dd.diagnosis_id
-        JOIN encounters e ON ed.encounter_id = e.encounter_id
-        WHERE e.updated_at >= %s OR e.created_at >= %s
-    """, (last_load, last_load))
+        {links_source}
+    """, window_params(window))
     
-    update_etl_metadata(cursor, 'bridge_encounter_diagnosis', cursor.rowcount)
-    print(f"  Processed {cursor.rowcount} diagnosis links")
+    records_processed = cursor.rowcount
+    update_etl_metadata(cursor, 'bridge_encounter_diagnosis', records_processed,
+                        watermark=window['high_water'],
+                        new=records_processed, unchanged=extracted - records_processed)
+    print(f"  Processed {records_processed} diagnosis links")
+    return records_processed
 
 
 def load_bridge_encounter_procedure(cursor):
     """Load bridge table for new encounters only"""
     print("Loading bridge_encounter_procedure...")
     
-    last_load = get_last_load_timestamp(cursor, 'bridge_encounter_procedure')
+    window = get_window(cursor, 'bridge_encounter_procedure', 'encounters', 'encounter_id')
+    links_source = f"""
+        FROM encounter_procedures ep
+        JOIN fact_encounters fe ON ep.encounter_id = fe.encounter_id
+        JOIN dim_procedure dpc ON ep.procedure_id = dpc.procedure_id
+        JOIN encounters e ON ep.encounter_id = e.encounter_id
+        WHERE {window_sql(window, 'e')}
+    """
     
-    cursor.execute("""
+    cursor.execute(f"SELECT COUNT(*) {links_source}", window_params(window))
+    extracted = cursor.fetchone()[0]
+    
+    cursor.execute(f"""
         INSERT IGNORE INTO bridge_encounter_procedure (encounter_key, procedure_key, procedure_date)
         SELECT 
             fe.encounter_key,
             dpc.procedure_key,
             ep.procedure_date
-        FROM encounter_procedures ep
-        JOIN fact_encounters fe ON ep.encounter_id = fe.encounter_id
-        JOIN dim_procedure dpc ON ep.procedure_id = dpc.procedure_id
-        JOIN encounters e ON ep.encounter_id = e.encounter_id
-        WHERE e.updated_at >= %s OR e.created_at >= %s
-    """, (last_load, last_load))
+        {links_source}
+    """, window_params(window))
+    
+    records_processed = cursor.rowcount
+    update_etl_metadata(cursor, 'bridge_encounter_procedure', records_processed,
+                        watermark=window['high_water'],
+                        new=records_processed, unchanged=extracted - records_processed)
+    print(f"  Processed {records_processed} procedure links")
+    return records_processed
+
+
+def max_bridge_id(cursor, table):
+    cursor.execute(f"SELECT COALESCE(MAX(bridge_id), 0) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def load_agg_diagnosis_procedure_pair(cursor):
+    """
+    Add the diagnosis-procedure pairs of bridge rows loaded since the last
+    run. Runs after both bridge loaders have committed, so each pair is
+    counted exactly once (see add_pair_links); the bridge_id high-water
+    marks are kept in etl_metadata.last_load_key.
+    """
+    print("Updating agg_diagnosis_procedure_pair...")
+    
+    diagnosis_from = get_watermark(cursor, 'agg_pair_diagnosis_links')[1] or 0
+    procedure_from = get_watermark(cursor, 'agg_pair_procedure_links')[1] or 0
+    diagnosis_to = max_bridge_id(cursor, 'bridge_encounter_diagnosis')
+    procedure_to = max_bridge_id(cursor, 'bridge_encounter_procedure')
+    
+    records_processed = add_pair_links(cursor, (diagnosis_from, diagnosis_to),
+                                       (procedure_from, procedure_to))
+    update_etl_metadata(cursor, 'agg_pair_diagnosis_links', diagnosis_to - diagnosis_from,
+                        watermark=(None, diagnosis_to), new=diagnosis_to - diagnosis_from)
+    update_etl_metadata(cursor, 'agg_pair_procedure_links', procedure_to - procedure_from,
+                        watermark=(None, procedure_to), new=procedure_to - procedure_from)
+    print(f"  Counted {records_processed} new encounter diagnosis-procedure pairs")
+    return records_processed
+
+
+def load_fact_readmission(cursor):
+    """
+    Link each inpatient encounter to the patient's first inpatient admission
+    on a day after its discharge day (admissions during the stay, e.g.
+    overlapping or transfer records, are not readmissions). Only patients
+    with encounters in the extraction window are recomputed: their rows are
+    replaced by one window-function sweep over their inpatient admissions
+    and discharges in day order (per patient_id, across SCD2 versions),
+    instead of self-joining the fact table.
+    """
+    print("Loading fact_readmission...")
+    
+    window = get_window(cursor, 'fact_readmission', 'encounters', 'encounter_id')
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_readmission_patients")
+    cursor.execute(f"""
+        CREATE TEMPORARY TABLE stg_readmission_patients (patient_id INT PRIMARY KEY)
+        SELECT DISTINCT patient_id FROM encounters
+        WHERE {window_sql(window)}
+    """, window_params(window))
+    patients = cursor.rowcount
+    
+    cursor.execute("""
+        DELETE r FROM fact_readmission r
+        JOIN stg_readmission_patients s ON s.patient_id = r.patient_id
+    """)
+    removed = cursor.rowcount
+    
+    # One event per discharge and one per admission of the patients'
+    # inpatient encounters. Each INSERT reads the temporary patients table
+    # once (MySQL cannot open a temporary table twice in one statement).
+    # Admissions are packed as day * 2^32 + encounter_key, so the MIN in the
+    # sweep below carries the earliest admission's key along.
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_readmission_events")
+    cursor.execute("""
+        CREATE TEMPORARY TABLE stg_readmission_events (
+            encounter_key INT NOT NULL,
+            patient_id INT NOT NULL,
+            provider_key INT NULL,
+            discharge_date_key INT NULL,
+            event_day INT NULL,                -- TO_DAYS() of the event
+            is_discharge BOOLEAN NOT NULL,
+            admission BIGINT NULL              -- packed admission, NULL for discharges
+        )
+    """)
+    inpatient_sql = """
+        FROM stg_readmission_patients s
+        JOIN dim_patient dp ON dp.patient_id = s.patient_id
+        JOIN fact_encounters f ON f.patient_key = dp.patient_key
+        JOIN dim_encounter_type et ON et.encounter_type_key = f.encounter_type_key
+        WHERE et.encounter_type_name = 'Inpatient'
+    """
+    cursor.execute(f"""
+        INSERT INTO stg_readmission_events
+        SELECT f.encounter_key, dp.patient_id, f.provider_key, f.discharge_date_key,
+               TO_DAYS(f.discharge_date), TRUE, NULL
+        {inpatient_sql}
+    """)
+    cursor.execute(f"""
+        INSERT INTO stg_readmission_events
+        SELECT f.encounter_key, dp.patient_id, NULL, NULL,
+               TO_DAYS(f.encounter_date), FALSE,
+               TO_DAYS(f.encounter_date) * 4294967296 + f.encounter_key
+        {inpatient_sql}
+          AND f.encounter_date IS NOT NULL
+    """)
     
-    update_etl_metadata(cursor, 'bridge_encounter_procedure', cursor.rowcount)
-    print(f"  Processed {cursor.rowcount} procedure links")
+    # Each discharge takes the MIN over the admissions of later days (RANGE
+    # frame on the day number)
+    cursor.execute("""
+        INSERT INTO fact_readmission (
+            encounter_key, patient_id, provider_key, discharge_date_key,
+            next_encounter_key, days_to_readmission, is_readmission
+        )
+        SELECT
+            encounter_key,
+            patient_id,
+            provider_key,
+            discharge_date_key,
+            next_admission MOD 4294967296,
+            next_admission DIV 4294967296 - event_day,
+            COALESCE(next_admission DIV 4294967296 - event_day BETWEEN 1 AND %s, FALSE)
+        FROM (
+            SELECT
+                encounter_key,
+                patient_id,
+                provider_key,
+                discharge_date_key,
+                event_day,
+                is_discharge,
+                IF(event_day IS NULL, NULL, MIN(admission) OVER (
+                    PARTITION BY patient_id ORDER BY event_day
+                    RANGE BETWEEN 1 FOLLOWING AND UNBOUNDED FOLLOWING
+                )) AS next_admission
+            FROM stg_readmission_events
+        ) sweep
+        WHERE is_discharge
+    """, (READMISSION_WINDOW_DAYS,))
+    records_processed = cursor.rowcount
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_readmission_events")
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS stg_readmission_patients")
+    
+    update_etl_metadata(cursor, 'fact_readmission', records_processed,
+                        watermark=window['high_water'],
+                        new=max(records_processed - removed, 0),
+                        changed=min(records_processed, removed))
+    print(f"  Recomputed {records_processed} inpatient encounters for {patients} patients")
+    return records_processed
 
 
 def verify_load(cursor):
@@ -453,6 +1337,9 @@ def verify_load(cursor):
         ('fact_encounters', 'encounter_key'),
         ('bridge_encounter_diagnosis', 'bridge_id'),
         ('bridge_encounter_procedure', 'bridge_id'),
+        ('fact_readmission', 'encounter_key'),
+        ('agg_monthly_specialty', 'year'),
+        ('agg_diagnosis_procedure_pair', 'diagnosis_key'),
     ]
     
     for table, key in tables:
@@ -464,70 +1351,175 @@ def verify_load(cursor):
     print("\n" + "-" * 60)
     print("ETL Metadata (Last Load Times)")
     print("-" * 60)
-    cursor.execute("SELECT table_name, last_load_timestamp, records_loaded FROM etl_metadata ORDER BY table_name")
+    cursor.execute("""
+        SELECT table_name, last_load_timestamp, records_loaded,
+               records_new, records_changed, records_unchanged
+        FROM etl_metadata ORDER BY table_name
+    """)
     for row in cursor.fetchall():
-        print(f"  {row[0]:35} {str(row[1]):20} ({row[2]} records)")
+        print(f"  {row[0]:35} {str(row[1]):20} ({row[2]} records: "
+              f"{row[3]} new, {row[4]} changed, {row[5]} unchanged)")
+
+
+# ETL task graph: task -> tasks that must have committed first.
+# Dimensions only read OLTP tables, so they are independent of each other;
+# the fact table needs the surrogate keys of patient/provider/department,
+# and the bridges need fact encounter_keys plus their own dimension.
+# Readmission links are derived from the loaded fact rows, pair counts from
+# both bridges.
+ETL_DEPENDENCIES = {
+    'dim_patient': [],
+    'dim_provider': [],
+    'dim_department': [],
+    'dim_diagnosis': [],
+    'dim_procedure': [],
+    'fact_encounters': ['dim_patient', 'dim_provider', 'dim_department'],
+    'billing_updates': ['fact_encounters'],
+    'bridge_encounter_diagnosis': ['fact_encounters', 'dim_diagnosis'],
+    'bridge_encounter_procedure': ['fact_encounters', 'dim_procedure'],
+    'fact_readmission': ['fact_encounters'],
+    'agg_diagnosis_procedure_pair': ['bridge_encounter_diagnosis', 'bridge_encounter_procedure'],
+}
+
+ETL_TASKS = {
+    'dim_patient': load_dim_patient,
+    'dim_provider': load_dim_provider,
+    'dim_department': load_dim_department,
+    'dim_diagnosis': load_dim_diagnosis,
+    'dim_procedure': load_dim_procedure,
+    'fact_encounters': load_fact_encounters,
+    'billing_updates': update_late_arriving_billing,
+    'bridge_encounter_diagnosis': load_bridge_encounter_diagnosis,
+    'bridge_encounter_procedure': load_bridge_encounter_procedure,
+    'fact_readmission': load_fact_readmission,
+    'agg_diagnosis_procedure_pair': load_agg_diagnosis_procedure_pair,
+}
+
+# Worker threads / pooled connections for the parallel mode
+DEFAULT_ETL_WORKERS = 5
+
+
+def get_connection_pool(pool_size=DEFAULT_ETL_WORKERS, pool_name='etl_pool', **options):
+    """Create a bounded connection pool for parallel loading"""
+    try:
+        return pooling.MySQLConnectionPool(
+            pool_name=pool_name, pool_size=pool_size, **DB_CONFIG, **options)
+    except Error as e:
+        print(f"Error creating MySQL connection pool: {e}")
+        return None
+
+
+def run_pooled_task(pool, tasks, task):
+    """Run one ETL task on its own pooled connection and transaction"""
+    connection = pool.get_connection()
+    cursor = connection.cursor()
+    try:
+        rows = tasks[task](cursor)
+        connection.commit()
+        return rows
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()  # returns the connection to the pool
+
+
+def run_connection_task(connection, cursor, tasks, task):
+    """Run one ETL task on the shared connection and commit it"""
+    rows = tasks[task](cursor)
+    connection.commit()
+    return rows
 
 
-def run_etl():
-    """Main ETL function - runs incremental load"""
+def run_etl(parallel=False, max_workers=DEFAULT_ETL_WORKERS,
+            fact_chunk_size=None, fact_workers=1, bulk_load=False,
+            full_reload=False, index_workers=1, late_partitions='insert',
+            instrumentation=None, key_cache=None):
+    """
+    Main ETL function - runs incremental load.
+    Tasks run through the task-graph runner (src/etl/dag.py) in
+    ETL_DEPENDENCIES order; parallel=True starts every ready task
+    concurrently (up to max_workers), each on its own pooled connection.
+    fact_chunk_size/fact_workers select the chunked fact load.
+    bulk_load=True writes client-built rows with LOAD DATA LOCAL INFILE.
+    full_reload=True empties the fact and bridge tables and reloads them with
+    their secondary indexes dropped, rebuilding them afterwards (up to
+    index_workers tables at once; src/etl/full_reload.py).
+    late_partitions picks how a partitioned fact table takes back-dated rows
+    (LATE_PARTITION_MODES).
+    instrumentation (src/etl/instrument.py) records per-stage statement,
+    round-trip and server status metrics around every task.
+    Every run and stage is appended to etl_run_log/etl_stage_log
+    (src/etl/run_log.py).
+    key_cache (a DimensionKeyCache, src/etl/key_cache.py) keys the fact rows
+    on the client; pass the same cache to successive runs to warm it once.
+    Returns the task timings of run_task_graph, or None if the run failed.
+    """
     print("=" * 60)
-    print("ETL Pipeline Execution (INCREMENTAL)")
+    print(f"ETL Pipeline Execution ({'FULL RELOAD' if full_reload else 'INCREMENTAL'})")
     print("=" * 60)
     print(f"Started at: {datetime.now()}")
     print()
     
-    connection = get_connection()
+    connection = get_connection(allow_local_infile=bulk_load)
     if not connection:
         print("Failed to connect to database.")
         return
     
     cursor = connection.cursor()
     
+    tasks = dict(ETL_TASKS)
+    tasks['dim_patient'] = partial(load_dim_patient, bulk_load=bulk_load, key_cache=key_cache)
+    tasks['dim_provider'] = partial(load_dim_provider, bulk_load=bulk_load, key_cache=key_cache)
+    tasks['dim_department'] = partial(load_dim_department, key_cache=key_cache)
+    tasks['fact_encounters'] = partial(load_fact_encounters, chunk_size=fact_chunk_size,
+                                       workers=fact_workers, late_partitions=late_partitions,
+                                       key_cache=key_cache, bulk_load=bulk_load)
+    if instrumentation is not None:
+        tasks = {task: instrumentation.wrap(task, loader) for task, loader in tasks.items()}
+    
+    run_log = None
+    log_connection = get_connection(autocommit=True)
+    if log_connection:
+        run_log = RunLog(log_connection)
+        run_id = run_log.start_run('FULL_RELOAD' if full_reload else 'INCREMENTAL', parallel)
+        print(f"Run id: {run_id}")
+        tasks = {task: run_log.wrap(task, loader) for task, loader in tasks.items()}
+    else:
+        print("Run history not recorded (no log connection).")
+    completed, failure = False, None
+    
     try:
-        # Step 1: Load dimensions (order matters!)
-        print("STEP 1: Loading Dimensions")
-        print("-" * 40)
-        load_dim_patient(cursor)
-        connection.commit()
-        
-        load_dim_provider(cursor)
-        connection.commit()
-        
-        load_dim_department(cursor)
-        connection.commit()
-        
-        load_dim_diagnosis(cursor)
-        connection.commit()
-        
-        load_dim_procedure(cursor)
-        connection.commit()
-        
-        # Step 2: Load fact table
-        print()
-        print("STEP 2: Loading Fact Table")
-        print("-" * 40)
-        load_fact_encounters(cursor)
-        connection.commit()
-        
-        # Step 3: Update late-arriving billing
-        print()
-        print("STEP 3: Late-Arriving Facts")
-        print("-" * 40)
-        update_late_arriving_billing(cursor)
-        connection.commit()
+        if parallel:
+            pool = get_connection_pool(max_workers, allow_local_infile=bulk_load)
+            if not pool:
+                print("Failed to create connection pool.")
+                return
+            run_node = partial(run_pooled_task, pool, tasks)
+        else:
+            run_node = partial(run_connection_task, connection, cursor, tasks)
+            max_workers = 1
         
-        # Step 4: Load bridge tables
-        print()
-        print("STEP 4: Loading Bridge Tables")
-        print("-" * 40)
-        load_bridge_encounter_diagnosis(cursor)
-        connection.commit()
+        deferred = None
+        if full_reload:
+            print("Preparing full reload...")
+            deferred = prepare_full_reload(cursor)
+            connection.commit()
         
-        load_bridge_encounter_procedure(cursor)
-        connection.commit()
+        load_started = time.perf_counter()
+        try:
+            timings = run_task_graph(ETL_DEPENDENCIES, run_node, max_workers)
+        finally:
+            load_seconds = time.perf_counter() - load_started
+            if deferred is not None:
+                print("Rebuilding deferred indexes...")
+                rebuild_seconds = restore_full_reload(cursor, deferred, get_connection,
+                                                      index_workers)
+                print(f"Load: {load_seconds:.2f}s, index rebuild: {rebuild_seconds:.2f}s")
+        print_task_report(ETL_DEPENDENCIES, timings)
         
-        # Step 5: Verify
+        # Verify
         verify_load(cursor)
         
         print()
@@ -535,14 +1527,115 @@ def run_etl():
         print("ETL COMPLETED SUCCESSFULLY!")
         print("=" * 60)
         print(f"Finished at: {datetime.now()}")
+        completed = True
+        return timings
         
     except Error as e:
+        failure = e
         print(f"Error during ETL: {e}")
         connection.rollback()
     finally:
         cursor.close()
         connection.close()
+        if run_log is not None:
+            run_log.finish_run(None if completed else failure or "run aborted")
+            run_log.close()
+        if key_cache is not None and not completed:
+            # Keys of rolled-back dimension versions may be cached
+            key_cache.clear()
+
+
+def rebuild_aggregates(date_from=None, date_to=None):
+    """
+    Recompute agg_monthly_specialty from fact_encounters (all months, or the
+    months of date_key in [date_from, date_to)). Without a range the
+    diagnosis-procedure pair counts are recomputed from the bridges too.
+    """
+    connection = get_connection()
+    if not connection:
+        print("Failed to connect to database.")
+        return
+    
+    cursor = connection.cursor()
+    try:
+        print("Rebuilding agg_monthly_specialty...")
+        groups = rebuild_monthly_specialty(cursor, date_from, date_to)
+        connection.commit()
+        print(f"  Wrote {groups} month/specialty/encounter type groups")
+        if date_from is None and date_to is None:
+            print("Rebuilding agg_diagnosis_procedure_pair...")
+            diagnosis_to, procedure_to = rebuild_pair_counts(cursor)
+            update_etl_metadata(cursor, 'agg_pair_diagnosis_links', diagnosis_to,
+                                'REBUILD', watermark=(None, diagnosis_to))
+            update_etl_metadata(cursor, 'agg_pair_procedure_links', procedure_to,
+                                'REBUILD', watermark=(None, procedure_to))
+            connection.commit()
+    except Error as e:
+        print(f"Error rebuilding aggregates: {e}")
+        connection.rollback()
+    finally:
+        cursor.close()
+        connection.close()
 
 
 if __name__ == "__main__":
-    run_etl()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the incremental star schema ETL")
+    parser.add_argument('--parallel', action='store_true',
+                        help="load independent tasks concurrently on a connection pool")
+    parser.add_argument('--workers', type=int, default=DEFAULT_ETL_WORKERS,
+                        help="worker threads / pooled connections for --parallel")
+    parser.add_argument('--fact-chunk-size', type=int, default=None,
+                        help="load fact_encounters in resumable encounter_id chunks of this size")
+    parser.add_argument('--fact-workers', type=int, default=1,
+                        help="chunks loaded concurrently with --fact-chunk-size")
+    parser.add_argument('--bulk-load', action='store_true',
+                        help="write client-built rows with LOAD DATA LOCAL INFILE "
+                             "(falls back to executemany when local_infile is off)")
+    parser.add_argument('--full-reload', action='store_true',
+                        help="empty and reload the fact and bridge tables, building "
+                             "their secondary indexes after the load")
+    parser.add_argument('--index-workers', type=int, default=1,
+                        help="tables whose indexes are rebuilt concurrently with --full-reload")
+    parser.add_argument('--late-partitions', choices=LATE_PARTITION_MODES, default='insert',
+                        help="how a partitioned fact_encounters applies back-dated encounters")
+    parser.add_argument('--key-cache', action='store_true',
+                        help="resolve fact surrogate keys from an in-memory dimension key "
+                             "cache instead of joining the dimensions")
+    parser.add_argument('--metrics-jsonl', default=None,
+                        help="append per-stage metrics (statements, round trips, "
+                             "Handler_*/Innodb_rows_* deltas) to this JSON-lines file")
+    parser.add_argument('--metrics-prom', default=None,
+                        help="write per-stage metrics to this Prometheus textfile")
+    parser.add_argument('--profile-dir', default=None,
+                        help="run each stage under cProfile, writing <stage>.prof here")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="record each stage's peak Python allocation with tracemalloc")
+    parser.add_argument('--rebuild-aggregates', action='store_true',
+                        help="recompute the aggregate tables from the fact and bridge tables "
+                             "instead of running the ETL")
+    parser.add_argument('--from-date-key', type=int, default=None,
+                        help="with --rebuild-aggregates: first date_key (YYYYMMDD) to rebuild")
+    parser.add_argument('--to-date-key', type=int, default=None,
+                        help="with --rebuild-aggregates: date_key (YYYYMMDD) to stop before")
+    args = parser.parse_args()
+    if args.rebuild_aggregates:
+        rebuild_aggregates(args.from_date_key, args.to_date_key)
+    else:
+        sinks = []
+        if args.metrics_jsonl:
+            sinks.append(JsonLinesSink(args.metrics_jsonl))
+        if args.metrics_prom:
+            sinks.append(PrometheusTextfile(args.metrics_prom))
+        instrumentation = None
+        if sinks or args.profile_dir or args.trace_memory:
+            instrumentation = Instrumentation(sinks, args.profile_dir, args.trace_memory)
+        try:
+            run_etl(parallel=args.parallel, max_workers=args.workers,
+                    fact_chunk_size=args.fact_chunk_size, fact_workers=args.fact_workers,
+                    bulk_load=args.bulk_load, full_reload=args.full_reload,
+                    index_workers=args.index_workers, late_partitions=args.late_partitions,
+                    instrumentation=instrumentation,
+                    key_cache=DimensionKeyCache() if args.key_cache else None)
+        finally:
+            if instrumentation is not None:
+                instrumentation.close()
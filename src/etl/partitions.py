@@ -0,0 +1,93 @@
+"""
+Fact Table Partitioning
+Helpers for a fact_encounters RANGE-partitioned on date_key (YYYYMMDD) by
+month or quarter.
+
+MySQL only allows partitioning when every unique key contains the
+partitioning column and no foreign keys point to or from the table, so the
+partitioned layout uses PRIMARY KEY (encounter_key, date_key), UNIQUE
+(encounter_id, date_key) and no foreign keys (see setup_star_schema.py).
+Queries with a date_key predicate are pruned to the matching partitions.
+"""
+
+GRANULARITIES = ('month', 'quarter')
+
+# Months per partition
+_MONTHS = {'month': 1, 'quarter': 3}
+
+
+def _date_key(year, month):
+    return year * 10000 + month * 100 + 1
+
+
+def partition_bounds(start, end, granularity='month'):
+    """
+    (partition name, exclusive upper date_key) for each month or quarter
+    from start through end, e.g. ('p202301', 20230201) or ('p2023q1', 20230401).
+    """
+    step = _MONTHS[granularity]
+    year, month = start.year, start.month - (start.month - 1) % step
+    bounds = []
+    while (year, month) <= (end.year, end.month):
+        if granularity == 'month':
+            name = f"p{year}{month:02d}"
+        else:
+            name = f"p{year}q{(month - 1) // 3 + 1}"
+        year, month = year + (month - 1 + step) // 12, (month - 1 + step) % 12 + 1
+        bounds.append((name, _date_key(year, month)))
+    return bounds
+
+
+def partition_clause(start, end, granularity='month'):
+    """
+    PARTITION BY RANGE (date_key) clause covering start..end, with a
+    p_history partition before it and a p_future partition after it.
+    """
+    step = _MONTHS[granularity]
+    first = _date_key(start.year, start.month - (start.month - 1) % step)
+    partitions = [f"PARTITION p_history VALUES LESS THAN ({first})"]
+    partitions += [f"PARTITION {name} VALUES LESS THAN ({upper})"
+                   for name, upper in partition_bounds(start, end, granularity)]
+    partitions.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+    return "PARTITION BY RANGE (date_key) (\n        " + ",\n        ".join(partitions) + "\n    )"
+
+
+def table_partitions(cursor, table):
+    """
+    Range partitions of a table as (name, lower, upper) date_key bounds in
+    order; lower is None for the first partition, upper None for MAXVALUE.
+    Empty when the table is not partitioned.
+    """
+    cursor.execute("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+          AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (table,))
+    partitions = []
+    lower = None
+    for name, description in cursor.fetchall():
+        upper = None if description == 'MAXVALUE' else int(description)
+        partitions.append((name, lower, upper))
+        lower = upper
+    return partitions
+
+
+def partition_of(partitions, date_key):
+    """The (name, lower, upper) partition holding date_key"""
+    for partition in partitions:
+        if partition[2] is None or date_key < partition[2]:
+            return partition
+    raise ValueError(f"No partition holds date_key {date_key}")
+
+
+def partition_predicate(partition, column='date_key'):
+    """SQL range predicate selecting the rows of one partition"""
+    _, lower, upper = partition
+    conditions = []
+    if lower is not None:
+        conditions.append(f"{column} >= {int(lower)}")
+    if upper is not None:
+        conditions.append(f"{column} < {int(upper)}")
+    return " AND ".join(conditions) or "TRUE"
@@ -0,0 +1,262 @@
+"""
+ETL Run History
+etl_metadata only holds the latest load of each table. run_etl also appends
+one etl_run_log row per run and one etl_stage_log row per task-graph stage
+(start/end, seconds, rows in/out, etl_metadata watermarks before and after,
+status), so load-time growth can be tracked across runs.
+
+Rows are written on a separate autocommit connection: a stage's log row
+survives the rollback of the stage it describes. The tables are never
+dropped by setup_star_schema.
+
+Report the slowest stages and throughput trends of the last N runs:
+    python -m src.etl.run_log --runs 20
+"""
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime
+
+from mysql.connector import Error
+
+# etl_metadata rows a stage writes, where they differ from the stage name
+STAGE_METADATA = {
+    'agg_diagnosis_procedure_pair': ('agg_pair_diagnosis_links', 'agg_pair_procedure_links'),
+}
+
+DEFAULT_REPORT_RUNS = 20
+
+
+def create_run_log_tables(cursor):
+    """Create etl_run_log and etl_stage_log unless they exist (history is kept)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS etl_run_log (
+        run_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        started_at DATETIME(6) NOT NULL,
+        finished_at DATETIME(6) NULL,
+        seconds DECIMAL(12,3) NULL,
+        load_type VARCHAR(20) NOT NULL,       -- INCREMENTAL / FULL_RELOAD
+        parallel BOOLEAN NOT NULL DEFAULT FALSE,
+        rows_in BIGINT NULL,                  -- rows extracted by all stages
+        rows_out BIGINT NULL,                 -- rows loaded by all stages
+        status VARCHAR(10) NOT NULL,          -- RUNNING / SUCCESS / FAILED
+        error_message TEXT NULL,
+        INDEX idx_started_at (started_at)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS etl_stage_log (
+        stage_log_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        run_id BIGINT NOT NULL,
+        stage VARCHAR(50) NOT NULL,
+        started_at DATETIME(6) NOT NULL,
+        finished_at DATETIME(6) NOT NULL,
+        seconds DECIMAL(12,3) NOT NULL,
+        rows_in BIGINT NULL,                  -- rows extracted (new + changed + unchanged)
+        rows_out BIGINT NULL,                 -- rows the loader reports as loaded
+        watermark_before JSON NULL,           -- {etl_metadata table: [timestamp, key]}
+        watermark_after JSON NULL,
+        status VARCHAR(10) NOT NULL,          -- SUCCESS / FAILED
+        error_message TEXT NULL,
+        INDEX idx_run (run_id),
+        INDEX idx_stage_started (stage, started_at),
+        FOREIGN KEY (run_id) REFERENCES etl_run_log(run_id)
+    )
+    """)
+
+
+def metadata_state(cursor, tables):
+    """{table: (last_load_timestamp, last_load_key, rows extracted)} from etl_metadata"""
+    cursor.execute(f"""
+        SELECT table_name, last_load_timestamp, last_load_key,
+               records_new + records_changed + records_unchanged
+        FROM etl_metadata WHERE table_name IN ({', '.join(['%s'] * len(tables))})
+    """, tuple(tables))
+    return {name: (timestamp, key, extracted) for name, timestamp, key, extracted
+            in cursor.fetchall()}
+
+
+def _watermarks(state):
+    return json.dumps({name: [str(timestamp), key]
+                       for name, (timestamp, key, _) in state.items()})
+
+
+class RunLog:
+    """Writes one ETL run and its stages to etl_run_log/etl_stage_log"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.run_id = None
+        self.rows_in = 0
+        self.rows_out = 0
+        self._lock = threading.Lock()
+        create_run_log_tables(self.cursor)
+
+    def start_run(self, load_type, parallel=False):
+        self.cursor.execute("""
+            INSERT INTO etl_run_log (started_at, load_type, parallel, status)
+            VALUES (NOW(6), %s, %s, 'RUNNING')
+        """, (load_type, parallel))
+        self.run_id = self.cursor.lastrowid
+        return self.run_id
+
+    def finish_run(self, error=None):
+        with self._lock:
+            self.cursor.execute("""
+                UPDATE etl_run_log
+                SET finished_at = NOW(6),
+                    seconds = TIMESTAMPDIFF(MICROSECOND, started_at, NOW(6)) / 1e6,
+                    rows_in = %s, rows_out = %s, status = %s, error_message = %s
+                WHERE run_id = %s
+            """, (self.rows_in, self.rows_out, 'FAILED' if error else 'SUCCESS',
+                  str(error) if error else None, self.run_id))
+
+    def wrap(self, stage, loader):
+        """loader(cursor) wrapped to append the stage's etl_stage_log row"""
+        def logged(cursor):
+            return self.run_stage(stage, loader, cursor)
+        return logged
+
+    def run_stage(self, stage, loader, cursor):
+        tables = STAGE_METADATA.get(stage, (stage,))
+        before = metadata_state(cursor, tables)
+        start = datetime.now()
+        started = time.perf_counter()
+        try:
+            rows = loader(cursor)
+        except Exception as e:
+            self._log_stage(stage, start, time.perf_counter() - started, None, None,
+                            before, None, e)
+            raise
+        seconds = time.perf_counter() - started
+        after = metadata_state(cursor, tables)
+        rows_in = sum(extracted or 0 for _, _, extracted in after.values())
+        self._log_stage(stage, start, seconds, rows_in, rows, before, after)
+        return rows
+
+    def _log_stage(self, stage, start, seconds, rows_in, rows_out, before, after, error=None):
+        with self._lock:
+            self.rows_in += rows_in or 0
+            self.rows_out += rows_out or 0
+            self.cursor.execute("""
+                INSERT INTO etl_stage_log (run_id, stage, started_at, finished_at, seconds,
+                                           rows_in, rows_out, watermark_before,
+                                           watermark_after, status, error_message)
+                VALUES (%s, %s, %s, NOW(6), %s, %s, %s, %s, %s, %s, %s)
+            """, (self.run_id, stage, start, round(seconds, 3), rows_in, rows_out,
+                  _watermarks(before), _watermarks(after) if after is not None else None,
+                  'FAILED' if error else 'SUCCESS', str(error) if error else None))
+
+    def close(self):
+        self.cursor.close()
+        self.connection.close()
+
+
+def recent_runs(cursor, runs=DEFAULT_REPORT_RUNS):
+    """The last `runs` runs, newest first"""
+    cursor.execute("""
+        SELECT run_id, started_at, load_type, status, seconds, rows_in, rows_out
+        FROM etl_run_log ORDER BY run_id DESC LIMIT %s
+    """, (runs,))
+    return cursor.fetchall()
+
+
+def slowest_stages(cursor, runs=DEFAULT_REPORT_RUNS):
+    """Per stage over the successful stages of the last `runs` runs, slowest first"""
+    cursor.execute("""
+        SELECT s.stage, COUNT(*) AS stage_runs,
+               AVG(s.seconds) AS avg_seconds, MAX(s.seconds) AS max_seconds,
+               AVG(s.rows_out) AS avg_rows_out,
+               SUM(s.rows_out) / NULLIF(SUM(s.seconds), 0) AS rows_per_sec
+        FROM etl_stage_log s
+        JOIN (SELECT run_id FROM etl_run_log ORDER BY run_id DESC LIMIT %s) r
+          ON r.run_id = s.run_id
+        WHERE s.status = 'SUCCESS'
+        GROUP BY s.stage
+        ORDER BY avg_seconds DESC
+    """, (runs,))
+    return cursor.fetchall()
+
+
+def stage_trends(cursor, runs=DEFAULT_REPORT_RUNS):
+    """
+    {stage: (older rows/sec, newer rows/sec, older avg seconds, newer avg seconds)}
+    comparing the older and newer half of the last `runs` runs
+    """
+    cursor.execute("""
+        SELECT s.run_id, s.stage, s.seconds, s.rows_out
+        FROM etl_stage_log s
+        JOIN (SELECT run_id FROM etl_run_log ORDER BY run_id DESC LIMIT %s) r
+          ON r.run_id = s.run_id
+        WHERE s.status = 'SUCCESS'
+        ORDER BY s.run_id
+    """, (runs,))
+    by_stage = {}
+    for run_id, stage, seconds, rows_out in cursor.fetchall():
+        by_stage.setdefault(stage, []).append((float(seconds), rows_out or 0))
+
+    trends = {}
+    for stage, samples in by_stage.items():
+        if len(samples) < 2:
+            continue
+        halves = samples[:len(samples) // 2], samples[len(samples) // 2:]
+        rates, averages = [], []
+        for half in halves:
+            seconds = sum(t for t, _ in half)
+            rates.append(sum(r for _, r in half) / seconds if seconds else None)
+            averages.append(seconds / len(half))
+        trends[stage] = (rates[0], rates[1], averages[0], averages[1])
+    return trends
+
+
+def print_report(cursor, runs=DEFAULT_REPORT_RUNS):
+    """Print the last runs, the slowest stages and per-stage throughput trends"""
+    print("=" * 60)
+    print(f"ETL Run History (last {runs} runs)")
+    print("=" * 60)
+    for run_id, started_at, load_type, status, seconds, rows_in, rows_out in \
+            recent_runs(cursor, runs):
+        print(f"  #{run_id:<6} {started_at:%Y-%m-%d %H:%M:%S} {load_type:12} {status:8} "
+              f"{float(seconds or 0):>9.2f}s {rows_out or 0:>12,} rows out")
+
+    print("\n" + "-" * 60)
+    print("Slowest Stages")
+    print("-" * 60)
+    for stage, count, avg_seconds, max_seconds, avg_rows, rows_per_sec in \
+            slowest_stages(cursor, runs):
+        print(f"  {stage:30} avg {float(avg_seconds):>8.2f}s  max {float(max_seconds):>8.2f}s  "
+              f"{float(avg_rows or 0):>12,.0f} rows  {float(rows_per_sec or 0):>10,.0f} rows/s")
+
+    print("\n" + "-" * 60)
+    print("Throughput Trend (older half -> newer half)")
+    print("-" * 60)
+    for stage, (old_rate, new_rate, old_seconds, new_seconds) in sorted(
+            stage_trends(cursor, runs).items(), key=lambda item: -item[1][3]):
+        growth = f"{(new_seconds / old_seconds - 1) * 100:+.1f}%" if old_seconds else "n/a"
+        print(f"  {stage:30} {old_rate or 0:>10,.0f} -> {new_rate or 0:>10,.0f} rows/s  "
+              f"{old_seconds:>8.2f}s -> {new_seconds:>8.2f}s ({growth})")
+
+
+if __name__ == "__main__":
+    from .load import get_connection
+
+    parser = argparse.ArgumentParser(description="Report ETL run history")
+    parser.add_argument('--runs', type=int, default=DEFAULT_REPORT_RUNS,
+                        help="number of most recent runs to report on")
+    args = parser.parse_args()
+
+    connection = get_connection()
+    if not connection:
+        print("Failed to connect to database.")
+    else:
+        cursor = connection.cursor()
+        try:
+            print_report(cursor, args.runs)
+        except Error as e:
+            print(f"Error reading ETL run history: {e}")
+        finally:
+            cursor.close()
+            connection.close()
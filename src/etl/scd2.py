@@ -0,0 +1,235 @@
+"""
+Bulk SCD Type 2 Engine
+Shared close-old-row / insert-new-version logic for the SCD Type 2 dimensions.
+
+Each dimension is described by a spec (a plain dict, like DB_CONFIG):
+- table / surrogate_key / natural_key: the target dimension
+- columns: ordered (dim_column, source SQL expression) pairs, derived columns included
+- source: FROM clause of the extraction
+- watermark_table / watermark_key / watermark_alias: OLTP table, primary key
+  and FROM-clause alias the incremental window (src/etl/extract.py) is read on
+- tracked_columns: a change here closes the current row and inserts a new version
+  (hashed into the dimension's row_hash column)
+- type1_columns: a change here (only) overwrites the current row in place
+
+Change detection uses the persisted row_hash column (BINARY(16) MD5 of the
+tracked columns): unchanged rows are dropped from the staged copy of the
+changed OLTP rows with one indexed anti-join on
+(natural_key, is_current, row_hash), and the remaining changes are applied
+with multi-row UPDATE ... JOIN / INSERT ... SELECT statements, optionally
+split into natural-key ranges of batch_size keys. The statement count is
+O(batches) instead of O(rows).
+"""
+
+from datetime import date
+
+from .extract import window_sql, window_params
+
+# Default natural-key range covered by one set of merge statements
+DEFAULT_BATCH_SIZE = 50000
+
+PATIENT_SCD2 = {
+    'table': 'dim_patient',
+    'surrogate_key': 'patient_key',
+    'natural_key': 'patient_id',
+    'columns': [
+        ('patient_id', 'patient_id'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('full_name', "CONCAT(first_name, ' ', last_name)"),
+        ('date_of_birth', 'date_of_birth'),
+        ('gender', 'gender'),
+        ('gender_description',
+         "CASE gender WHEN 'M' THEN 'Male' WHEN 'F' THEN 'Female' ELSE 'Unknown' END"),
+        ('age', 'TIMESTAMPDIFF(YEAR, date_of_birth, CURDATE())'),
+        ('age_group', """CASE
+                WHEN TIMESTAMPDIFF(YEAR, date_of_birth, CURDATE()) < 18 THEN '0-17'
+                WHEN TIMESTAMPDIFF(YEAR, date_of_birth, CURDATE()) < 35 THEN '18-34'
+                WHEN TIMESTAMPDIFF(YEAR, date_of_birth, CURDATE()) < 55 THEN '35-54'
+                WHEN TIMESTAMPDIFF(YEAR, date_of_birth, CURDATE()) < 75 THEN '55-74'
+                ELSE '75+'
+            END"""),
+        ('mrn', 'mrn'),
+    ],
+    'source': 'FROM patients',
+    'watermark_table': 'patients',
+    'watermark_key': 'patient_id',
+    'watermark_alias': None,
+    'tracked_columns': ['first_name', 'last_name', 'date_of_birth', 'gender', 'mrn'],
+    'type1_columns': ['age', 'age_group'],
+}
+
+PROVIDER_SCD2 = {
+    'table': 'dim_provider',
+    'surrogate_key': 'provider_key',
+    'natural_key': 'provider_id',
+    'columns': [
+        ('provider_id', 'p.provider_id'),
+        ('first_name', 'p.first_name'),
+        ('last_name', 'p.last_name'),
+        ('full_name', "CONCAT(p.first_name, ' ', p.last_name)"),
+        ('credential', 'p.credential'),
+        ('specialty_id', 's.specialty_id'),
+        ('specialty_name', 's.specialty_name'),
+        ('specialty_code', 's.specialty_code'),
+        ('department_id', 'd.department_id'),
+        ('department_name', 'd.department_name'),
+    ],
+    'source': """FROM providers p
+        JOIN specialties s ON p.specialty_id = s.specialty_id
+        JOIN departments d ON p.department_id = d.department_id""",
+    'watermark_table': 'providers',
+    'watermark_key': 'provider_id',
+    'watermark_alias': 'p',
+    'tracked_columns': ['specialty_id', 'department_id'],
+    'type1_columns': ['first_name', 'last_name', 'full_name', 'credential',
+                      'specialty_name', 'specialty_code', 'department_name'],
+}
+
+
+def _null_safe_equal(columns, left='d', right='s'):
+    """Build a NULL-safe equality predicate over columns (matches Python ==)"""
+    return " AND ".join(f"{left}.{col} <=> {right}.{col}" for col in columns)
+
+
+def row_hash_expression(spec):
+    """
+    SQL expression computing row_hash from the source expressions of the
+    tracked columns. JSON_ARRAY keeps NULLs and separators unambiguous.
+    """
+    expressions = dict(spec['columns'])
+    tracked = ", ".join(expressions[col] for col in spec['tracked_columns'])
+    return f"UNHEX(MD5(JSON_ARRAY({tracked})))"
+
+
+def stage_changes(cursor, spec, window):
+    """
+    Stage the OLTP rows of the extraction window into a temporary table.
+    Returns (staging_table, min_key, max_key, staged_rows).
+    """
+    staging = f"stg_{spec['table']}"
+    select_list = ",\n            ".join(
+        f"{expr} AS {col}" for col, expr in spec['columns'])
+
+    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+    cursor.execute(f"""
+        CREATE TEMPORARY TABLE {staging} (
+            PRIMARY KEY ({spec['natural_key']})
+        ) AS
+        SELECT
+            {select_list},
+            {row_hash_expression(spec)} AS row_hash
+        {spec['source']}
+        WHERE {window_sql(window, spec['watermark_alias'])}
+    """, window_params(window))
+
+    cursor.execute(f"""
+        SELECT MIN({spec['natural_key']}), MAX({spec['natural_key']}), COUNT(*)
+        FROM {staging}
+    """)
+    min_key, max_key, staged_rows = cursor.fetchone()
+    return staging, min_key, max_key, staged_rows
+
+
+def merge_batch(cursor, spec, staging, key_from, key_to, today):
+    """
+    Apply SCD Type 2 changes for staged natural keys in [key_from, key_to].
+    Returns (new, changed, type1_updated, unchanged) row counts.
+    """
+    table = spec['table']
+    nk = spec['natural_key']
+    columns = [col for col, _ in spec['columns']]
+    type1_equal = (_null_safe_equal(spec['type1_columns'])
+                   if spec['type1_columns'] else "TRUE")
+
+    # Drop fully unchanged rows from the staging table: one anti-join
+    # served by the (natural_key, is_current, row_hash) index
+    cursor.execute(f"""
+        DELETE s FROM {staging} s
+        JOIN {table} d ON d.{nk} = s.{nk}
+            AND d.is_current = TRUE
+            AND d.row_hash = s.row_hash
+        WHERE s.{nk} BETWEEN %s AND %s
+          AND {type1_equal}
+    """, (key_from, key_to))
+    unchanged = cursor.rowcount
+
+    # Type 1: overwrite in place when only Type 1 attributes changed
+    type1_updated = 0
+    if spec['type1_columns']:
+        assignments = ", ".join(f"d.{col} = s.{col}" for col in spec['type1_columns'])
+        cursor.execute(f"""
+            UPDATE {table} d
+            JOIN {staging} s ON d.{nk} = s.{nk}
+                AND d.is_current = TRUE
+                AND d.row_hash = s.row_hash
+            SET {assignments}
+            WHERE s.{nk} BETWEEN %s AND %s
+        """, (key_from, key_to))
+        type1_updated = cursor.rowcount
+
+    # Type 2: close current versions whose tracked attributes changed
+    # (a NULL row_hash - e.g. a row loaded before hashing - counts as changed)
+    cursor.execute(f"""
+        UPDATE {table} d
+        JOIN {staging} s ON d.{nk} = s.{nk} AND d.is_current = TRUE
+        SET d.end_date = %s, d.is_current = FALSE
+        WHERE s.{nk} BETWEEN %s AND %s
+          AND NOT (d.row_hash <=> s.row_hash)
+    """, (today, key_from, key_to))
+    changed = cursor.rowcount
+
+    # Insert a current version for every staged key without one
+    # (brand-new keys plus the versions closed above)
+    cursor.execute(f"""
+        INSERT INTO {table} (
+            {", ".join(columns)}, row_hash,
+            effective_date, end_date, is_current
+        )
+        SELECT
+            {", ".join(f"s.{col}" for col in columns)}, s.row_hash,
+            %s, '9999-12-31', TRUE
+        FROM {staging} s
+        LEFT JOIN {table} d ON d.{nk} = s.{nk} AND d.is_current = TRUE
+        WHERE s.{nk} BETWEEN %s AND %s
+          AND d.{spec['surrogate_key']} IS NULL
+    """, (today, key_from, key_to))
+    new = cursor.rowcount - changed
+
+    return new, changed, type1_updated, unchanged
+
+
+def apply_scd2(cursor, spec, window, batch_size=DEFAULT_BATCH_SIZE, today=None,
+               key_cache=None):
+    """
+    Run the full SCD Type 2 merge for one dimension spec.
+    key_cache (src/etl/key_cache.py) re-reads the current keys of the
+    batch's staged natural keys after each batch (INSERT ... SELECT does not
+    return the keys it assigns).
+    Returns a dict of counters: staged, new, changed, type1_updated, unchanged.
+    """
+    today = today or date.today()
+    staging, min_key, max_key, staged_rows = stage_changes(cursor, spec, window)
+
+    totals = {'staged': staged_rows, 'new': 0, 'changed': 0,
+              'type1_updated': 0, 'unchanged': 0}
+    if staged_rows:
+        key_from = min_key
+        while key_from <= max_key:
+            key_to = key_from + batch_size - 1
+            new, changed, type1_updated, unchanged = merge_batch(
+                cursor, spec, staging, key_from, key_to, today)
+            totals['new'] += new
+            totals['changed'] += changed
+            totals['type1_updated'] += type1_updated
+            totals['unchanged'] += unchanged
+            if key_cache is not None:
+                key_cache.refresh_from(
+                    cursor, spec['table'],
+                    f"SELECT {spec['natural_key']} FROM {staging} "
+                    f"WHERE {spec['natural_key']} BETWEEN %s AND %s",
+                    (key_from, key_to))
+            key_from = key_to + 1
+
+    cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+    return totals
@@ -3,10 +3,16 @@ Healthcare Analytics Star Schema Setup
 DDL execution script for creating the dimensional model and populating static dimensions.
 """
 
+import argparse
 import mysql.connector
 from mysql.connector import Error
 from datetime import datetime, timedelta
 
+from .aggregates import create_aggregate_tables, create_pair_tables
+from .bulk_load import bulk_insert
+from .partitions import GRANULARITIES, partition_clause
+from .run_log import create_run_log_tables
+
 # Configuration
 DB_CONFIG = {
     'host': 'localhost',
@@ -16,23 +22,41 @@ DB_CONFIG = {
     'database': 'healthcare_db'
 }
 
+# Calendar range of dim_date (and of the fact_encounters date partitions)
+DIM_DATE_START = datetime(2023, 1, 1)
+DIM_DATE_END = datetime(2025, 12, 31)
+
 
-def get_connection():
-    """Create database connection"""
+def get_connection(**options):
+    """Create database connection (options override DB_CONFIG, e.g. allow_local_infile)"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = mysql.connector.connect(**DB_CONFIG, **options)
         return connection
     except Error as e:
         print(f"Error connecting to MySQL: {e}")
         return None
 
 
-def create_star_schema_tables(cursor):
-    """Create all star schema tables"""
+def create_star_schema_tables(cursor, partition_by=None):
+    """
+    Create all star schema tables.
+    partition_by='month' or 'quarter' creates fact_encounters RANGE-partitioned
+    on date_key (src/etl/partitions.py). MySQL requires the partitioning
+    column in every unique key and allows no foreign keys on a partitioned
+    table, so its keys become (encounter_key, date_key) and
+    (encounter_id, date_key), and fact and bridge rows are kept consistent by
+    the ETL joins instead of foreign keys.
+    """
     print("Creating star schema tables...")
     
     # Drop tables in correct order (respect foreign keys)
     drop_tables = [
+        "DROP VIEW IF EXISTS v_monthly_specialty",
+        "DROP TABLE IF EXISTS agg_monthly_specialty_patients",
+        "DROP TABLE IF EXISTS agg_monthly_specialty",
+        "DROP TABLE IF EXISTS fact_readmission",
+        "DROP TABLE IF EXISTS agg_diagnosis_procedure_pair_monthly",
+        "DROP TABLE IF EXISTS agg_diagnosis_procedure_pair",
         "DROP TABLE IF EXISTS bridge_encounter_procedure",
         "DROP TABLE IF EXISTS bridge_encounter_diagnosis",
         "DROP TABLE IF EXISTS fact_encounters",
@@ -54,14 +78,24 @@ def create_star_schema_tables(cursor):
     cursor.execute("""
     CREATE TABLE etl_metadata (
         table_name VARCHAR(50) PRIMARY KEY,
-        last_load_timestamp DATETIME NOT NULL,
+        last_load_timestamp DATETIME NOT NULL,  -- high-water mark: max updated_at read
+        last_load_key INT NULL,           -- primary key of that row (tie-breaker)
         records_loaded INT DEFAULT 0,
+        records_new INT DEFAULT 0,        -- extracted rows not yet in the target
+        records_changed INT DEFAULT 0,    -- extracted rows that changed the target
+        records_unchanged INT DEFAULT 0,  -- extracted rows that were already up to date
         load_type VARCHAR(20) DEFAULT 'INCREMENTAL',
+        resume_key INT NULL,              -- chunked loads: last key of contiguous completed chunks
+        resume_started_at DATETIME NULL,  -- chunked loads: extraction cutoff of the interrupted run
         updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
     )
     """)
     print("  - Created etl_metadata")
     
+    # Run history is kept across schema rebuilds
+    create_run_log_tables(cursor)
+    print("  - Ensured etl_run_log / etl_stage_log")
+    
     # Create dimension tables
     cursor.execute("""
     CREATE TABLE dim_date (
@@ -99,11 +133,13 @@ def create_star_schema_tables(cursor):
         age INT,
         age_group VARCHAR(20),
         mrn VARCHAR(20),
+        row_hash BINARY(16),  -- MD5 of tracked SCD2 columns (change detection)
         effective_date DATE NOT NULL,
         end_date DATE DEFAULT '9999-12-31',
         is_current BOOLEAN DEFAULT TRUE,
         INDEX idx_patient_id (patient_id),
         INDEX idx_patient_current (patient_id, is_current),
+        INDEX idx_patient_hash (patient_id, is_current, row_hash),
         INDEX idx_age_group (age_group),
         INDEX idx_gender (gender)
     )
@@ -124,11 +160,13 @@ def create_star_schema_tables(cursor):
         specialty_code VARCHAR(10),
         department_id INT,
         department_name VARCHAR(100),
+        row_hash BINARY(16),  -- MD5 of tracked SCD2 columns (change detection)
         effective_date DATE NOT NULL,
         end_date DATE DEFAULT '9999-12-31',
         is_current BOOLEAN DEFAULT TRUE,
         INDEX idx_provider_id (provider_id),
         INDEX idx_provider_current (provider_id, is_current),
+        INDEX idx_provider_hash (provider_id, is_current, row_hash),
         INDEX idx_specialty (specialty_name),
         INDEX idx_department (department_name)
     )
@@ -183,9 +221,29 @@ def create_star_schema_tables(cursor):
     """)
     print("  - Created dim_procedure")
     
-    cursor.execute("""
+    if partition_by:
+        fact_keys = """
+        PRIMARY KEY (encounter_key, date_key),
+        UNIQUE INDEX idx_encounter_id (encounter_id, date_key),"""
+        fact_partitioning = partition_clause(DIM_DATE_START, DIM_DATE_END, partition_by)
+        encounter_key_reference = ""
+    else:
+        fact_keys = """
+        PRIMARY KEY (encounter_key),
+        FOREIGN KEY (date_key) REFERENCES dim_date(date_key),
+        FOREIGN KEY (discharge_date_key) REFERENCES dim_date(date_key),
+        FOREIGN KEY (patient_key) REFERENCES dim_patient(patient_key),
+        FOREIGN KEY (provider_key) REFERENCES dim_provider(provider_key),
+        FOREIGN KEY (department_key) REFERENCES dim_department(department_key),
+        FOREIGN KEY (encounter_type_key) REFERENCES dim_encounter_type(encounter_type_key),
+        UNIQUE INDEX idx_encounter_id (encounter_id),"""
+        fact_partitioning = ""
+        encounter_key_reference = """
+        FOREIGN KEY (encounter_key) REFERENCES fact_encounters(encounter_key),"""
+    
+    cursor.execute(f"""
     CREATE TABLE fact_encounters (
-        encounter_key INT PRIMARY KEY AUTO_INCREMENT,
+        encounter_key INT NOT NULL AUTO_INCREMENT,
         encounter_id INT NOT NULL,
         date_key INT NOT NULL,
         discharge_date_key INT,
@@ -200,30 +258,26 @@ def create_star_schema_tables(cursor):
         total_claim_amount DECIMAL(12,2) DEFAULT 0,
         total_allowed_amount DECIMAL(12,2) DEFAULT 0,
         claim_status VARCHAR(50),
-        length_of_stay_days INT,
-        FOREIGN KEY (date_key) REFERENCES dim_date(date_key),
-        FOREIGN KEY (discharge_date_key) REFERENCES dim_date(date_key),
-        FOREIGN KEY (patient_key) REFERENCES dim_patient(patient_key),
-        FOREIGN KEY (provider_key) REFERENCES dim_provider(provider_key),
-        FOREIGN KEY (department_key) REFERENCES dim_department(department_key),
-        FOREIGN KEY (encounter_type_key) REFERENCES dim_encounter_type(encounter_type_key),
-        UNIQUE INDEX idx_encounter_id (encounter_id),
+        length_of_stay_days INT,{fact_keys}
         INDEX idx_date_key (date_key),
         INDEX idx_patient_key (patient_key),
         INDEX idx_provider_key (provider_key),
         INDEX idx_encounter_type_key (encounter_type_key),
         INDEX idx_date_specialty (date_key, provider_key)
     )
+    {fact_partitioning}
     """)
-    print("  - Created fact_encounters")
+    if partition_by:
+        print(f"  - Created fact_encounters (partitioned by {partition_by})")
+    else:
+        print("  - Created fact_encounters")
     
-    cursor.execute("""
+    cursor.execute(f"""
     CREATE TABLE bridge_encounter_diagnosis (
         bridge_id INT PRIMARY KEY AUTO_INCREMENT,
         encounter_key INT NOT NULL,
         diagnosis_key INT NOT NULL,
-        diagnosis_sequence INT,
-        FOREIGN KEY (encounter_key) REFERENCES fact_encounters(encounter_key),
+        diagnosis_sequence INT,{encounter_key_reference}
         FOREIGN KEY (diagnosis_key) REFERENCES dim_diagnosis(diagnosis_key),
         INDEX idx_encounter_key (encounter_key),
         INDEX idx_diagnosis_key (diagnosis_key),
@@ -232,13 +286,12 @@ def create_star_schema_tables(cursor):
     """)
     print("  - Created bridge_encounter_diagnosis")
     
-    cursor.execute("""
+    cursor.execute(f"""
     CREATE TABLE bridge_encounter_procedure (
         bridge_id INT PRIMARY KEY AUTO_INCREMENT,
         encounter_key INT NOT NULL,
         procedure_key INT NOT NULL,
-        procedure_date DATE,
-        FOREIGN KEY (encounter_key) REFERENCES fact_encounters(encounter_key),
+        procedure_date DATE,{encounter_key_reference}
         FOREIGN KEY (procedure_key) REFERENCES dim_procedure(procedure_key),
         INDEX idx_encounter_key (encounter_key),
         INDEX idx_procedure_key (procedure_key),
@@ -247,15 +300,38 @@ def create_star_schema_tables(cursor):
     """)
     print("  - Created bridge_encounter_procedure")
     
+    # Derived from fact_encounters by the ETL; no foreign key to it, so a
+    # partitioned fact table and full reloads keep working
+    cursor.execute("""
+    CREATE TABLE fact_readmission (
+        encounter_key INT PRIMARY KEY,          -- inpatient index encounter
+        patient_id INT NOT NULL,
+        provider_key INT NOT NULL,
+        discharge_date_key INT,
+        next_encounter_key INT,                 -- first inpatient admission after discharge day
+        days_to_readmission INT,                -- next admission date - discharge date
+        is_readmission BOOLEAN NOT NULL DEFAULT FALSE,  -- within READMISSION_WINDOW_DAYS
+        INDEX idx_patient_id (patient_id),
+        INDEX idx_provider_key (provider_key)
+    )
+    """)
+    print("  - Created fact_readmission")
+    
+    create_aggregate_tables(cursor)
+    create_pair_tables(cursor)
+    
     print("All star schema tables created successfully!")
 
 
-def populate_dim_date(cursor):
-    """Populate the date dimension with dates from 2023-2025"""
+def populate_dim_date(cursor, bulk_load=False):
+    """
+    Populate the date dimension with dates from 2023-2025.
+    bulk_load=True uses LOAD DATA LOCAL INFILE (src/etl/bulk_load.py).
+    """
     print("Populating dim_date...")
     
-    start_date = datetime(2023, 1, 1)
-    end_date = datetime(2025, 12, 31)
+    start_date = DIM_DATE_START
+    end_date = DIM_DATE_END
     current_date = start_date
     
     day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
@@ -283,14 +359,10 @@ def populate_dim_date(cursor):
         
         current_date += timedelta(days=1)
     
-    insert_query = """
-    INSERT INTO dim_date (date_key, calendar_date, year, quarter, month, month_name,
-                         week_of_year, day_of_month, day_of_week, day_name, is_weekend,
-                         fiscal_year, fiscal_quarter)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    
-    cursor.executemany(insert_query, dates)
+    columns = ('date_key', 'calendar_date', 'year', 'quarter', 'month', 'month_name',
+               'week_of_year', 'day_of_month', 'day_of_week', 'day_name', 'is_weekend',
+               'fiscal_year', 'fiscal_quarter')
+    bulk_insert(cursor, 'dim_date', columns, dates, load_data=bulk_load)
     print(f"  Loaded {len(dates)} dates into dim_date")
 
 
@@ -307,15 +379,18 @@ def populate_dim_encounter_type(cursor):
     print("  Loaded 3 encounter types")
 
 
-def setup_star_schema():
-    """Main function to set up the star schema"""
+def setup_star_schema(bulk_load=False, partition_by=None):
+    """
+    Main function to set up the star schema.
+    partition_by='month'/'quarter' partitions fact_encounters by date_key.
+    """
     print("=" * 60)
     print("Star Schema Initialization")
     print("=" * 60)
     print(f"Started at: {datetime.now()}")
     print()
     
-    connection = get_connection()
+    connection = get_connection(allow_local_infile=bulk_load)
     if not connection:
         print("Failed to connect to database.")
         return
@@ -324,12 +399,12 @@ def setup_star_schema():
     
     try:
         # Create tables
-        create_star_schema_tables(cursor)
+        create_star_schema_tables(cursor, partition_by=partition_by)
         connection.commit()
         
         # Populate static dimensions
         print()
-        populate_dim_date(cursor)
+        populate_dim_date(cursor, bulk_load=bulk_load)
         connection.commit()
         
         populate_dim_encounter_type(cursor)
@@ -352,4 +427,10 @@ def setup_star_schema():
 
 
 if __name__ == "__main__":
-    setup_star_schema()
+    parser = argparse.ArgumentParser(description="Create the star schema and static dimensions")
+    parser.add_argument('--bulk-load', action='store_true',
+                        help="populate dim_date with LOAD DATA LOCAL INFILE")
+    parser.add_argument('--partition-by', choices=GRANULARITIES, default=None,
+                        help="RANGE-partition fact_encounters on date_key by month or quarter")
+    args = parser.parse_args()
+    setup_star_schema(bulk_load=args.bulk_load, partition_by=args.partition_by)
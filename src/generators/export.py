@@ -0,0 +1,226 @@
+"""
+Offline Export
+Writes the generated OLTP tables to partitioned CSV or Parquet files instead
+of a live database, so a large dataset can be generated once on a build box,
+shipped, and bulk-loaded in parallel on each test node.
+
+Layout: <output_dir>/<table>/part-00000.<csv|parquet> (at most partition_rows
+rows per file) plus manifest.json with the counts, seed and files per table.
+Rows are streamed in chunks of chunk_rows, so memory stays bounded by the
+chunk size, not the table size.
+
+CSV files have a header line and load with LOAD DATA LOCAL INFILE
+(load_exported_data below). Parquet needs pyarrow (the "parquet" extra).
+"""
+
+import csv
+import json
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for --format parquet
+    pa = pq = None
+
+from mysql.connector import Error
+
+from .generate_data import TABLE_COLUMNS, get_connection, table_rows
+
+FORMATS = ('csv', 'parquet')
+
+# Rows per output file
+DEFAULT_PARTITION_ROWS = 1000000
+
+# Rows held in memory per write
+DEFAULT_CHUNK_ROWS = 50000
+
+# Parallel LOAD DATA statements when loading an export
+DEFAULT_LOAD_WORKERS = 4
+
+
+def row_chunks(rows, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Turn a row stream into lists of columns of at most chunk_rows rows"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return
+        yield [list(column) for column in zip(*chunk)]
+
+
+def column_chunks(shards, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Turn vectorized shard column dicts into lists of at most chunk_rows rows"""
+    for columns in shards:
+        arrays = list(columns.values())
+        for start in range(0, len(arrays[0]), chunk_rows):
+            # tolist() converts datetime64 to datetime/date and numbers to Python types
+            yield [array[start:start + chunk_rows].tolist() for array in arrays]
+
+
+class CsvPartition:
+    """One CSV output file with a header line"""
+
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file, lineterminator='\n')
+        self.writer.writerow(columns)
+
+    def write(self, chunk):
+        self.writer.writerows(zip(*chunk))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetPartition:
+    """One Parquet output file, one row group per chunk"""
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        self.writer = None
+
+    def write(self, chunk):
+        table = pa.table(dict(zip(self.columns, chunk)))
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+PARTITION_TYPES = {'csv': CsvPartition, 'parquet': ParquetPartition}
+
+
+def write_partitions(chunks, table, columns, output_dir, fmt='csv',
+                     partition_rows=DEFAULT_PARTITION_ROWS):
+    """
+    Write column chunks of one table to numbered partition files.
+    Returns (rows written, list of file names relative to output_dir).
+    """
+    table_dir = os.path.join(output_dir, table)
+    os.makedirs(table_dir, exist_ok=True)
+
+    files = []
+    partition = None
+    partition_size = 0
+    total = 0
+    try:
+        for chunk in chunks:
+            start, size = 0, len(chunk[0])
+            while start < size:
+                if partition is None or partition_size == partition_rows:
+                    if partition is not None:
+                        partition.close()
+                    name = os.path.join(table, f"part-{len(files):05d}.{fmt}")
+                    partition = PARTITION_TYPES[fmt](os.path.join(output_dir, name), columns)
+                    files.append(name)
+                    partition_size = 0
+                take = min(size - start, partition_rows - partition_size)
+                partition.write([column[start:start + take] for column in chunk])
+                partition_size += take
+                start += take
+            total += size
+    finally:
+        if partition is not None:
+            partition.close()
+    return total, files
+
+
+def export_all_data(output_dir, counts, seed, fmt='csv', partition_rows=DEFAULT_PARTITION_ROWS,
+                    vectorized=False, workers=None):
+    """
+    Generate every OLTP table into partitioned files under output_dir.
+    Same seed and counts give the same rows as generate_all_data in the same mode.
+    Returns the manifest dict (also written to output_dir/manifest.json).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == 'parquet' and pa is None:
+        raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    print(f"Exporting to {output_dir} ({fmt}), seed {seed}")
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {'format': fmt, 'seed': seed, 'counts': counts, 'tables': {}}
+
+    if vectorized:
+        # Optional NumPy dependency: only imported in this mode
+        from .vectorized import TABLE_GENERATORS, generate_table
+        pool = ProcessPoolExecutor(max_workers=workers)
+    else:
+        TABLE_GENERATORS = {}
+        pool = nullcontext()
+        random.seed(seed)
+
+    with pool as executor:
+        for table, columns in TABLE_COLUMNS.items():
+            print(f"Exporting {table}...")
+            if table in TABLE_GENERATORS:
+                chunks = column_chunks(generate_table(executor, table, counts, seed))
+            else:
+                chunks = row_chunks(table_rows(table, counts))
+            rows, files = write_partitions(chunks, table, columns, output_dir, fmt,
+                                           partition_rows)
+            manifest['tables'][table] = {'columns': list(columns), 'rows': rows, 'files': files}
+            print(f"  Wrote {rows} rows to {len(files)} file(s)")
+
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_partition(path, table, columns):
+    """LOAD DATA LOCAL INFILE one exported CSV file on its own connection"""
+    connection = get_connection(allow_local_infile=True)
+    if connection is None:
+        raise Error("No database connection for loading exported data")
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE %s
+            INTO TABLE {table}
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+            LINES TERMINATED BY '\\n'
+            IGNORE 1 LINES
+            ({', '.join(columns)})
+        """, (path,))
+        connection.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def load_exported_data(input_dir, workers=DEFAULT_LOAD_WORKERS):
+    """
+    Load a CSV export into the OLTP tables (which should be empty).
+    Tables load parents first; the partitions of a table load in parallel,
+    one connection each, with foreign-key and unique checks disabled.
+    Returns {table: rows loaded}.
+    """
+    with open(os.path.join(input_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+    if manifest['format'] != 'csv':
+        raise ValueError("Only CSV exports can be loaded with LOAD DATA")
+
+    loaded = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for table, spec in manifest['tables'].items():
+            print(f"Loading {table} ({len(spec['files'])} file(s))...")
+            futures = [executor.submit(load_partition, os.path.join(input_dir, name),
+                                       table, spec['columns'])
+                       for name in spec['files']]
+            loaded[table] = sum(future.result() for future in futures)
+            print(f"  Loaded {loaded[table]} rows (expected {spec['rows']})")
+    return loaded
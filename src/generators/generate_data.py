@@ -1,14 +1,23 @@
 """
 Healthcare Analytics Data Generator
 Synthetic data generation script to populate OLTP tables with realistic test data.
-Target volume: ~10,000 patients, ~50,000 encounters.
+Target volume: ~10,000 patients, ~50,000 encounters per unit of --scale-factor.
+
+--vectorized switches the bulk tables to the NumPy generator in
+src/generators/vectorized.py (column-at-a-time, sharded over processes).
+--bulk-load inserts them with LOAD DATA LOCAL INFILE (src/etl/bulk_load.py).
+--output-dir writes partitioned CSV/Parquet files instead of using the
+database, and --load-from loads such a CSV export (src/generators/export.py).
 """
 
+import argparse
 import random
 from datetime import datetime, timedelta
 import mysql.connector
 from mysql.connector import Error
 
+from ..etl.bulk_load import bulk_insert
+
 # Configuration - matches docker-compose.yml and .env settings
 DB_CONFIG = {
     'host': 'localhost',
@@ -154,6 +163,34 @@ PROCEDURES = [
     (30, '31500', 'Intubation')
 ]
 
+# Row counts at scale factor 1. Scaling multiplies all three, so patients per
+# provider and encounters per patient stay constant; junction fan-out is per
+# encounter and reference tables (specialties, departments, ...) are fixed.
+BASE_COUNTS = {
+    'patients': 10000,
+    'providers': 200,
+    'encounters': 50000,
+}
+
+# Generated OLTP tables in load order (parents first) and their columns
+TABLE_COLUMNS = {
+    'specialties': ('specialty_id', 'specialty_name', 'specialty_code'),
+    'departments': ('department_id', 'department_name', 'floor', 'capacity'),
+    'diagnoses': ('diagnosis_id', 'icd10_code', 'icd10_description'),
+    'procedures': ('procedure_id', 'cpt_code', 'cpt_description'),
+    'patients': ('patient_id', 'first_name', 'last_name', 'date_of_birth', 'gender', 'mrn'),
+    'providers': ('provider_id', 'first_name', 'last_name', 'credential',
+                  'specialty_id', 'department_id'),
+    'encounters': ('encounter_id', 'patient_id', 'provider_id', 'encounter_type',
+                   'encounter_date', 'discharge_date', 'department_id'),
+    'encounter_diagnoses': ('encounter_diagnosis_id', 'encounter_id', 'diagnosis_id',
+                            'diagnosis_sequence'),
+    'encounter_procedures': ('encounter_procedure_id', 'encounter_id', 'procedure_id',
+                             'procedure_date'),
+    'billing': ('billing_id', 'encounter_id', 'claim_amount', 'allowed_amount',
+                'claim_date', 'claim_status'),
+}
+
 ENCOUNTER_TYPES = ['Outpatient', 'Inpatient', 'ER']
 CLAIM_STATUSES = ['Paid', 'Pending', 'Denied', 'Appealed', 'Partially Paid']
 CREDENTIALS = ['MD', 'DO', 'NP', 'PA']
@@ -177,10 +214,21 @@ def random_encounter_date(start_date=datetime(2023, 1, 1), end_date=datetime(202
     return start_date + timedelta(days=random_days, hours=random_hours, minutes=random_minutes)
 
 
-def get_connection():
-    """Create database connection"""
+def scaled_counts(scale_factor=1.0, **overrides):
+    """
+    Row counts for a scale factor (TPC-style: SF 20 = 1M encounters).
+    Explicit per-table counts in overrides (None = scaled) take precedence.
+    """
+    counts = {table: max(1, round(base * scale_factor))
+              for table, base in BASE_COUNTS.items()}
+    counts.update({table: count for table, count in overrides.items() if count is not None})
+    return counts
+
+
+def get_connection(**options):
+    """Create database connection (options override DB_CONFIG, e.g. allow_local_infile)"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = mysql.connector.connect(**DB_CONFIG, **options)
         return connection
     except Error as e:
         print(f"Error connecting to MySQL: {e}")
@@ -234,16 +282,10 @@ def insert_procedures(cursor):
     print(f"  Inserted {len(PROCEDURES)} procedures")
 
 
-def insert_patients(cursor, count=10000):
-    """Insert patient data"""
-    print(f"Inserting {count} patients...")
-    query = """INSERT INTO patients 
-               (patient_id, first_name, last_name, date_of_birth, gender, mrn) 
-               VALUES (%s, %s, %s, %s, %s, %s)"""
-    
-    patients = []
+def patient_rows(count=10000):
+    """Yield patient rows (TABLE_COLUMNS['patients'] order)"""
     for i in range(1, count + 1):
-        patient = (
+        yield (
             i,
             random.choice(FIRST_NAMES),
             random.choice(LAST_NAMES),
@@ -251,30 +293,13 @@ def insert_patients(cursor, count=10000):
             random.choice(['M', 'F']),
             f'MRN{i:06d}'
         )
-        patients.append(patient)
-        
-        if i % 1000 == 0:
-            cursor.executemany(query, patients)
-            print(f"  Inserted {i} patients...")
-            patients = []
-    
-    if patients:
-        cursor.executemany(query, patients)
-    
-    print(f"  Total: {count} patients inserted")
 
 
-def insert_providers(cursor, count=200):
-    """Insert provider data"""
-    print(f"Inserting {count} providers...")
-    query = """INSERT INTO providers 
-               (provider_id, first_name, last_name, credential, specialty_id, department_id) 
-               VALUES (%s, %s, %s, %s, %s, %s)"""
-    
-    providers = []
+def provider_rows(count=200):
+    """Yield provider rows"""
     for i in range(1, count + 1):
         specialty_id = random.randint(1, len(SPECIALTIES))
-        provider = (
+        yield (
             i,
             random.choice(FIRST_NAMES),
             random.choice(LAST_NAMES),
@@ -282,22 +307,10 @@ def insert_providers(cursor, count=200):
             specialty_id,
             specialty_id  # Same as specialty for simplicity
         )
-        providers.append(provider)
-    
-    cursor.executemany(query, providers)
-    print(f"  Inserted {count} providers")
-    return count
 
 
-def insert_encounters(cursor, patient_count=10000, encounter_count=50000):
-    """Insert encounter data"""
-    print(f"Inserting {encounter_count} encounters...")
-    query = """INSERT INTO encounters 
-               (encounter_id, patient_id, provider_id, encounter_type, 
-                encounter_date, discharge_date, department_id) 
-               VALUES (%s, %s, %s, %s, %s, %s, %s)"""
-    
-    encounters = []
+def encounter_rows(patient_count=10000, provider_count=200, encounter_count=50000):
+    """Yield encounter rows"""
     for i in range(1, encounter_count + 1):
         encounter_date = random_encounter_date()
         encounter_type = random.choice(ENCOUNTER_TYPES)
@@ -312,68 +325,33 @@ def insert_encounters(cursor, patient_count=10000, encounter_count=50000):
         
         department_id = random.randint(1, len(DEPARTMENTS))
         
-        encounter = (
+        yield (
             i,
             random.randint(1, patient_count),
-            random.randint(1, 200),  # provider_id
+            random.randint(1, provider_count),
             encounter_type,
             encounter_date.strftime('%Y-%m-%d %H:%M:%S'),
             discharge_date.strftime('%Y-%m-%d %H:%M:%S'),
             department_id
         )
-        encounters.append(encounter)
-        
-        if i % 5000 == 0:
-            cursor.executemany(query, encounters)
-            print(f"  Inserted {i} encounters...")
-            encounters = []
-    
-    if encounters:
-        cursor.executemany(query, encounters)
-    
-    print(f"  Total: {encounter_count} encounters inserted")
 
 
-def insert_encounter_diagnoses(cursor, encounter_count=50000):
-    """Insert encounter-diagnosis junction data (1-4 diagnoses per encounter)"""
-    print("Inserting encounter diagnoses...")
-    query = """INSERT INTO encounter_diagnoses 
-               (encounter_diagnosis_id, encounter_id, diagnosis_id, diagnosis_sequence) 
-               VALUES (%s, %s, %s, %s)"""
-    
-    enc_diagnoses = []
+def encounter_diagnosis_rows(encounter_count=50000):
+    """Yield encounter-diagnosis rows (1-4 diagnoses per encounter)"""
     ed_id = 1
-    
     for enc_id in range(1, encounter_count + 1):
         # Each encounter has 1-4 diagnoses
         num_diagnoses = random.randint(1, 4)
         diagnosis_ids = random.sample(range(1, len(DIAGNOSES) + 1), num_diagnoses)
         
         for seq, diag_id in enumerate(diagnosis_ids, 1):
-            enc_diagnoses.append((ed_id, enc_id, diag_id, seq))
+            yield (ed_id, enc_id, diag_id, seq)
             ed_id += 1
-        
-        if enc_id % 5000 == 0:
-            cursor.executemany(query, enc_diagnoses)
-            print(f"  Processed {enc_id} encounters (diagnoses)...")
-            enc_diagnoses = []
-    
-    if enc_diagnoses:
-        cursor.executemany(query, enc_diagnoses)
-    
-    print(f"  Total: {ed_id - 1} encounter-diagnosis records inserted")
 
 
-def insert_encounter_procedures(cursor, encounter_count=50000):
-    """Insert encounter-procedure junction data (1-3 procedures per encounter)"""
-    print("Inserting encounter procedures...")
-    query = """INSERT INTO encounter_procedures 
-               (encounter_procedure_id, encounter_id, procedure_id, procedure_date) 
-               VALUES (%s, %s, %s, %s)"""
-    
-    enc_procedures = []
+def encounter_procedure_rows(encounter_count=50000):
+    """Yield encounter-procedure rows (1-3 procedures per encounter)"""
     ep_id = 1
-    
     for enc_id in range(1, encounter_count + 1):
         # Each encounter has 1-3 procedures
         num_procedures = random.randint(1, 3)
@@ -383,36 +361,19 @@ def insert_encounter_procedures(cursor, encounter_count=50000):
         proc_date = random_encounter_date()
         
         for proc_id in procedure_ids:
-            enc_procedures.append((ep_id, enc_id, proc_id, proc_date.strftime('%Y-%m-%d')))
+            yield (ep_id, enc_id, proc_id, proc_date.strftime('%Y-%m-%d'))
             ep_id += 1
-        
-        if enc_id % 5000 == 0:
-            cursor.executemany(query, enc_procedures)
-            print(f"  Processed {enc_id} encounters (procedures)...")
-            enc_procedures = []
-    
-    if enc_procedures:
-        cursor.executemany(query, enc_procedures)
-    
-    print(f"  Total: {ep_id - 1} encounter-procedure records inserted")
 
 
-def insert_billing(cursor, encounter_count=50000):
-    """Insert billing data (1 billing record per encounter)"""
-    print("Inserting billing records...")
-    query = """INSERT INTO billing 
-               (billing_id, encounter_id, claim_amount, allowed_amount, claim_date, claim_status) 
-               VALUES (%s, %s, %s, %s, %s, %s)"""
-    
-    billing_records = []
-    
+def billing_rows(encounter_count=50000):
+    """Yield billing rows (1 billing record per encounter)"""
     for i in range(1, encounter_count + 1):
         claim_amount = round(random.uniform(100, 50000), 2)
         # Allowed amount is typically 60-95% of claim amount
         allowed_amount = round(claim_amount * random.uniform(0.6, 0.95), 2)
         claim_date = random_encounter_date()
         
-        billing = (
+        yield (
             i,
             i,  # encounter_id
             claim_amount,
@@ -420,27 +381,104 @@ def insert_billing(cursor, encounter_count=50000):
             claim_date.strftime('%Y-%m-%d'),
             random.choice(CLAIM_STATUSES)
         )
-        billing_records.append(billing)
-        
-        if i % 5000 == 0:
-            cursor.executemany(query, billing_records)
-            print(f"  Inserted {i} billing records...")
-            billing_records = []
-    
-    if billing_records:
-        cursor.executemany(query, billing_records)
-    
-    print(f"  Total: {encounter_count} billing records inserted")
 
 
-def generate_all_data():
-    """Main function to generate all data"""
+def table_rows(table, counts):
+    """Row stream of any generated table for the given counts (parents first)"""
+    sources = {
+        'specialties': lambda: iter(SPECIALTIES),
+        'departments': lambda: iter(DEPARTMENTS),
+        'diagnoses': lambda: iter(DIAGNOSES),
+        'procedures': lambda: iter(PROCEDURES),
+        'patients': lambda: patient_rows(counts['patients']),
+        'providers': lambda: provider_rows(counts['providers']),
+        'encounters': lambda: encounter_rows(
+            counts['patients'], counts['providers'], counts['encounters']),
+        'encounter_diagnoses': lambda: encounter_diagnosis_rows(counts['encounters']),
+        'encounter_procedures': lambda: encounter_procedure_rows(counts['encounters']),
+        'billing': lambda: billing_rows(counts['encounters']),
+    }
+    return sources[table]()
+
+
+def insert_patients(cursor, count=10000, bulk_load=False):
+    """Insert patient data"""
+    print(f"Inserting {count} patients...")
+    inserted = bulk_insert(cursor, 'patients', TABLE_COLUMNS['patients'],
+                           patient_rows(count), load_data=bulk_load)
+    print(f"  Total: {inserted} patients inserted")
+    return inserted
+
+
+def insert_providers(cursor, count=200, bulk_load=False):
+    """Insert provider data"""
+    print(f"Inserting {count} providers...")
+    inserted = bulk_insert(cursor, 'providers', TABLE_COLUMNS['providers'],
+                           provider_rows(count), load_data=bulk_load)
+    print(f"  Inserted {inserted} providers")
+    return inserted
+
+
+def insert_encounters(cursor, patient_count=10000, provider_count=200, encounter_count=50000,
+                      bulk_load=False):
+    """Insert encounter data"""
+    print(f"Inserting {encounter_count} encounters...")
+    inserted = bulk_insert(cursor, 'encounters', TABLE_COLUMNS['encounters'],
+                           encounter_rows(patient_count, provider_count, encounter_count),
+                           load_data=bulk_load)
+    print(f"  Total: {inserted} encounters inserted")
+    return inserted
+
+
+def insert_encounter_diagnoses(cursor, encounter_count=50000, bulk_load=False):
+    """Insert encounter-diagnosis junction data (1-4 diagnoses per encounter)"""
+    print("Inserting encounter diagnoses...")
+    inserted = bulk_insert(cursor, 'encounter_diagnoses', TABLE_COLUMNS['encounter_diagnoses'],
+                           encounter_diagnosis_rows(encounter_count), load_data=bulk_load)
+    print(f"  Total: {inserted} encounter-diagnosis records inserted")
+    return inserted
+
+
+def insert_encounter_procedures(cursor, encounter_count=50000, bulk_load=False):
+    """Insert encounter-procedure junction data (1-3 procedures per encounter)"""
+    print("Inserting encounter procedures...")
+    inserted = bulk_insert(cursor, 'encounter_procedures', TABLE_COLUMNS['encounter_procedures'],
+                           encounter_procedure_rows(encounter_count), load_data=bulk_load)
+    print(f"  Total: {inserted} encounter-procedure records inserted")
+    return inserted
+
+
+def insert_billing(cursor, encounter_count=50000, bulk_load=False):
+    """Insert billing data (1 billing record per encounter)"""
+    print("Inserting billing records...")
+    inserted = bulk_insert(cursor, 'billing', TABLE_COLUMNS['billing'],
+                           billing_rows(encounter_count), load_data=bulk_load)
+    print(f"  Total: {inserted} billing records inserted")
+    return inserted
+
+
+def generate_all_data(counts=None, seed=None, vectorized=False, workers=None,
+                      bulk_load=False, disable_checks=False):
+    """
+    Main function to generate all data.
+    counts: {'patients', 'providers', 'encounters'} row counts (default: BASE_COUNTS)
+    seed: random seed; the same seed and counts reproduce the same dataset
+    vectorized=True generates the bulk tables with NumPy on `workers` processes.
+    bulk_load=True loads them with LOAD DATA LOCAL INFILE (executemany() when
+    local_infile is disabled); disable_checks turns FK/unique checks off for the run.
+    """
+    counts = counts or dict(BASE_COUNTS)
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    
     print("=" * 60)
     print("Healthcare Analytics Data Generator")
     print("=" * 60)
+    print(f"Patients: {counts['patients']:,}  Providers: {counts['providers']:,}  "
+          f"Encounters: {counts['encounters']:,}  Seed: {seed}")
     print()
     
-    connection = get_connection()
+    connection = get_connection(allow_local_infile=bulk_load)
     if not connection:
         print("Failed to connect to database. Check your DB_CONFIG settings.")
         return
@@ -452,6 +490,10 @@ def generate_all_data():
         clear_existing_data(cursor)
         connection.commit()
         
+        if disable_checks:
+            # Tables are loaded parent-first from generated, consistent rows
+            cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+        
         # Insert reference data
         insert_specialties(cursor)
         insert_departments(cursor)
@@ -459,43 +501,64 @@ def generate_all_data():
         insert_procedures(cursor)
         connection.commit()
         
-        # Insert main data (10,000 patients, 50,000 encounters)
-        insert_patients(cursor, count=10000)
-        connection.commit()
-        
-        insert_providers(cursor, count=200)
-        connection.commit()
-        
-        insert_encounters(cursor, patient_count=10000, encounter_count=50000)
-        connection.commit()
-        
-        # Insert junction table data
-        insert_encounter_diagnoses(cursor, encounter_count=50000)
-        connection.commit()
-        
-        insert_encounter_procedures(cursor, encounter_count=50000)
-        connection.commit()
-        
-        # Insert billing data
-        insert_billing(cursor, encounter_count=50000)
-        connection.commit()
+        if vectorized:
+            # Optional NumPy dependency: only imported in this mode
+            from .vectorized import insert_vectorized_data
+            inserted = insert_vectorized_data(connection, cursor, counts, seed=seed,
+                                              workers=workers, bulk_load=bulk_load)
+        else:
+            random.seed(seed)
+            inserted = {}
+            
+            # Insert main data
+            inserted['patients'] = insert_patients(
+                cursor, count=counts['patients'], bulk_load=bulk_load)
+            connection.commit()
+            
+            inserted['providers'] = insert_providers(
+                cursor, count=counts['providers'], bulk_load=bulk_load)
+            connection.commit()
+            
+            inserted['encounters'] = insert_encounters(
+                cursor, patient_count=counts['patients'],
+                provider_count=counts['providers'], encounter_count=counts['encounters'],
+                bulk_load=bulk_load)
+            connection.commit()
+            
+            # Insert junction table data
+            inserted['encounter_diagnoses'] = insert_encounter_diagnoses(
+                cursor, encounter_count=counts['encounters'], bulk_load=bulk_load)
+            connection.commit()
+            
+            inserted['encounter_procedures'] = insert_encounter_procedures(
+                cursor, encounter_count=counts['encounters'], bulk_load=bulk_load)
+            connection.commit()
+            
+            # Insert billing data
+            inserted['billing'] = insert_billing(
+                cursor, encounter_count=counts['encounters'], bulk_load=bulk_load)
+            connection.commit()
         
+        encounters = inserted['encounters']
         print()
         print("=" * 60)
         print("DATA GENERATION COMPLETE!")
         print("=" * 60)
         print()
         print("Summary:")
-        print("  - Patients:            10,000")
-        print("  - Providers:              200")
-        print("  - Specialties:             10")
-        print("  - Departments:             10")
-        print("  - Diagnoses:               50")
-        print("  - Procedures:              30")
-        print("  - Encounters:          50,000")
-        print("  - Encounter Diagnoses: ~125,000 (1-4 per encounter)")
-        print("  - Encounter Procedures: ~100,000 (1-3 per encounter)")
-        print("  - Billing Records:     50,000")
+        print(f"  - Patients:             {inserted['patients']:>12,}")
+        print(f"  - Providers:            {inserted['providers']:>12,}")
+        print(f"  - Specialties:          {len(SPECIALTIES):>12,}")
+        print(f"  - Departments:          {len(DEPARTMENTS):>12,}")
+        print(f"  - Diagnoses:            {len(DIAGNOSES):>12,}")
+        print(f"  - Procedures:           {len(PROCEDURES):>12,}")
+        print(f"  - Encounters:           {encounters:>12,}")
+        print(f"  - Encounter Diagnoses:  {inserted['encounter_diagnoses']:>12,} "
+              f"({inserted['encounter_diagnoses'] / encounters:.2f} per encounter)")
+        print(f"  - Encounter Procedures: {inserted['encounter_procedures']:>12,} "
+              f"({inserted['encounter_procedures'] / encounters:.2f} per encounter)")
+        print(f"  - Billing Records:      {inserted['billing']:>12,}")
+        print(f"  - Seed:                 {seed:>12}")
         print()
         
     except Error as e:
@@ -508,4 +571,49 @@ def generate_all_data():
 
 
 if __name__ == "__main__":
-    generate_all_data()
+    parser = argparse.ArgumentParser(description="Populate the OLTP tables with synthetic data")
+    parser.add_argument('--scale-factor', type=float, default=1.0,
+                        help="multiply the base volume (10k patients, 200 providers, "
+                             "50k encounters); ratios and fan-out are kept")
+    parser.add_argument('--patients', type=int, default=None,
+                        help="override the scaled patient count")
+    parser.add_argument('--providers', type=int, default=None,
+                        help="override the scaled provider count")
+    parser.add_argument('--encounters', type=int, default=None,
+                        help="override the scaled encounter count")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="random seed for a repeatable dataset (printed when omitted)")
+    parser.add_argument('--vectorized', action='store_true',
+                        help="generate bulk tables column-at-a-time with NumPy")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="generator processes for --vectorized (default: CPU count), "
+                             "or parallel LOAD DATA connections for --load-from")
+    parser.add_argument('--bulk-load', action='store_true',
+                        help="load with LOAD DATA LOCAL INFILE "
+                             "(falls back to executemany when local_infile is off)")
+    parser.add_argument('--disable-checks', action='store_true',
+                        help="disable foreign-key and unique checks while loading")
+    parser.add_argument('--output-dir', default=None,
+                        help="write partitioned files here instead of the database")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help="file format for --output-dir")
+    parser.add_argument('--partition-rows', type=int, default=1000000,
+                        help="rows per file for --output-dir")
+    parser.add_argument('--load-from', default=None,
+                        help="load a CSV export (from --output-dir) into the database")
+    args = parser.parse_args()
+    counts = scaled_counts(args.scale_factor, patients=args.patients,
+                           providers=args.providers, encounters=args.encounters)
+    
+    from . import export
+    if args.load_from:
+        export.load_exported_data(args.load_from,
+                                  workers=args.workers or export.DEFAULT_LOAD_WORKERS)
+    elif args.output_dir:
+        export.export_all_data(args.output_dir, counts, args.seed, fmt=args.format,
+                               partition_rows=args.partition_rows,
+                               vectorized=args.vectorized, workers=args.workers)
+    else:
+        generate_all_data(counts=counts, seed=args.seed, vectorized=args.vectorized,
+                          workers=args.workers, bulk_load=args.bulk_load,
+                          disable_checks=args.disable_checks)
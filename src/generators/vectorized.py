@@ -0,0 +1,261 @@
+"""
+Vectorized Data Generator
+NumPy-backed generation mode for scale-test databases: every table is
+produced a column at a time instead of row by row.
+
+- dates are integer day/second offsets added to a datetime64 epoch
+- categorical columns (names, types, statuses) are vectorized choices
+- claim amounts are vectorized uniform draws
+- junction fan-out (diagnoses/procedures per encounter) uses repeat/cumsum
+
+Each table is split into fixed-size id-range shards generated in a process
+pool. A shard's random stream is seeded from (seed, table, shard number), so
+the output depends only on the seed and the counts, not on the worker count.
+
+NumPy is an optional dependency: pip install numpy (or uv sync --extra fast).
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # only needed for the vectorized mode
+    np = None
+
+from ..etl.bulk_load import bulk_insert
+from .generate_data import (
+    FIRST_NAMES, LAST_NAMES, SPECIALTIES, DEPARTMENTS, DIAGNOSES, PROCEDURES,
+    ENCOUNTER_TYPES, CLAIM_STATUSES, CREDENTIALS,
+)
+
+# Default base seed of the per-shard random streams
+DEFAULT_SEED = 42
+
+# Rows (or encounters, for junction tables) generated per shard
+SHARD_SIZE = 100000
+
+# Same ranges as random_date() / random_encounter_date()
+BIRTH_START, BIRTH_END = '1940-01-01', '2005-12-31'
+ENCOUNTER_START, ENCOUNTER_END = '2023-01-01', '2024-11-30'
+
+# Fan-out per encounter: (min, max) linked rows
+DIAGNOSES_PER_ENCOUNTER = (1, 4)
+PROCEDURES_PER_ENCOUNTER = (1, 3)
+
+# Stable table numbers, part of each shard's seed
+TABLE_NUMBERS = {
+    'patients': 1,
+    'providers': 2,
+    'encounters': 3,
+    'encounter_diagnoses': 4,
+    'encounter_procedures': 5,
+    'billing': 6,
+}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("The vectorized generator requires NumPy: pip install numpy")
+
+
+def _random_days(rng, start, end, size):
+    """Uniform dates in [start, end] as datetime64[D]"""
+    first = np.datetime64(start, 'D')
+    span = (np.datetime64(end, 'D') - first).astype(int)
+    return first + rng.integers(0, span + 1, size=size).astype('timedelta64[D]')
+
+
+def _random_encounter_times(rng, size):
+    """Uniform encounter datetimes (day, hour, minute) as datetime64[s]"""
+    days = _random_days(rng, ENCOUNTER_START, ENCOUNTER_END, size).astype('datetime64[s]')
+    seconds = rng.integers(0, 24, size=size) * 3600 + rng.integers(0, 60, size=size) * 60
+    return days + seconds.astype('timedelta64[s]')
+
+
+def _fan_out(rng, encounter_ids, bounds, pool_size):
+    """
+    Expand encounters into junction rows with bounds[0]..bounds[1] distinct
+    links each. Returns (encounter_id, sequence, linked_id) arrays.
+
+    Distinct ids per encounter come from an arithmetic progression
+    base + k * step (mod pool_size) with step small enough to never wrap
+    onto an earlier member.
+    """
+    low, high = bounds
+    per_encounter = rng.integers(low, high + 1, size=len(encounter_ids))
+    starts = np.cumsum(per_encounter) - per_encounter
+    sequence = np.arange(per_encounter.sum()) - np.repeat(starts, per_encounter) + 1
+
+    base = rng.integers(0, pool_size, size=len(encounter_ids))
+    step = rng.integers(1, (pool_size - 1) // max(high - 1, 1) + 1, size=len(encounter_ids))
+    linked = (np.repeat(base, per_encounter)
+              + (sequence - 1) * np.repeat(step, per_encounter)) % pool_size + 1
+    return np.repeat(encounter_ids, per_encounter), sequence, linked
+
+
+def generate_patients(rng, ids, counts):
+    return {
+        'patient_id': ids,
+        'first_name': rng.choice(FIRST_NAMES, size=len(ids)),
+        'last_name': rng.choice(LAST_NAMES, size=len(ids)),
+        'date_of_birth': _random_days(rng, BIRTH_START, BIRTH_END, len(ids)),
+        'gender': rng.choice(['M', 'F'], size=len(ids)),
+        'mrn': np.char.add('MRN', np.char.zfill(ids.astype(str), 6)),
+    }
+
+
+def generate_providers(rng, ids, counts):
+    specialty_id = rng.integers(1, len(SPECIALTIES) + 1, size=len(ids))
+    return {
+        'provider_id': ids,
+        'first_name': rng.choice(FIRST_NAMES, size=len(ids)),
+        'last_name': rng.choice(LAST_NAMES, size=len(ids)),
+        'credential': rng.choice(CREDENTIALS, size=len(ids)),
+        'specialty_id': specialty_id,
+        'department_id': specialty_id,  # Same as specialty for simplicity
+    }
+
+
+def generate_encounters(rng, ids, counts):
+    encounter_type = rng.choice(ENCOUNTER_TYPES, size=len(ids))
+    encounter_date = _random_encounter_times(rng, len(ids))
+
+    # Discharge date depends on encounter type
+    stay_seconds = np.select(
+        [encounter_type == 'Outpatient', encounter_type == 'Inpatient'],
+        [rng.integers(1, 5, size=len(ids)) * 3600,
+         rng.integers(1, 15, size=len(ids)) * 86400],
+        rng.integers(2, 25, size=len(ids)) * 3600,  # ER
+    )
+    return {
+        'encounter_id': ids,
+        'patient_id': rng.integers(1, counts['patients'] + 1, size=len(ids)),
+        'provider_id': rng.integers(1, counts['providers'] + 1, size=len(ids)),
+        'encounter_type': encounter_type,
+        'encounter_date': encounter_date,
+        'discharge_date': encounter_date + stay_seconds.astype('timedelta64[s]'),
+        'department_id': rng.integers(1, len(DEPARTMENTS) + 1, size=len(ids)),
+    }
+
+
+def generate_encounter_diagnoses(rng, ids, counts):
+    encounter_id, sequence, diagnosis_id = _fan_out(
+        rng, ids, DIAGNOSES_PER_ENCOUNTER, len(DIAGNOSES))
+    return {
+        # Shard-local; offset to global ids when inserted
+        'encounter_diagnosis_id': np.arange(1, len(encounter_id) + 1),
+        'encounter_id': encounter_id,
+        'diagnosis_id': diagnosis_id,
+        'diagnosis_sequence': sequence,
+    }
+
+
+def generate_encounter_procedures(rng, ids, counts):
+    encounter_id, _, procedure_id = _fan_out(
+        rng, ids, PROCEDURES_PER_ENCOUNTER, len(PROCEDURES))
+    # One procedure date per encounter, shared by its procedures
+    procedure_date = _random_days(rng, ENCOUNTER_START, ENCOUNTER_END, len(ids))
+    return {
+        # Shard-local; offset to global ids when inserted
+        'encounter_procedure_id': np.arange(1, len(encounter_id) + 1),
+        'encounter_id': encounter_id,
+        'procedure_id': procedure_id,
+        'procedure_date': procedure_date[encounter_id - ids[0]],
+    }
+
+
+def generate_billing(rng, ids, counts):
+    claim_amount = np.round(rng.uniform(100, 50000, size=len(ids)), 2)
+    # Allowed amount is typically 60-95% of claim amount
+    allowed_amount = np.round(claim_amount * rng.uniform(0.6, 0.95, size=len(ids)), 2)
+    return {
+        'billing_id': ids,
+        'encounter_id': ids,
+        'claim_amount': claim_amount,
+        'allowed_amount': allowed_amount,
+        'claim_date': _random_days(rng, ENCOUNTER_START, ENCOUNTER_END, len(ids)),
+        'claim_status': rng.choice(CLAIM_STATUSES, size=len(ids)),
+    }
+
+
+# table -> (column generator, count key the table's ids range over, junction id column)
+TABLE_GENERATORS = {
+    'patients': (generate_patients, 'patients', None),
+    'providers': (generate_providers, 'providers', None),
+    'encounters': (generate_encounters, 'encounters', None),
+    'encounter_diagnoses': (generate_encounter_diagnoses, 'encounters', 'encounter_diagnosis_id'),
+    'encounter_procedures': (generate_encounter_procedures, 'encounters', 'encounter_procedure_id'),
+    'billing': (generate_billing, 'encounters', None),
+}
+
+
+def generate_shard(table, seed, counts, shard):
+    """Generate the columns of one id-range shard (runs in a worker process)"""
+    shard_number, first_id, last_id = shard
+    generator = TABLE_GENERATORS[table][0]
+    rng = np.random.default_rng([seed, TABLE_NUMBERS[table], shard_number])
+    return generator(rng, np.arange(first_id, last_id + 1), counts)
+
+
+def shard_ranges(total, shard_size=SHARD_SIZE):
+    """Split ids 1..total into (shard_number, first_id, last_id) ranges"""
+    return [(number, first_id, min(first_id + shard_size - 1, total))
+            for number, first_id in enumerate(range(1, total + 1, shard_size))]
+
+
+def generate_table(executor, table, counts, seed=DEFAULT_SEED, in_flight=None):
+    """
+    Yield the column dicts of a table shard by shard, in id order.
+    At most in_flight shards (default: 2 per CPU) are generated ahead of the
+    consumer, so memory stays bounded however large the table is.
+    Junction ids are shifted from shard-local to global numbering.
+    """
+    _, count_key, junction_id = TABLE_GENERATORS[table]
+    in_flight = in_flight or 2 * (os.cpu_count() or 1)
+    shards = iter(shard_ranges(counts[count_key]))
+    pending = deque()
+    offset = 0
+    while True:
+        while len(pending) < in_flight:
+            shard = next(shards, None)
+            if shard is None:
+                break
+            pending.append(executor.submit(generate_shard, table, seed, counts, shard))
+        if not pending:
+            return
+        columns = pending.popleft().result()
+        if junction_id:
+            columns[junction_id] = columns[junction_id] + offset
+            offset += len(columns[junction_id])
+        yield columns
+
+
+def insert_columns(cursor, table, columns, bulk_load=False):
+    """Insert a column dict (src/etl/bulk_load.py); returns the row count"""
+    names = list(columns)
+    # tolist() converts datetime64 to datetime/date and numbers to Python types
+    rows = zip(*(columns[name].tolist() for name in names))
+    return bulk_insert(cursor, table, names, rows, load_data=bulk_load)
+
+
+def insert_vectorized_data(connection, cursor, counts, seed=DEFAULT_SEED, workers=None,
+                           bulk_load=False):
+    """
+    Generate and insert patients, providers, encounters, junction and billing
+    rows with the vectorized generators. counts maps 'patients', 'providers'
+    and 'encounters' to row counts; bulk_load selects LOAD DATA LOCAL INFILE.
+    Returns {table: rows inserted}.
+    """
+    _require_numpy()
+    inserted = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for table in TABLE_GENERATORS:
+            print(f"Inserting {table} (vectorized)...")
+            inserted[table] = 0
+            for columns in generate_table(executor, table, counts, seed):
+                inserted[table] += insert_columns(cursor, table, columns, bulk_load)
+            connection.commit()
+            print(f"  Total: {inserted[table]} {table} rows inserted")
+    return inserted